@@ -5,15 +5,34 @@ import webbrowser
 import folium
 from folium.plugins import MarkerCluster
 from geopy.geocoders import Nominatim
+from geocode_cache import CachedGeocoder
+from gazetteer import GazetteerGeocoder
+from http_client import GeopyAdapter, GEOCODE_TIMEOUT
 from PIL import Image, ImageTk
 import io
 import os
 import json
+import threading
 from datetime import datetime
+from spatial_index import HospitalGridIndex
+from road_routing import shared_router, rank_by_eta, format_eta
+from emergency_index import EmergencyIndex
+from map_cache import MapRenderCache
+from render_worker import MapRenderWorker
+from tree_model import TreeModel
+from map_widget import MapView
+from autocomplete import Autocomplete, shared_suggestions, shared_network_suggester
+from lazy_tabs import LazyTabs
 
 # Replace with your actual API key
 MAP_API_KEY = "YOUR_MAP_API_KEY"
 
+# Maximum number of nearest hospitals listed per search
+MAX_SEARCH_RESULTS = 50
+
+# Build the tabs not yet opened in idle time once the window is up
+PREBUILD_TABS = True
+
 class HospitalExpertSystem:
     def __init__(self, root):
         self.root = root
@@ -27,7 +46,10 @@ class HospitalExpertSystem:
         # Initialize user location
         self.user_latitude = None
         self.user_longitude = None
-        self.geolocator = Nominatim(user_agent="hospital_expert_system")
+        # Offline gazetteer first, then Nominatim behind the shared on-disk cache
+        nominatim = Nominatim(user_agent="hospital_expert_system", timeout=GEOCODE_TIMEOUT, adapter_factory=GeopyAdapter)
+        self.geolocator = GazetteerGeocoder(CachedGeocoder(nominatim))
+        self.suggestions = shared_suggestions()
         
         # Create database of common symptoms and potential diagnoses
         self.symptoms_database = {
@@ -50,6 +72,10 @@ class HospitalExpertSystem:
             "Oncology", "Nephrology", "Urology", "Psychiatry"
         ]
         
+        # Specialty filter of the hospitals tab; the symptom checker sets it too
+        self.specialty_var = tk.StringVar()
+        self.specialty_var.set("All")
+        
         # Create main frames
         self.create_notebook()
         
@@ -85,17 +111,16 @@ class HospitalExpertSystem:
         self.hospitals_frame = ttk.Frame(self.notebook)
         self.emergency_frame = ttk.Frame(self.notebook)
         
-        # Add frames to notebook
-        self.notebook.add(self.home_frame, text="Home")
-        self.notebook.add(self.diagnosis_frame, text="Symptom Checker")
-        self.notebook.add(self.hospitals_frame, text="Find Hospitals")
-        self.notebook.add(self.emergency_frame, text="Emergency")
+        # Add frames to notebook; each tab's widgets are built when it is first shown
+        self.tabs = LazyTabs(self.notebook)
+        self.tabs.add(self.home_frame, self.setup_home_tab, text="Home")
+        self.tabs.add(self.diagnosis_frame, self.setup_diagnosis_tab, text="Symptom Checker")
+        self.tabs.add(self.hospitals_frame, self.setup_hospitals_tab, text="Find Hospitals")
+        self.tabs.add(self.emergency_frame, self.setup_emergency_tab, text="Emergency")
         
-        # Set up each tab
-        self.setup_home_tab()
-        self.setup_diagnosis_tab()
-        self.setup_hospitals_tab()
-        self.setup_emergency_tab()
+        if PREBUILD_TABS:
+            # Most likely next tabs first
+            self.tabs.prebuild([self.hospitals_frame, self.diagnosis_frame, self.emergency_frame])
         
     def setup_home_tab(self):
         # Welcome message and system overview
@@ -269,14 +294,12 @@ class HospitalExpertSystem:
         self.location_entry = tk.Entry(control_frame, width=30, font=("Arial", 11))
         self.location_entry.pack(side=tk.LEFT, padx=5)
         self.location_entry.insert(0, "Delhi, India")  # Default location
+        self.location_autocomplete = Autocomplete(self.location_entry, self.suggestions, shared_network_suggester())
         
         # Specialty filter
         tk.Label(control_frame, text="Specialty:", 
                font=("Arial", 11), bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
         
-        self.specialty_var = tk.StringVar()
-        self.specialty_var.set("All")
-        
         specialty_options = ["All"] + sorted(self.specialties)
         specialty_dropdown = ttk.Combobox(control_frame, textvariable=self.specialty_var,
                                         values=specialty_options, font=("Arial", 11),
@@ -324,6 +347,10 @@ class HospitalExpertSystem:
         # Bind select event
         self.hospital_tree.bind("<<TreeviewSelect>>", self.on_hospital_select)
         
+        # Rows are keyed by hospital id and updated by diffing; headings sort
+        self.hospital_model = TreeModel(self.hospital_tree, columns, lambda hospital: hospital["id"],
+                                        self.hospital_row, self.hospital_sort_keys)
+        
         # Hospital details
         details_frame = tk.LabelFrame(right_frame, text="Hospital Details", 
                                      font=("Arial", 12, "bold"))
@@ -339,10 +366,9 @@ class HospitalExpertSystem:
                                  font=("Arial", 12, "bold"))
         map_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Create a label for the map (in a real app, you'd embed a map here)
-        self.map_label = tk.Label(map_frame, text="Map will be displayed here", 
-                                font=("Arial", 11), bg="#e0e0e0")
-        self.map_label.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        # Tiles and markers are drawn in place; clicking a marker selects its hospital
+        self.map_view = MapView(map_frame, on_select=self.select_hospital, height=250)
+        self.map_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Buttons for actions
         btn_frame = tk.Frame(right_frame)
@@ -366,6 +392,12 @@ class HospitalExpertSystem:
                            padx=10, pady=2)
         book_btn.pack(side=tk.LEFT, padx=5)
         
+        browser_btn = tk.Button(btn_frame, text="Open in Browser", 
+                              command=self.open_map_in_browser,
+                              font=("Arial", 11), bg="#607D8B", fg="white",
+                              padx=10, pady=2)
+        browser_btn.pack(side=tk.LEFT, padx=5)
+        
     def setup_emergency_tab(self):
         # Main frame
         main_frame = tk.Frame(self.emergency_frame, bg="#f0f0f0")
@@ -479,6 +511,11 @@ class HospitalExpertSystem:
                                      padx=10, pady=5)
         find_emergency_btn.pack(pady=15)
         
+        # Results of the nearest emergency department lookup
+        self.emergency_results = tk.Label(main_frame, text="", font=("Arial", 12), bg="#f0f0f0",
+                                          justify=tk.LEFT, wraplength=900)
+        self.emergency_results.pack(pady=5)
+        
     def check_diagnosis(self):
         # Get selected symptoms
         selected_symptoms = [symptom for symptom, var in self.symptom_vars.items() if var.get()]
@@ -711,12 +748,27 @@ class HospitalExpertSystem:
                 "description": "PGI Chandigarh is a premier medical and research institute in North India."
             }
         ]
+        
+        # Build the spatial index once so searches only touch nearby grid cells
+        self.hospital_index = HospitalGridIndex(self.hospitals)
+        self.map_cache = MapRenderCache()
+        self.render_worker = MapRenderWorker(self.root, self.map_cache)
+        self.map_hospitals = []
+        self.map_file = None
+        self.open_when_ready = False
+        self.build_emergency_index()
+    
+    def build_emergency_index(self):
+        """
+        Precompute the nearest emergency departments for every grid cell of
+        the service region; road travel times are filled in in the background.
+        """
+        self.emergency_index = EmergencyIndex(self.hospitals)
+        refine_thread = threading.Thread(target=self.emergency_index.refine, args=(shared_router(),))
+        refine_thread.daemon = True
+        refine_thread.start()
     
     def search_hospitals(self):
-        # Clear previous results
-        for item in self.hospital_tree.get_children():
-            self.hospital_tree.delete(item)
-        
         self.details_text.config(state=tk.NORMAL)
         self.details_text.delete("1.0", tk.END)
         self.details_text.config(state=tk.DISABLED)
@@ -734,6 +786,7 @@ class HospitalExpertSystem:
             if location_info:
                 self.user_latitude = location_info.latitude
                 self.user_longitude = location_info.longitude
+                self.suggestions.remember(location)
             else:
                 # Default to Delhi coordinates if location not found
                 self.user_latitude = 28.6139
@@ -747,33 +800,23 @@ class HospitalExpertSystem:
         
         # Filter by specialty if selected
         specialty = self.specialty_var.get()
-        filtered_hospitals = self.hospitals
+        predicate = None
         if specialty != "All":
-            filtered_hospitals = [h for h in self.hospitals if specialty in h["specialties"]]
-        
-        # Calculate distances (in a real app, this would use the Google Maps Distance Matrix API)
-        for hospital in filtered_hospitals:
-            # Simple Euclidean distance calculation for demonstration
-            # In a real app, you would calculate road distance/time using Maps API
-            lat_diff = hospital["coordinates"]["lat"] - self.user_latitude
-            lng_diff = hospital["coordinates"]["lng"] - self.user_longitude
-            distance = ((lat_diff ** 2) + (lng_diff ** 2)) ** 0.5
-            
-            # Convert to approximate km (very rough estimate)
-            distance_km = distance * 111
-            hospital["distance"] = distance_km
-        
-        # Sort by distance
-        filtered_hospitals.sort(key=lambda x: x["distance"])
-        
-        # Display hospitals in treeview
-        for hospital in filtered_hospitals:
-            self.hospital_tree.insert("", tk.END, values=(
-                hospital["name"],
-                hospital["type"],
-                f"{hospital['distance']:.1f} km",
-                hospital["rating"]
-            ), tags=(str(hospital["id"]),))
+            predicate = lambda h: specialty in h["specialties"]
+        
+        # Query the spatial index for the nearest matching hospitals (great-circle
+        # distance), then rank them by driving time where a road graph covers the area
+        nearest = self.hospital_index.nearest(self.user_latitude, self.user_longitude, MAX_SEARCH_RESULTS, predicate)
+        filtered_hospitals = []
+        for distance_km, hospital, eta in rank_by_eta(shared_router(), self.user_latitude, self.user_longitude,
+                                                      nearest, HospitalGridIndex.default_coordinates,
+                                                      MAX_SEARCH_RESULTS):
+            # A copy per search: the shared records stay untouched while the
+            # render worker reads this list
+            filtered_hospitals.append(dict(hospital, distance=distance_km, eta=eta))
+        
+        # Display hospitals in treeview; rows shown before are kept
+        self.hospital_model.update(filtered_hospitals)
         
         # Update the map
         self.update_map(filtered_hospitals)
@@ -782,64 +825,107 @@ class HospitalExpertSystem:
         if not filtered_hospitals:
             messagebox.showinfo("No Results", f"No hospitals found with specialty: {specialty}")
     
+    def hospital_row(self, hospital):
+        return (
+            hospital["name"],
+            hospital["type"],
+            f"{hospital['distance']:.1f} km" + (f" ({format_eta(hospital['eta'])})" if hospital["eta"] is not None else ""),
+            hospital["rating"]
+        )
+    
+    def hospital_sort_keys(self, hospital):
+        # One key per column, in column order
+        return (hospital["name"].lower(), hospital["type"].lower(), hospital["distance"], float(hospital["rating"]))
+    
     def update_map(self, hospitals):
-        # In a real application, this would generate and display a map
-        # For this example, we'll just update the text in the map label
+        self.map_hospitals = hospitals
+        markers = [(hospital["coordinates"]["lat"], hospital["coordinates"]["lng"],
+                    "red" if hospital["emergency"] else "green", hospital["name"], hospital["id"])
+                   for hospital in hospitals]
+        self.map_view.show(self.user_latitude, self.user_longitude, markers,
+                           note=None if hospitals else "No hospitals found to display on map")
+        
+        # The browser map is rendered in the background (and only rebuilt when
+        # this result set has not been drawn before); a newer search cancels it
+        self.map_file = None
+        self.open_when_ready = False
         if hospitals:
-            self.map_label.config(text=f"Map showing {len(hospitals)} hospitals near {self.location_entry.get()}")
-            
-            # In a real application, you would create a map using folium and display it
-            # Here's an example of how you might do that:
-            
-            map_center = [self.user_latitude, self.user_longitude]
-            m = folium.Map(location=map_center, zoom_start=12)
-            
-            # Add marker for user location
+            center = (self.user_latitude, self.user_longitude)
+            self.render_worker.submit("hospital_finder", center, None, hospitals,
+                                      lambda: self.build_map(hospitals, center), self.map_ready)
+        else:
+            self.render_worker.cancel()
+    
+    def map_ready(self, map_file):
+        self.map_file = map_file
+        if self.open_when_ready:
+            self.open_when_ready = False
+            webbrowser.open('file://' + map_file)
+    
+    def open_map_in_browser(self):
+        """
+        Open the current results as a full folium map in the browser.
+        """
+        if not self.map_hospitals:
+            messagebox.showinfo("No Results", "Search for hospitals first.")
+            return
+        if self.map_file:
+            webbrowser.open('file://' + self.map_file)
+        else:
+            # Still rendering; map_ready opens it
+            self.open_when_ready = True
+    
+    def select_hospital(self, hospital_id):
+        """
+        Select a hospital's row in the results list (e.g. from a map marker click).
+        """
+        item = str(hospital_id)
+        if self.hospital_tree.exists(item):
+            self.hospital_tree.selection_set(item)
+            self.hospital_tree.see(item)
+    
+    def build_map(self, hospitals, center):
+        """
+        Build the folium map of the given hospitals around the search location.
+        
+        Runs on the render worker, so it only uses its arguments.
+        """
+        map_center = list(center)
+        m = folium.Map(location=map_center, zoom_start=12)
+        
+        # Add marker for user location
+        folium.Marker(
+            map_center,
+            tooltip="Your Location",
+            icon=folium.Icon(color="blue", icon="user", prefix="fa")
+        ).add_to(m)
+        
+        # Add markers for hospitals
+        for hospital in hospitals:
             folium.Marker(
-                map_center,
-                tooltip="Your Location",
-                icon=folium.Icon(color="blue", icon="user", prefix="fa")
+                [hospital["coordinates"]["lat"], hospital["coordinates"]["lng"]],
+                tooltip=hospital["name"],
+                popup=f"{hospital['name']}<br>{hospital['type']}<br>{hospital['contact']}",
+                icon=folium.Icon(color="red" if hospital["emergency"] else "green", icon="plus", prefix="fa")
             ).add_to(m)
-            
-            # Add markers for hospitals
-            for hospital in hospitals:
-                folium.Marker(
-                    [hospital["coordinates"]["lat"], hospital["coordinates"]["lng"]],
-                    tooltip=hospital["name"],
-                    popup=f"{hospital['name']}<br>{hospital['type']}<br>{hospital['contact']}",
-                    icon=folium.Icon(color="red" if hospital["emergency"] else "green", icon="plus", prefix="fa")
-                ).add_to(m)
-            
-            # Save map to HTML file
-            map_file = "hospital_map.html"
-            m.save(map_file)
-            
-            # Display the map in a webview or browser
-            # This would depend on your platform and requirements
-            
-        else:
-            self.map_label.config(text="No hospitals found to display on map")
+        return m
     
     def on_hospital_select(self, event):
         selected_items = self.hospital_tree.selection()
         if not selected_items:
             return
         
-        # Get the selected hospital's tag (ID)
+        # Get the selected hospital's row (its iid is the hospital ID)
         item = selected_items[0]
-        item_values = self.hospital_tree.item(item, "values")
-        hospital_name = item_values[0]
-        
-        # Find the hospital in our data
-        selected_hospital = None
-        for hospital in self.hospitals:
-            if hospital["name"] == hospital_name:
-                selected_hospital = hospital
-                break
+        # Rows are keyed by hospital id, so names need not be unique
+        selected_hospital = self.hospital_model.item(item)
         
         if not selected_hospital:
             return
         
+        coordinates = selected_hospital["coordinates"]
+        self.map_view.center_on(coordinates["lat"], coordinates["lng"])
+        
         # Update details text
         self.details_text.config(state=tk.NORMAL)
         self.details_text.delete("1.0", tk.END)
@@ -848,6 +934,8 @@ class HospitalExpertSystem:
         self.details_text.insert(tk.END, f"Location: {selected_hospital['location']}\n")
         self.details_text.insert(tk.END, f"Type: {selected_hospital['type']}\n")
         self.details_text.insert(tk.END, f"Distance: {selected_hospital['distance']:.1f} km\n")
+        if selected_hospital.get("eta") is not None:
+            self.details_text.insert(tk.END, f"Drive time: about {format_eta(selected_hospital['eta'])}\n")
         self.details_text.insert(tk.END, f"Rating: {selected_hospital['rating']} / 5.0\n")
         self.details_text.insert(tk.END, f"Beds: {selected_hospital['beds']}\n")
         self.details_text.insert(tk.END, f"Contact: {selected_hospital['contact']}\n")
@@ -885,15 +973,8 @@ class HospitalExpertSystem:
         
         # Get the selected hospital
         item = selected_items[0]
-        item_values = self.hospital_tree.item(item, "values")
-        hospital_name = item_values[0]
-        
-        # Find the hospital in our data
-        selected_hospital = None
-        for hospital in self.hospitals:
-            if hospital["name"] == hospital_name:
-                selected_hospital = hospital
-                break
+        # Rows are keyed by hospital id, so names need not be unique
+        selected_hospital = self.hospital_model.item(item)
         
         if not selected_hospital:
             return
@@ -920,15 +1001,8 @@ class HospitalExpertSystem:
         
         # Get the selected hospital
         item = selected_items[0]
-        item_values = self.hospital_tree.item(item, "values")
-        hospital_name = item_values[0]
-        
-        # Find the hospital in our data
-        selected_hospital = None
-        for hospital in self.hospitals:
-            if hospital["name"] == hospital_name:
-                selected_hospital = hospital
-                break
+        # Rows are keyed by hospital id, so names need not be unique
+        selected_hospital = self.hospital_model.item(item)
         
         if not selected_hospital:
             return
@@ -947,15 +1021,8 @@ class HospitalExpertSystem:
         
         # Get the selected hospital
         item = selected_items[0]
-        item_values = self.hospital_tree.item(item, "values")
-        hospital_name = item_values[0]
-        
-        # Find the hospital in our data
-        selected_hospital = None
-        for hospital in self.hospitals:
-            if hospital["name"] == hospital_name:
-                selected_hospital = hospital
-                break
+        # Rows are keyed by hospital id, so names need not be unique
+        selected_hospital = self.hospital_model.item(item)
         
         if not selected_hospital:
             return
@@ -1070,18 +1137,24 @@ class HospitalExpertSystem:
                           f"In a real application, this would initiate an emergency call.")
     
     def find_emergency_services(self):
-        # Switch to hospitals tab and set filter for emergency services
-        self.notebook.select(2)  # Switch to hospitals tab
-        self.specialty_var.set("All")  # Reset specialty filter
-        self.location_entry.delete(0, tk.END)
-        self.location_entry.insert(0, "Current Location")  # Set to current location
+        # Answered from the precomputed emergency grid: no geocoding, no network
+        if self.user_latitude is None or self.user_longitude is None:
+            # Same default as use_current_location until GPS is available
+            self.user_latitude = 28.6139
+            self.user_longitude = 77.2090
         
-        # Use current location
-        self.use_current_location()
+        nearest = self.emergency_index.lookup(self.user_latitude, self.user_longitude)
+        if not nearest:
+            self.emergency_results.config(text="No emergency department on record near your location.\n"
+                                               "Call 102 or 108 for an ambulance.")
+            return
         
-        # Show message about filtering for emergency services
-        messagebox.showinfo("Emergency Services", 
-                          "Searching for hospitals with emergency services near your location.")
+        lines = ["Nearest emergency departments:"]
+        for i, (seconds, distance_km, hospital, by_road) in enumerate(nearest):
+            estimate = "" if by_road else " (estimated)"
+            lines.append(f"{i+1}. {hospital['name']}, {hospital['location']} - {distance_km:.1f} km, "
+                         f"about {format_eta(seconds)}{estimate} - {hospital['contact']}")
+        self.emergency_results.config(text="\n".join(lines))
 
 def main():
     root = tk.Tk()
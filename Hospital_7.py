@@ -1,13 +1,27 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import requests
-import folium
-import webbrowser
 from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-import os
+from geocode_cache import CachedGeocoder
+from gazetteer import GazetteerGeocoder
+from http_client import shared_client, GeopyAdapter, CONNECT_TIMEOUT, GEOCODE_TIMEOUT, IPINFO_URL, IPINFO_TIMEOUT
 from PIL import Image, ImageTk
 import threading
+from overpass import HOSPITAL_SELECTORS
+from overpass_tiles import OverpassTileCache
+from hospital_store import HospitalStore
+from search_pipeline import SearchPipeline
+from road_routing import shared_router, format_eta
+from live_map import shared_live_map, live_feature
+from overpass import element_key
+from autocomplete import Autocomplete, shared_suggestions, shared_network_suggester
+
+# Number of nearest facilities shown on the map
+MAP_RESULT_LIMIT = 15
+
+# Auto-expand keeps widening the radius until this many facilities are found
+AUTO_EXPAND_MIN_RESULTS = 5
+AUTO_EXPAND_MAX_RADIUS_KM = 50
 
 class HospitalExpertSystem:
     def __init__(self, root):
@@ -26,7 +40,17 @@ class HospitalExpertSystem:
         # Initialize user location
         self.user_latitude = None
         self.user_longitude = None
-        self.geolocator = Nominatim(user_agent="medilocator_app")
+        # Offline gazetteer first, then Nominatim behind the shared on-disk cache
+        nominatim = Nominatim(user_agent="medilocator_app", timeout=GEOCODE_TIMEOUT, adapter_factory=GeopyAdapter)
+        self.geolocator = GazetteerGeocoder(CachedGeocoder(nominatim))
+        self.overpass_tiles = OverpassTileCache(HOSPITAL_SELECTORS)
+        self.hospital_store = HospitalStore()
+        # One browser page, updated in place by every search
+        self.live_map = shared_live_map()
+        self.suggestions = shared_suggestions()
+        self.search_pipeline = SearchPipeline(self.geolocator, self.overpass_tiles,
+                                              self.hospital_store, HOSPITAL_SELECTORS,
+                                              router=shared_router())
         
         # Create custom style
         self.create_styles()
@@ -142,6 +166,7 @@ class HospitalExpertSystem:
         self.location_entry.grid(row=0, column=1, padx=5, pady=10)
         self.location_entry.insert(0, "Enter city or address")
         self.location_entry.bind("<FocusIn>", self.clear_placeholder)
+        self.location_autocomplete = Autocomplete(self.location_entry, self.suggestions, shared_network_suggester())
         
         # Radius selection
         radius_label = ttk.Label(control_frame, 
@@ -161,9 +186,16 @@ class HospitalExpertSystem:
                                style="TLabel")
         radius_unit.grid(row=0, column=4, padx=0, pady=10, sticky=tk.W)
         
+        # Widen the radius automatically when too few facilities are found
+        self.auto_expand_var = tk.BooleanVar(value=True)
+        auto_expand_check = ttk.Checkbutton(control_frame,
+                                            text="Auto-expand",
+                                            variable=self.auto_expand_var)
+        auto_expand_check.grid(row=0, column=5, padx=5, pady=10, sticky=tk.W)
+        
         # Buttons frame
         button_frame = ttk.Frame(control_frame)
-        button_frame.grid(row=1, column=0, columnspan=5, pady=5)
+        button_frame.grid(row=1, column=0, columnspan=6, pady=5)
         
         # Search button
         search_btn = ttk.Button(button_frame, 
@@ -299,194 +331,133 @@ class HospitalExpertSystem:
         search_thread.start()
     
     def perform_search(self, location):
-        # Geocode the location to get latitude and longitude
+        # Geocoding, a speculative Overpass fetch and the nearest-k ranking
+        # run as one pipeline; each stage's timing is logged at the end
+        radius = int(float(self.radius_var.get()) * 1000)
+        min_results = AUTO_EXPAND_MIN_RESULTS if self.auto_expand_var.get() else 0
         try:
-            location_info = self.geolocator.geocode(location)
-            if location_info:
-                self.user_latitude = location_info.latitude
-                self.user_longitude = location_info.longitude
-                self.root.after(0, lambda: self.status_label.config(
-                    text=f"Found location: {location_info.address[:60]}..."
-                    if len(location_info.address) > 60 else f"Found location: {location_info.address}"))
-            else:
-                self.root.after(0, lambda: self.status_label.config(text="Location not found. Please try again."))
-                self.root.after(0, lambda: messagebox.showinfo("Location Error", "Location not found. Please try a different location."))
-                return
+            # Auto-expand only fetches the ring added by each wider radius
+            result = self.search_pipeline.run(location, radius, MAP_RESULT_LIMIT,
+                                              progress=self.show_search_progress,
+                                              min_results=min_results,
+                                              max_radius_m=AUTO_EXPAND_MAX_RADIUS_KM * 1000)
+        except requests.RequestException as e:
+            self.root.after(0, lambda: self.status_label.config(text="Error fetching hospital data."))
+            self.root.after(0, lambda: messagebox.showinfo("API Error", f"Error fetching hospital data: {str(e)}"))
+            return
         except Exception as e:
             self.root.after(0, lambda: self.status_label.config(text=f"Error: {str(e)}"))
             self.root.after(0, lambda: messagebox.showinfo("Location Error", f"Error finding location: {str(e)}"))
             return
         
-        # Get radius in meters (convert from km)
-        radius = int(float(self.radius_var.get()) * 1000)
+        if result.location is None:
+            self.root.after(0, lambda: self.status_label.config(text="Location not found. Please try again."))
+            self.root.after(0, lambda: messagebox.showinfo("Location Error", "Location not found. Please try a different location."))
+            return
+        self.user_latitude = result.location.latitude
+        self.user_longitude = result.location.longitude
+        self.suggestions.remember(location)
         
-        # Fetch hospital data
-        self.root.after(0, lambda: self.status_label.config(text="Fetching hospital data..."))
-        hospitals = self.get_real_time_hospitals(self.user_latitude, self.user_longitude, radius)
+        # Build the detailed records only for the hospitals that will be shown
+        closest_hospitals = [self.describe_hospital(element, distance, eta)
+                             for (distance, element), eta in zip(result.nearest, result.etas)]
         
         # Update the map
-        if hospitals:
-            self.root.after(0, lambda: self.status_label.config(text=f"Found {len(hospitals)} hospitals near {location}"))
-            self.root.after(0, lambda: self.update_map(hospitals))
+        if closest_hospitals:
+            found = result.received
+            status = f"Found {found} hospitals near {location}"
+            if result.radius_m > radius:
+                status += f" (search widened to {result.radius_m / 1000:g} km)"
+            self.root.after(0, lambda: self.status_label.config(text=status))
+            with result.timings.stage("publish"):
+                self.live_map.show(self.user_latitude, self.user_longitude, result.radius_m,
+                                   self.live_features(closest_hospitals))
+            count = len(closest_hospitals)
+            self.root.after(0, lambda: self.map_label.config(text=f"Map in browser showing {count} nearest hospitals and clinics"))
         else:
-            self.root.after(0, lambda: self.status_label.config(text=f"No hospitals found in {location} within {self.radius_var.get()} km radius"))
+            searched = result.radius_m / 1000
+            # Clear the previous results from an open map page
+            self.live_map.publish(self.user_latitude, self.user_longitude, result.radius_m, [],
+                                  note=f"No hospitals found within {searched:g} km")
+            self.root.after(0, lambda: self.status_label.config(text=f"No hospitals found in {location} within {searched:g} km radius"))
             self.root.after(0, lambda: self.map_label.config(text=f"No hospitals found. Try increasing your search radius."))
+        print(f"Search timings: {result.timings.summary()}")
     
-    def get_real_time_hospitals(self, latitude, longitude, radius=5000):
+    def show_search_progress(self, selector):
         """
-        Fetch real-time hospital data using Overpass API (OpenStreetMap).
+        Show the nearest facilities found so far while results are still downloading.
         """
-        overpass_url = "https://overpass-api.de/api/interpreter"
-        query = f"""
-        [out:json];
-        (
-          node["amenity"="hospital"](around:{radius},{latitude},{longitude});
-          way["amenity"="hospital"](around:{radius},{latitude},{longitude});
-          relation["amenity"="hospital"](around:{radius},{latitude},{longitude});
-          node["amenity"="clinic"](around:{radius},{latitude},{longitude});
-          way["amenity"="clinic"](around:{radius},{latitude},{longitude});
-          relation["amenity"="clinic"](around:{radius},{latitude},{longitude});
-          node["healthcare"="hospital"](around:{radius},{latitude},{longitude});
-          way["healthcare"="hospital"](around:{radius},{latitude},{longitude});
-          relation["healthcare"="hospital"](around:{radius},{latitude},{longitude});
-        );
-        out center;
-        """
-        try:
-            response = requests.get(overpass_url, params={"data": query})
-            response.raise_for_status()
-            data = response.json()
-            return data.get("elements", [])
-        except requests.RequestException as e:
-            self.root.after(0, lambda: messagebox.showinfo("API Error", f"Error fetching hospital data: {str(e)}"))
-            return []
+        nearest = selector.results()[:3]
+        if not nearest:
+            return
+        preview = "\n".join(f"{idx+1}. {element.get('tags', {}).get('name', 'Unknown Hospital')} ({distance:.2f} km)"
+                            for idx, (distance, element) in enumerate(nearest))
+        status = f"Received {selector.seen} facilities so far..."
+        self.root.after(0, lambda: self.status_label.config(text=status))
+        self.root.after(0, lambda: self.map_label.config(text=f"Nearest so far:\n{preview}"))
     
-    def update_map(self, hospitals):
+    def live_features(self, closest_hospitals):
         """
-        Update the map with hospital locations and information.
+        The nearest hospital records as features for the live map page.
         """
-        if not hospitals:
-            self.map_label.config(text="No hospitals found to display on the map.")
-            return
-        
-        # Create a folium map centered at the user's location
-        map_center = [self.user_latitude, self.user_longitude]
-        hospital_map = folium.Map(location=map_center, zoom_start=13)
-        
-        # Add a marker for the user's location
-        folium.Marker(
-            map_center,
-            tooltip="Your Location",
-            popup="Your Location",
-            icon=folium.Icon(color="blue", icon="user", prefix="fa")
-        ).add_to(hospital_map)
-        
-        # Process and sort hospitals by distance
-        hospital_with_distances = []
-        for hospital in hospitals:
-            lat = hospital.get("lat") or hospital.get("center", {}).get("lat")
-            lon = hospital.get("lon") or hospital.get("center", {}).get("lon")
-            name = hospital.get("tags", {}).get("name", "Unknown Hospital")
-            
-            if lat and lon:
-                # Calculate the distance from the user's location
-                hospital_coords = (lat, lon)
-                user_coords = (self.user_latitude, self.user_longitude)
-                distance = geodesic(user_coords, hospital_coords).km
-                
-                # Get facility type and details
-                facility_type = hospital.get("tags", {}).get("amenity") or hospital.get("tags", {}).get("healthcare", "hospital")
-                phone = hospital.get("tags", {}).get("phone") or "Not available"
-                healthcare = hospital.get("tags", {}).get("healthcare:speciality") or "General"
-                emergency = "Yes" if hospital.get("tags", {}).get("emergency") == "yes" else "Unknown"
-                
-                # Get address components
-                address = hospital.get("tags", {}).get("addr:full", "")
-                if not address:
-                    street = hospital.get("tags", {}).get("addr:street", "")
-                    housenumber = hospital.get("tags", {}).get("addr:housenumber", "")
-                    city = hospital.get("tags", {}).get("addr:city", "")
-                    address = f"{housenumber} {street}, {city}".strip()
-                    if not address:
-                        address = "Address not available"
-                
-                hospital_with_distances.append({
-                    "hospital": hospital,
-                    "distance": distance,
-                    "lat": lat,
-                    "lon": lon,
-                    "name": name,
-                    "address": address,
-                    "type": facility_type,
-                    "phone": phone,
-                    "healthcare": healthcare,
-                    "emergency": emergency
-                })
-        
-        # Sort by distance
-        hospital_with_distances.sort(key=lambda x: x["distance"])
-        
-        # Get only the closest hospitals to avoid overloading the map
-        closest_hospitals = hospital_with_distances[:15]
-        
-        # Add markers for hospitals
+        features = []
         for idx, hospital_info in enumerate(closest_hospitals):
-            lat = hospital_info["lat"]
-            lon = hospital_info["lon"]
             name = hospital_info["name"]
             distance = hospital_info["distance"]
-            address = hospital_info["address"]
+            eta = hospital_info["eta"]
             facility_type = hospital_info["type"]
-            phone = hospital_info["phone"]
-            healthcare = hospital_info["healthcare"]
-            emergency = hospital_info["emergency"]
-            
-            # Determine icon color based on the type of facility
-            icon_color = "red"
-            if facility_type == "clinic":
-                icon_color = "green"
-                
-            # Create a detailed popup
-            popup_html = f"""
-            <div style="width: 250px;">
-                <h4 style="margin-bottom: 5px;">{name}</h4>
-                <div style="font-size: 12px; color: #888;">
-                    {facility_type.capitalize()}
-                </div>
-                <div style="margin-top: 8px;">
-                    <b>Distance:</b> {distance:.2f} km<br>
-                    <b>Address:</b> {address}<br>
-                    <b>Phone:</b> {phone}<br>
-                    <b>Speciality:</b> {healthcare}<br>
-                    <b>Emergency:</b> {emergency}
-                </div>
-            </div>
-            """
-            
-            # Add marker with information
-            folium.Marker(
-                [lat, lon],
-                tooltip=f"{idx+1}. {name} ({distance:.2f} km)",
-                popup=folium.Popup(popup_html, max_width=300),
-                icon=folium.Icon(color=icon_color, icon="plus", prefix="fa")
-            ).add_to(hospital_map)
-            
-            # Add a circle around the hospital to indicate its proximity
-            folium.Circle(
-                [lat, lon],
-                radius=100,  # 100 meter radius circle
-                color=icon_color,
-                fill=True,
-                fill_opacity=0.2
-            ).add_to(hospital_map)
-        
-        # Save the map to an HTML file and open it in a browser
-        map_file = os.path.join(os.path.expanduser("~"), "medilocator_map.html")
-        hospital_map.save(map_file)
-        webbrowser.open('file://' + map_file)
-        
-        # Update map label
-        self.map_label.config(text=f"Map opened in browser showing {len(closest_hospitals)} nearest hospitals and clinics")
+            features.append(live_feature(
+                element_key(hospital_info["hospital"]), hospital_info["lat"], hospital_info["lon"], name,
+                [("Distance", f"{distance:.2f} km"),
+                 ("Drive time", format_eta(eta)),
+                 ("Address", hospital_info["address"]),
+                 ("Phone", hospital_info["phone"]),
+                 ("Speciality", hospital_info["healthcare"]),
+                 ("Emergency", hospital_info["emergency"])],
+                # Clinics in green, everything else in red
+                color="green" if facility_type == "clinic" else "red",
+                subtitle=facility_type.capitalize(),
+                tooltip=f"{idx+1}. {name} ({distance:.2f} km" + (f", {format_eta(eta)})" if eta is not None else ")")))
+        return features
+    
+    def describe_hospital(self, hospital, distance, eta=None):
+        """
+        Build the display record for one Overpass element; eta is the driving
+        time in seconds when a road graph is available.
+        """
+        lat = hospital.get("lat") or hospital.get("center", {}).get("lat")
+        lon = hospital.get("lon") or hospital.get("center", {}).get("lon")
+        name = hospital.get("tags", {}).get("name", "Unknown Hospital")
+        
+        # Get facility type and details
+        facility_type = hospital.get("tags", {}).get("amenity") or hospital.get("tags", {}).get("healthcare", "hospital")
+        phone = hospital.get("tags", {}).get("phone") or "Not available"
+        healthcare = hospital.get("tags", {}).get("healthcare:speciality") or "General"
+        emergency = "Yes" if hospital.get("tags", {}).get("emergency") == "yes" else "Unknown"
+        
+        # Get address components
+        address = hospital.get("tags", {}).get("addr:full", "")
+        if not address:
+            street = hospital.get("tags", {}).get("addr:street", "")
+            housenumber = hospital.get("tags", {}).get("addr:housenumber", "")
+            city = hospital.get("tags", {}).get("addr:city", "")
+            address = f"{housenumber} {street}, {city}".strip()
+            if not address:
+                address = "Address not available"
+        
+        return {
+            "hospital": hospital,
+            "distance": distance,
+            "eta": eta,
+            "lat": lat,
+            "lon": lon,
+            "name": name,
+            "address": address,
+            "type": facility_type,
+            "phone": phone,
+            "healthcare": healthcare,
+            "emergency": emergency
+        }
     
     def use_current_location(self):
         """
@@ -503,7 +474,7 @@ class HospitalExpertSystem:
     def fetch_current_location(self):
         try:
             # Use ipinfo.io to get approximate location based on IP
-            response = requests.get('https://ipinfo.io/json')
+            response = shared_client().get(IPINFO_URL, timeout=(CONNECT_TIMEOUT, IPINFO_TIMEOUT))
             data = response.json()
             
             if 'loc' in data:
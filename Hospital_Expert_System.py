@@ -1,19 +1,106 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, PhotoImage
-import requests
 import webbrowser
 import folium
 from folium.plugins import MarkerCluster
 from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+from geocode_cache import CachedGeocoder
+from gazetteer import GazetteerGeocoder
+from http_client import shared_client, GeopyAdapter, CONNECT_TIMEOUT, GEOCODE_TIMEOUT, IPINFO_URL, IPINFO_TIMEOUT
 from PIL import Image, ImageTk
 import io
 import os
 import json
 from datetime import datetime
+from overpass import AMENITY_SELECTORS, element_key
+from overpass_tiles import OverpassTileCache
+from hospital_store import HospitalStore
+from search_pipeline import SearchPipeline
+from road_routing import shared_router, format_eta
+from map_cache import MapRenderCache
+from render_worker import MapRenderWorker
+from search_scheduler import SearchScheduler
+from virtual_list import VirtualList
+from geojson_map import GeoJSONMap
+from map_widget import MapView
+from autocomplete import Autocomplete, shared_suggestions, shared_network_suggester
+from lazy_tabs import LazyTabs
 # Replace with your actual API key
 MAP_API_KEY = "YOUR_MAP_API_KEY"
 
+# Maximum number of nearest facilities returned per search
+MAX_HOSPITAL_RESULTS = 200
+
+# Height in pixels of one hospital in the results list
+LISTING_ROW_HEIGHT = 190
+
+# "geojson" writes one FeatureCollection with precomputed clusters and builds
+# markers in the browser; "folium" writes a marker and popup per hospital and
+# clusters them with MarkerCluster at page load (much larger, slower pages)
+MAP_RENDERER = "geojson"
+
+# Build the tabs not yet opened in idle time once the window is up
+PREBUILD_TABS = True
+
+
+def build_folium_map(hospitals, latitude, longitude, radius):
+    """
+    Build the folium map of the hospitals around the search location.
+    """
+    # Create a map centered at the user's location
+    m = folium.Map(location=[latitude, longitude], zoom_start=13)
+    
+    # Add marker for user's location
+    folium.Marker(
+        [latitude, longitude],
+        popup="Your Location",
+        tooltip="Your Location",
+        icon=folium.Icon(color="blue", icon="home", prefix="fa")
+    ).add_to(m)
+    
+    # Create a marker cluster for hospitals
+    marker_cluster = MarkerCluster().add_to(m)
+    
+    # Add markers for hospitals
+    for hospital in hospitals:
+        # Determine icon color based on hospital type
+        color = "red" if hospital["type"] == "Hospital" else "green"
+        if hospital["emergency"] == "Yes":
+            color = "darkred"
+        
+        # Create popup with hospital information
+        popup_html = f"""
+        <div style="width:250px">
+            <h4>{hospital['name']}</h4>
+            <b>Distance:</b> {hospital['distance']:.2f} km<br>
+            <b>Drive time:</b> {format_eta(hospital['eta'])}<br>
+            <b>Address:</b> {hospital['address']}<br>
+            <b>Phone:</b> {hospital['phone']}<br>
+            <b>Emergency:</b> {hospital['emergency']}<br>
+            <b>Specialties:</b> {', '.join(hospital['specialties']) if hospital['specialties'] else 'General'}<br>
+            {f'<a href="{hospital["website"]}" target="_blank">Visit Website</a>' if hospital["website"] else ''}
+        </div>
+        """
+        
+        folium.Marker(
+            [hospital['lat'], hospital['lon']],
+            popup=folium.Popup(popup_html, max_width=300),
+            tooltip=hospital['name'],
+            icon=folium.Icon(color=color, icon="plus", prefix="fa")
+        ).add_to(marker_cluster)
+    
+    # Draw a circle representing the search radius
+    folium.Circle(
+        location=[latitude, longitude],
+        radius=radius,
+        color='blue',
+        fill=True,
+        fill_opacity=0.1
+    ).add_to(m)
+    
+    return m
+
+
 class HospitalExpertSystem:
     def __init__(self, root):
         self.root = root
@@ -27,7 +114,21 @@ class HospitalExpertSystem:
         # Initialize user location
         self.user_latitude = None
         self.user_longitude = None
-        self.geolocator = Nominatim(user_agent="hospital_expert_system")
+        # Offline gazetteer first, then Nominatim behind the shared on-disk cache
+        nominatim = Nominatim(user_agent="hospital_expert_system", timeout=GEOCODE_TIMEOUT, adapter_factory=GeopyAdapter)
+        self.geolocator = GazetteerGeocoder(CachedGeocoder(nominatim))
+        self.suggestions = shared_suggestions()
+        self.overpass_tiles = OverpassTileCache(AMENITY_SELECTORS)
+        self.hospital_store = HospitalStore()
+        self.map_cache = MapRenderCache()
+        self.render_worker = MapRenderWorker(self.root, self.map_cache)
+        self.search_scheduler = SearchScheduler(self.root)
+        self.map_file = None
+        self.map_rendering = False
+        self.open_when_ready = False
+        self.search_pipeline = SearchPipeline(self.geolocator, self.overpass_tiles,
+                                              self.hospital_store, AMENITY_SELECTORS,
+                                              router=shared_router())
         
         # Create database of common symptoms and potential diagnoses
         self.symptoms_database = {
@@ -82,17 +183,16 @@ class HospitalExpertSystem:
         self.hospitals_frame = ttk.Frame(self.notebook)  # Add hospitals frame
         self.emergency_frame = ttk.Frame(self.notebook)
         
-        # Add frames to notebook
-        self.notebook.add(self.home_frame, text="Home")
-        self.notebook.add(self.diagnosis_frame, text="Symptom Checker")
-        self.notebook.add(self.hospitals_frame, text="Find Hospitals")  # Add hospitals tab
-        self.notebook.add(self.emergency_frame, text="Emergency")
+        # Add frames to notebook; each tab's widgets are built when it is first shown
+        self.tabs = LazyTabs(self.notebook)
+        self.tabs.add(self.home_frame, self.setup_home_tab, text="Home")
+        self.tabs.add(self.diagnosis_frame, self.setup_diagnosis_tab, text="Symptom Checker")
+        self.tabs.add(self.hospitals_frame, self.setup_hospitals_tab, text="Find Hospitals")
+        self.tabs.add(self.emergency_frame, self.setup_emergency_tab, text="Emergency")
         
-        # Set up each tab
-        self.setup_home_tab()
-        self.setup_diagnosis_tab()
-        self.setup_hospitals_tab()  # Set up hospitals tab
-        self.setup_emergency_tab()
+        if PREBUILD_TABS:
+            # Most likely next tabs first
+            self.tabs.prebuild([self.hospitals_frame, self.diagnosis_frame, self.emergency_frame])
         
     def setup_home_tab(self):
         # Welcome message and system overview
@@ -232,6 +332,7 @@ class HospitalExpertSystem:
         self.location_var = tk.StringVar()
         self.location_entry = tk.Entry(search_frame, textvariable=self.location_var, width=30, font=("Arial", 11))
         self.location_entry.grid(row=0, column=1, padx=10, pady=5)
+        self.location_autocomplete = Autocomplete(self.location_entry, self.suggestions, shared_network_suggester())
         
         # Use current location button
         current_loc_btn = tk.Button(search_frame, text="Use Current Location", command=self.get_current_location,
@@ -260,34 +361,31 @@ class HospitalExpertSystem:
                              font=("Arial", 11), bg="#2196F3", fg="white", padx=10, pady=5)
         search_btn.grid(row=3, column=1, padx=10, pady=10)
         
+        # The full map is still written for the browser, but only opened on request
+        browser_btn = tk.Button(search_frame, text="Open in Browser", command=self.open_map_in_browser,
+                              font=("Arial", 10), bg="#607D8B", fg="white")
+        browser_btn.grid(row=3, column=2, padx=10, pady=10)
+        
         # Results frame
         results_frame = tk.LabelFrame(main_frame, text="Nearby Hospitals", font=("Arial", 12, "bold"), bg="#f0f0f0")
         results_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Create a map placeholder
+        # Search status above the embedded map
         self.map_placeholder = tk.Label(results_frame, text="Enter your location and click 'Find Hospitals' to see results", 
-                                      font=("Arial", 12), bg="#f0f0f0", height=15)
-        self.map_placeholder.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+                                      font=("Arial", 12), bg="#f0f0f0")
+        self.map_placeholder.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        self.map_view = MapView(results_frame, height=260)
+        self.map_view.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Create a frame for hospital listings
         self.hospital_list_frame = tk.Frame(results_frame, bg="#f0f0f0")
         self.hospital_list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        # Create scrollable area for hospital listings
-        self.hospital_canvas = tk.Canvas(self.hospital_list_frame, bg="#f0f0f0")
-        scrollbar = ttk.Scrollbar(self.hospital_list_frame, orient="vertical", command=self.hospital_canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.hospital_canvas)
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.hospital_canvas.configure(scrollregion=self.hospital_canvas.bbox("all"))
-        )
-        
-        self.hospital_canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.hospital_canvas.configure(yscrollcommand=scrollbar.set)
-        
-        self.hospital_canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        # Only the listing rows in view exist as widgets; they are reused while scrolling
+        self.hospital_list = VirtualList(self.hospital_list_frame, LISTING_ROW_HEIGHT,
+                                         self.make_listing_row, self.fill_listing_row, bg="#f0f0f0")
+        self.hospital_list.pack(fill="both", expand=True)
                 
     def setup_emergency_tab(self):
         # Main frame
@@ -395,7 +493,7 @@ class HospitalExpertSystem:
         """
         try:
             # Here we're using a public IP geolocation API
-            response = requests.get('https://ipinfo.io/json')
+            response = shared_client().get(IPINFO_URL, timeout=(CONNECT_TIMEOUT, IPINFO_TIMEOUT))
             if response.status_code == 200:
                 data = response.json()
                 if 'loc' in data:
@@ -425,262 +523,245 @@ class HospitalExpertSystem:
             messagebox.showinfo("Input Required", "Please enter your location.")
             return
         
-        # Try to geocode the location
-        try:
-            geolocator = Nominatim(user_agent="hospital_expert_system")
-            loc = geolocator.geocode(location)
+        # Get radius and specialty
+        radius = int(float(self.radius_var.get()) * 1000)  # Convert to meters
+        specialty = self.specialty_var.get()
+        
+        # Show loading message
+        self.map_placeholder.config(text="Searching for hospitals...")
+        
+        def search(job):
+            # Geocoding overlaps with a speculative Overpass fetch, and the
+            # elements are streamed through the vectorized distance stage
+            # into a bounded heap; a newer search stops this one at the next batch
+            result = self.search_pipeline.run(
+                location, radius, MAX_HOSPITAL_RESULTS,
+                predicate=lambda h: self.matches_specialty(h.get("tags", {}), specialty),
+                progress=lambda selector: job.report(self.show_search_progress, selector.seen))
+            job.check()
             
-            if loc:
-                self.user_latitude = loc.latitude
-                self.user_longitude = loc.longitude
-                
-                # Clear previous hospital listings
-                for widget in self.scrollable_frame.winfo_children():
-                    widget.destroy()
-                
-                # Show loading message
-                self.map_placeholder.config(text="Searching for hospitals...")
-                self.root.update()
-                
-                # Get radius and specialty
-                radius = int(float(self.radius_var.get()) * 1000)  # Convert to meters
-                specialty = self.specialty_var.get()
-                
-                # Fetch hospitals
-                hospitals = self.get_nearby_hospitals(radius, specialty)
-                
-                if hospitals:
-                    # Update map
-                    self.generate_hospital_map(hospitals)
-                    
-                    # Update hospital listings
-                    self.update_hospital_listings(hospitals)
-                    
-                    # Update map placeholder
-                    self.map_placeholder.config(text=f"Found {len(hospitals)} hospitals near {location}. Map opened in browser.")
-                else:
-                    self.map_placeholder.config(text=f"No hospitals found near {location}. Try increasing your search radius.")
-            else:
-                messagebox.showinfo("Location Not Found", "Could not find the specified location. Please try again.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error finding hospitals: {str(e)}")
+            # Full records are only built for the survivors
+            hospitals = [self.describe_hospital(hospital, distance, eta)
+                         for (distance, hospital), eta in zip(result.nearest, result.etas)]
+            return result, hospitals
+        
+        # Results of a superseded search are never delivered
+        self.search_scheduler.submit(search, lambda found: self.show_search_results(location, radius, *found),
+                                     self.show_search_error)
+    
+    def show_search_progress(self, received):
+        self.map_placeholder.config(text=f"Searching for hospitals... {received} facilities received")
+    
+    def show_search_error(self, error):
+        self.map_placeholder.config(text="Error finding hospitals.")
+        messagebox.showerror("Error", f"Error finding hospitals: {str(error)}")
     
-    def get_nearby_hospitals(self, radius=5000, specialty=None):
+    def show_search_results(self, location, radius, result, hospitals):
         """
-        Fetch nearby hospitals using Overpass API (OpenStreetMap data).
+        Display a finished search; runs on the Tk thread.
         """
-        if not self.user_latitude or not self.user_longitude:
-            return []
+        if result.location is None:
+            self.map_placeholder.config(text=f"Could not find {location}.")
+            messagebox.showinfo("Location Not Found", "Could not find the specified location. Please try again.")
+            return
+        self.user_latitude = result.location.latitude
+        self.user_longitude = result.location.longitude
+        self.suggestions.remember(location)
+        
+        if hospitals:
+            # The browser map is written in the background while the listings are built here
+            self.generate_hospital_map(hospitals, self.user_latitude, self.user_longitude, radius)
+            with result.timings.stage("listing"):
+                self.update_hospital_listings(hospitals)
+                self.map_view.show(self.user_latitude, self.user_longitude,
+                                   [(hospital["lat"], hospital["lon"], self.marker_color(hospital),
+                                     f"{hospital['name']} ({hospital['distance']:.1f} km)", hospital["id"])
+                                    for hospital in hospitals], radius_m=radius)
+            
+            # Update map placeholder
+            self.map_placeholder.config(text=f"Found {len(hospitals)} hospitals near {location}.")
+        else:
+            # Clear previous hospital listings
+            self.hospital_list.set_items([])
+            self.map_file = None
+            self.map_rendering = False
+            self.render_worker.cancel()
+            self.map_view.show(self.user_latitude, self.user_longitude, [], radius_m=radius)
+            self.map_placeholder.config(text=f"No hospitals found near {location}. Try increasing your search radius.")
+        print(f"Search timings: {result.timings.summary()}")
+    
+    def matches_specialty(self, tags, specialty):
+        """
+        Check an Overpass element's tags against the specialty filter.
+        """
+        if not specialty or specialty == "General Medicine":
+            return True
+        hospital_specialties = tags.get("healthcare:speciality", "").split(";")
+        hospital_specialties.append(tags.get("amenity", "").capitalize())
+        return specialty.lower() in " ".join(hospital_specialties).lower()
+    
+    def describe_hospital(self, hospital, distance, eta=None):
+        """
+        Build the listing record for one Overpass element; eta is the driving
+        time in seconds when a road graph is available.
+        """
+        # Get coordinates (handling both node and way/relation with center)
+        lat = hospital.get("lat") or hospital.get("center", {}).get("lat")
+        lon = hospital.get("lon") or hospital.get("center", {}).get("lon")
         
-        # Construct Overpass API query
-        overpass_url = "https://overpass-api.de/api/interpreter"
+        # Get facility name
+        name = hospital.get("tags", {}).get("name", "Unknown Hospital")
         
-        # Base query for hospitals and clinics
-        query = f"""
-        [out:json];
-        (
-          node["amenity"="hospital"](around:{radius},{self.user_latitude},{self.user_longitude});
-          way["amenity"="hospital"](around:{radius},{self.user_latitude},{self.user_longitude});
-          relation["amenity"="hospital"](around:{radius},{self.user_latitude},{self.user_longitude});
-          node["amenity"="clinic"](around:{radius},{self.user_latitude},{self.user_longitude});
-          way["amenity"="clinic"](around:{radius},{self.user_latitude},{self.user_longitude});
-          relation["amenity"="clinic"](around:{radius},{self.user_latitude},{self.user_longitude});
-        );
-        out center;
-        """
+        # Get address information
+        address_parts = []
+        tags = hospital.get("tags", {})
         
-        try:
-            # Send request to Overpass API
-            response = requests.get(overpass_url, params={"data": query})
-            response.raise_for_status()  # Raise exception for HTTP errors
-            
-            data = response.json()
-            hospitals = data.get("elements", [])
-            
-            # Process hospital data
-            processed_hospitals = []
-            for hospital in hospitals:
-                # Get coordinates (handling both node and way/relation with center)
-                lat = hospital.get("lat") or hospital.get("center", {}).get("lat")
-                lon = hospital.get("lon") or hospital.get("center", {}).get("lon")
-                
-                if lat and lon:
-                    # Get facility name
-                    name = hospital.get("tags", {}).get("name", "Unknown Hospital")
-                    
-                    # Calculate distance
-                    hospital_coords = (lat, lon)
-                    user_coords = (self.user_latitude, self.user_longitude)
-                    distance = geodesic(user_coords, hospital_coords).kilometers
-                    
-                    # Get address information
-                    address_parts = []
-                    tags = hospital.get("tags", {})
-                    
-                    # Try full address first
-                    if "addr:full" in tags:
-                        address_parts.append(tags["addr:full"])
-                    else:
-                        # Otherwise build from components
-                        addr_components = [
-                            tags.get("addr:housenumber", ""),
-                            tags.get("addr:street", ""),
-                            tags.get("addr:suburb", ""),
-                            tags.get("addr:city", ""),
-                            tags.get("addr:postcode", "")
-                        ]
-                        address_parts = [part for part in addr_components if part]
-                    
-                    address = ", ".join(address_parts) if address_parts else "Address unavailable"
-                    
-                    # Get other details
-                    phone = tags.get("phone", tags.get("contact:phone", "Not available"))
-                    website = tags.get("website", tags.get("contact:website", ""))
-                    emergency = "Yes" if tags.get("emergency") == "yes" else "No" if tags.get("emergency") == "no" else "Unknown"
-                    
-                    # Get healthcare specialties
-                    hospital_specialties = []
-                    if "healthcare:speciality" in tags:
-                        specs = tags["healthcare:speciality"].split(";")
-                        hospital_specialties.extend(specs)
-                    
-                    # Add facility type as a specialty
-                    facility_type = tags.get("amenity", "").capitalize()
-                    if facility_type:
-                        hospital_specialties.append(facility_type)
-                    
-                    # Add to list if it matches the specialty filter or if no filter is applied
-                    if not specialty or specialty == "General Medicine" or specialty.lower() in " ".join(hospital_specialties).lower():
-                        processed_hospitals.append({
-                            "name": name,
-                            "lat": lat,
-                            "lon": lon,
-                            "distance": distance,
-                            "address": address,
-                            "phone": phone,
-                            "website": website,
-                            "emergency": emergency,
-                            "specialties": hospital_specialties,
-                            "type": facility_type
-                        })
-            
-            # Sort by distance
-            processed_hospitals.sort(key=lambda h: h["distance"])
-            return processed_hospitals
-            
-        except Exception as e:
-            print(f"Error fetching hospitals: {e}")
-            return []
+        # Try full address first
+        if "addr:full" in tags:
+            address_parts.append(tags["addr:full"])
+        else:
+            # Otherwise build from components
+            addr_components = [
+                tags.get("addr:housenumber", ""),
+                tags.get("addr:street", ""),
+                tags.get("addr:suburb", ""),
+                tags.get("addr:city", ""),
+                tags.get("addr:postcode", "")
+            ]
+            address_parts = [part for part in addr_components if part]
+        
+        address = ", ".join(address_parts) if address_parts else "Address unavailable"
+        
+        # Get other details
+        phone = tags.get("phone", tags.get("contact:phone", "Not available"))
+        website = tags.get("website", tags.get("contact:website", ""))
+        emergency = "Yes" if tags.get("emergency") == "yes" else "No" if tags.get("emergency") == "no" else "Unknown"
+        
+        # Get healthcare specialties
+        hospital_specialties = []
+        if "healthcare:speciality" in tags:
+            specs = tags["healthcare:speciality"].split(";")
+            hospital_specialties.extend(specs)
+        
+        # Add facility type as a specialty
+        facility_type = tags.get("amenity", "").capitalize()
+        if facility_type:
+            hospital_specialties.append(facility_type)
+        
+        return {
+            "id": element_key(hospital),
+            "name": name,
+            "lat": lat,
+            "lon": lon,
+            "distance": distance,
+            "eta": eta,
+            "address": address,
+            "phone": phone,
+            "website": website,
+            "emergency": emergency,
+            "specialties": hospital_specialties,
+            "type": facility_type
+        }
     
-    def generate_hospital_map(self, hospitals):
+    def marker_color(self, hospital):
+        if hospital["emergency"] == "Yes":
+            return "darkred"
+        return "red" if hospital["type"] == "Hospital" else "green"
+    
+    def open_map_in_browser(self):
         """
-        Generate an interactive map with hospital locations and save to HTML file.
+        Open the full interactive map of the last search in the browser.
+        """
+        if self.map_file:
+            webbrowser.open('file://' + self.map_file)
+        elif self.map_rendering:
+            # map_ready opens it
+            self.open_when_ready = True
+        else:
+            messagebox.showinfo("No Results", "Search for hospitals first.")
+    
+    def generate_hospital_map(self, hospitals, latitude, longitude, radius):
         """
-        # Create a map centered at the user's location
-        m = folium.Map(location=[self.user_latitude, self.user_longitude], zoom_start=13)
+        Generate an interactive map with hospital locations and save to HTML file.
         
-        # Add marker for user's location
-        folium.Marker(
-            [self.user_latitude, self.user_longitude],
-            popup="Your Location",
-            tooltip="Your Location",
-            icon=folium.Icon(color="blue", icon="home", prefix="fa")
-        ).add_to(m)
-        
-        # Create a marker cluster for hospitals
-        marker_cluster = MarkerCluster().add_to(m)
-        
-        # Add markers for hospitals
-        for hospital in hospitals:
-            # Determine icon color based on hospital type
-            color = "red" if hospital["type"] == "Hospital" else "green"
-            if hospital["emergency"] == "Yes":
-                color = "darkred"
-            
-            # Create popup with hospital information
-            popup_html = f"""
-            <div style="width:250px">
-                <h4>{hospital['name']}</h4>
-                <b>Distance:</b> {hospital['distance']:.2f} km<br>
-                <b>Address:</b> {hospital['address']}<br>
-                <b>Phone:</b> {hospital['phone']}<br>
-                <b>Emergency:</b> {hospital['emergency']}<br>
-                <b>Specialties:</b> {', '.join(hospital['specialties']) if hospital['specialties'] else 'General'}<br>
-                {f'<a href="{hospital["website"]}" target="_blank">Visit Website</a>' if hospital["website"] else ''}
-            </div>
-            """
-            
-            folium.Marker(
-                [hospital['lat'], hospital['lon']],
-                popup=folium.Popup(popup_html, max_width=300),
-                tooltip=hospital['name'],
-                icon=folium.Icon(color=color, icon="plus", prefix="fa")
-            ).add_to(marker_cluster)
-        
-        # Draw a circle representing the search radius
-        folium.Circle(
-            location=[self.user_latitude, self.user_longitude],
-            radius=float(self.radius_var.get()) * 1000,  # Convert to meters
-            color='blue',
-            fill=True,
-            fill_opacity=0.1
-        ).add_to(m)
-        
-        # Save map to HTML file
-        map_filename = "hospital_map.html"
-        m.save(map_filename)
-        
-        # Open map in default browser
-        webbrowser.open('file://' + os.path.realpath(map_filename))
+        The map is built and saved on the render worker (an identical earlier
+        search reuses its file) and map_ready is called when it is written;
+        starting a newer search cancels it.
+        """
+        if MAP_RENDERER == "geojson":
+            kind, build = "expert_system_geojson", GeoJSONMap
+        else:
+            kind, build = "expert_system", build_folium_map
+        self.map_file = None
+        self.map_rendering = True
+        self.open_when_ready = False
+        self.render_worker.submit(kind, (latitude, longitude), radius, hospitals,
+                                  lambda: build(hospitals, latitude, longitude, radius), self.map_ready)
+    
+    def map_ready(self, map_file):
+        self.map_file = map_file
+        self.map_rendering = False
+        if self.open_when_ready:
+            self.open_when_ready = False
+            webbrowser.open('file://' + map_file)
     
     def update_hospital_listings(self, hospitals):
         """
-        Update the hospital listings in the scrollable frame.
+        Update the hospital listings in the scrollable list.
         """
-        # Clear previous listings
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-        
-        # Create a listing for each hospital
-        for i, hospital in enumerate(hospitals):
-            # Create a frame for this hospital
-            hospital_frame = tk.Frame(self.scrollable_frame, bg="#f5f5f5", bd=1, relief=tk.RIDGE)
-            hospital_frame.pack(fill=tk.X, padx=5, pady=5, expand=True)
-            
-            # Hospital name
-            name_label = tk.Label(hospital_frame, text=hospital['name'], font=("Arial", 12, "bold"), bg="#f5f5f5")
-            name_label.pack(anchor="w", padx=10, pady=(10, 5))
-            
-            # Hospital type and emergency status
-            type_text = f"{hospital['type']} • "
-            type_text += "Emergency Services Available" if hospital['emergency'] == "Yes" else "No Emergency Services"
-            
-            type_label = tk.Label(hospital_frame, text=type_text, font=("Arial", 10), bg="#f5f5f5", fg="#555555")
-            type_label.pack(anchor="w", padx=10)
-            
-            # Distance
-            distance_label = tk.Label(hospital_frame, text=f"Distance: {hospital['distance']:.2f} km", font=("Arial", 10), bg="#f5f5f5")
-            distance_label.pack(anchor="w", padx=10, pady=2)
-            
-            # Address
-            address_label = tk.Label(hospital_frame, text=f"Address: {hospital['address']}", font=("Arial", 10), bg="#f5f5f5", wraplength=400, justify=tk.LEFT)
-            address_label.pack(anchor="w", padx=10, pady=2)
-            
-            # Phone
-            phone_label = tk.Label(hospital_frame, text=f"Phone: {hospital['phone']}", font=("Arial", 10), bg="#f5f5f5")
-            phone_label.pack(anchor="w", padx=10, pady=2)
-            
-            # Specialties
-            specialties_text = f"Specialties: {', '.join(hospital['specialties']) if hospital['specialties'] else 'General'}"
-            specialties_label = tk.Label(hospital_frame, text=specialties_text, font=("Arial", 10), bg="#f5f5f5", wraplength=400, justify=tk.LEFT)
-            specialties_label.pack(anchor="w", padx=10, pady=2)
-            
-            # Website button if available
-            if hospital['website']:
-                website_btn = tk.Button(hospital_frame, text="Visit Website", 
-                                    command=lambda url=hospital['website']: webbrowser.open(url),
-                                    font=("Arial", 9), bg="#2196F3", fg="white")
-                website_btn.pack(anchor="w", padx=10, pady=(5, 10))
+        self.hospital_list.set_items(hospitals)
+    
+    def make_listing_row(self, parent):
+        """
+        Build one reusable listing row; fill_listing_row shows a hospital in it.
+        """
+        row = tk.Frame(parent, bg="#f0f0f0")
+        hospital_frame = tk.Frame(row, bg="#f5f5f5", bd=1, relief=tk.RIDGE)
+        hospital_frame.pack(fill=tk.BOTH, padx=5, pady=5, expand=True)
+        
+        # Hospital name
+        row.name_label = tk.Label(hospital_frame, font=("Arial", 12, "bold"), bg="#f5f5f5")
+        row.name_label.pack(anchor="w", padx=10, pady=(10, 5))
+        
+        # Hospital type and emergency status
+        row.type_label = tk.Label(hospital_frame, font=("Arial", 10), bg="#f5f5f5", fg="#555555")
+        row.type_label.pack(anchor="w", padx=10)
+        
+        row.distance_label = tk.Label(hospital_frame, font=("Arial", 10), bg="#f5f5f5")
+        row.distance_label.pack(anchor="w", padx=10, pady=2)
+        row.address_label = tk.Label(hospital_frame, font=("Arial", 10), bg="#f5f5f5", wraplength=400, justify=tk.LEFT)
+        row.address_label.pack(anchor="w", padx=10, pady=2)
+        row.phone_label = tk.Label(hospital_frame, font=("Arial", 10), bg="#f5f5f5")
+        row.phone_label.pack(anchor="w", padx=10, pady=2)
+        row.specialties_label = tk.Label(hospital_frame, font=("Arial", 10), bg="#f5f5f5", wraplength=400, justify=tk.LEFT)
+        row.specialties_label.pack(anchor="w", padx=10, pady=2)
+        
+        # Website button, shown only for hospitals that have one
+        row.website_btn = tk.Button(hospital_frame, text="Visit Website", font=("Arial", 9), bg="#2196F3", fg="white")
+        return row
+    
+    def fill_listing_row(self, row, hospital):
+        row.name_label.config(text=hospital['name'])
+        
+        type_text = f"{hospital['type']} • "
+        type_text += "Emergency Services Available" if hospital['emergency'] == "Yes" else "No Emergency Services"
+        row.type_label.config(text=type_text)
+        
+        distance_text = f"Distance: {hospital['distance']:.2f} km"
+        if hospital['eta'] is not None:
+            distance_text += f" • about {format_eta(hospital['eta'])} by road"
+        row.distance_label.config(text=distance_text)
+        
+        row.address_label.config(text=f"Address: {hospital['address']}")
+        row.phone_label.config(text=f"Phone: {hospital['phone']}")
+        specialties_text = f"Specialties: {', '.join(hospital['specialties']) if hospital['specialties'] else 'General'}"
+        row.specialties_label.config(text=specialties_text)
+        
+        if hospital['website']:
+            row.website_btn.config(command=lambda url=hospital['website']: webbrowser.open(url))
+            row.website_btn.pack(anchor="w", padx=10, pady=(5, 10))
+        else:
+            row.website_btn.pack_forget()
     
     def check_diagnosis(self):
         """
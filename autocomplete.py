@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import bisect
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from geocode_cache import CACHE_DIR, normalize_query
+from gazetteer import shared_gazetteer
+from http_client import shared_client, CONNECT_TIMEOUT
+
+HISTORY_PATH = os.path.join(CACHE_DIR, "search_history.json")
+MAX_HISTORY = 200                 # Past searches remembered for suggestions
+MAX_SUGGESTIONS = 8
+DEBOUNCE_MS = 200                 # Typing pause before suggestions are looked up
+
+# Nominatim's usage policy forbids as-you-type requests, so network
+# suggestions come from Photon (built for autocomplete); override with
+# MEDILOCATOR_SUGGEST_URL, or set it empty to stay offline
+SUGGEST_URL = os.environ.get("MEDILOCATOR_SUGGEST_URL", "https://photon.komoot.io/api/")
+MIN_NETWORK_CHARS = 3             # Shorter prefixes only use local suggestions
+SUGGEST_TIMEOUT = 5
+SUGGEST_TTL = 24 * 3600           # Seconds a network answer is reused
+SUGGEST_CACHE_ENTRIES = 512
+
+
+class SuggestionIndex:
+    """
+    In-memory prefix index of past searches and gazetteer places.
+
+    Past searches are kept in a sorted list of normalized keys (bisect finds
+    every key with a prefix) and saved to HISTORY_PATH, so they are shared
+    between the apps and survive restarts; places come from the gazetteer's
+    trie. No lookup touches the network.
+    """
+
+    def __init__(self, path=HISTORY_PATH, gazetteer=None, max_history=MAX_HISTORY):
+        self.path = path
+        self.gazetteer = gazetteer or shared_gazetteer()
+        self.max_history = max_history
+        self.lock = threading.Lock()
+        self.history = OrderedDict()      # normalized key -> query as typed, oldest first
+        self.keys = []                    # Sorted normalized keys of self.history
+        try:
+            with open(path, encoding="utf-8") as f:
+                for query in json.load(f):
+                    self.history[normalize_query(query)] = query
+        except (OSError, ValueError):
+            pass
+        self.keys = sorted(self.history)
+
+    def remember(self, query):
+        """
+        Record a successful search (any thread).
+        """
+        key = normalize_query(query)
+        if not key:
+            return
+        with self.lock:
+            self.history.pop(key, None)
+            self.history[key] = query.strip()
+            while len(self.history) > self.max_history:
+                self.history.popitem(last=False)
+            self.keys = sorted(self.history)
+            queries = list(self.history.values())
+        try:
+            # Write through a temporary file so another app never reads half a list
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(queries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save search history: {e}")
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        """
+        Past searches starting with text (most recent first), then places.
+        """
+        prefix = normalize_query(text)
+        if not prefix:
+            return []
+        with self.lock:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + "\uffff")
+            matched = self.keys[start:end]
+            order = {key: rank for rank, key in enumerate(reversed(self.history))}
+            suggestions = [self.history[key] for key in sorted(matched, key=order.get)]
+
+        for place in self.gazetteer.complete(prefix, limit):
+            parts = [place.name, place.city or place.state, "India"]
+            suggestions.append(", ".join(unique(part for part in parts if part)))
+        return unique(suggestions)[:limit]
+
+
+def unique(suggestions):
+    seen = set()
+    result = []
+    for suggestion in suggestions:
+        key = normalize_query(suggestion)
+        if key not in seen:
+            seen.add(key)
+            result.append(suggestion)
+    return result
+
+
+class NetworkSuggester:
+    """
+    Place suggestions from a Photon-compatible API, cached and coalesced.
+
+    Answers are kept for SUGGEST_TTL in an LRU; a prefix already being
+    fetched is not requested again, its callers all get the one answer.
+    """
+
+    def __init__(self, url=SUGGEST_URL, client=None):
+        self.url = url
+        self.client = client
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()        # normalized prefix -> (fetched at, suggestions)
+        self.inflight = {}                # normalized prefix -> callbacks waiting for it
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="suggest")
+
+    def cached(self, text):
+        key = normalize_query(text)
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None or time.time() - entry[0] > SUGGEST_TTL:
+                return None
+            self.cache.move_to_end(key)
+            return entry[1]
+
+    def suggest_async(self, text, callback):
+        """
+        Call callback(suggestions) on a worker thread (or right away when cached).
+        """
+        suggestions = self.cached(text)
+        if suggestions is not None:
+            callback(suggestions)
+            return
+        key = normalize_query(text)
+        with self.lock:
+            waiting = self.inflight.get(key)
+            if waiting is not None:
+                waiting.append(callback)
+                return
+            self.inflight[key] = [callback]
+        self.executor.submit(self.fetch, key, text)
+
+    def fetch(self, key, text):
+        suggestions = []
+        try:
+            client = self.client or shared_client()
+            features = client.get_json(self.url, params={"q": text, "limit": MAX_SUGGESTIONS},
+                                       timeout=(CONNECT_TIMEOUT, SUGGEST_TIMEOUT), retries=0).get("features", [])
+            for feature in features:
+                properties = feature.get("properties", {})
+                parts = [properties.get(name) for name in ("name", "city", "state", "country")]
+                suggestions.append(", ".join(unique(part for part in parts if part)))
+            with self.lock:
+                self.cache[key] = (time.time(), suggestions)
+                while len(self.cache) > SUGGEST_CACHE_ENTRIES:
+                    self.cache.popitem(last=False)
+        except (requests.RequestException, ValueError) as e:
+            # Suggestions are optional; local ones are already shown
+            print(f"Location suggestions failed: {e}")
+        with self.lock:
+            callbacks = self.inflight.pop(key, [])
+        for callback in callbacks:
+            callback(suggestions)
+
+
+_shared_index = None
+_shared_network = None
+_shared_lock = threading.Lock()
+
+
+def shared_suggestions():
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = SuggestionIndex()
+        return _shared_index
+
+
+def shared_network_suggester():
+    global _shared_network
+    with _shared_lock:
+        if _shared_network is None and SUGGEST_URL:
+            _shared_network = NetworkSuggester()
+        return _shared_network
+
+
+class Autocomplete:
+    """
+    Suggestion dropdown attached to an existing Entry.
+
+    Lookups run DEBOUNCE_MS after the last keystroke: local suggestions are
+    shown at once and network ones (if fewer than MAX_SUGGESTIONS matched
+    locally) are merged in when they arrive, unless the text has changed
+    since. Up/Down move through the list, Return or a click picks an entry,
+    Escape closes it.
+    """
+
+    def __init__(self, entry, index=None, network=None, on_select=None):
+        self.entry = entry
+        self.index = index or shared_suggestions()
+        self.network = network
+        self.on_select = on_select
+        self.pending = None
+        self.popup = None
+        self.listbox = None
+
+        entry.bind("<KeyRelease>", self.key_released, add="+")
+        entry.bind("<Down>", self.focus_list, add="+")
+        entry.bind("<Escape>", lambda event: self.hide(), add="+")
+        entry.bind("<FocusOut>", lambda event: entry.after(150, self.hide_unless_focused), add="+")
+
+    def key_released(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self.pending is not None:
+            self.entry.after_cancel(self.pending)
+        self.pending = self.entry.after(DEBOUNCE_MS, self.lookup)
+
+    def lookup(self):
+        self.pending = None
+        text = self.entry.get()
+        local = self.index.suggest(text)
+        self.show(local)
+        if self.network is not None and len(local) < MAX_SUGGESTIONS and len(text.strip()) >= MIN_NETWORK_CHARS:
+            def arrived(remote):
+                # Called on a worker thread; the Tk update happens on the Tk thread
+                self.entry.after(0, self.merge, text, local, remote)
+            self.network.suggest_async(text, arrived)
+
+    def merge(self, text, local, remote):
+        if self.entry.get() == text and remote:
+            self.show(unique(local + remote)[:MAX_SUGGESTIONS])
+
+    def show(self, suggestions):
+        if not suggestions:
+            self.hide()
+            return
+        if self.popup is None:
+            self.popup = tk.Toplevel(self.entry)
+            self.popup.overrideredirect(True)
+            self.listbox = tk.Listbox(self.popup, font=self.entry.cget("font"), activestyle="dotbox")
+            self.listbox.pack(fill=tk.BOTH, expand=True)
+            self.listbox.bind("<ButtonRelease-1>", self.choose)
+            self.listbox.bind("<Return>", self.choose)
+            self.listbox.bind("<Escape>", lambda event: self.hide())
+            self.listbox.bind("<FocusOut>", lambda event: self.entry.after(150, self.hide_unless_focused))
+        self.listbox.delete(0, tk.END)
+        for suggestion in suggestions:
+            self.listbox.insert(tk.END, suggestion)
+        self.listbox.config(height=len(suggestions))
+        x = self.entry.winfo_rootx()
+        y = self.entry.winfo_rooty() + self.entry.winfo_height()
+        self.popup.geometry(f"{self.entry.winfo_width()}x{self.listbox.winfo_reqheight()}+{x}+{y}")
+        self.popup.deiconify()
+        self.popup.lift()
+
+    def hide(self):
+        if self.popup is not None:
+            self.popup.withdraw()
+
+    def hide_unless_focused(self):
+        focused = self.entry.focus_get()
+        if focused is not self.entry and focused is not self.listbox:
+            self.hide()
+
+    def focus_list(self, event):
+        if self.popup is not None and self.popup.winfo_viewable():
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+            return "break"
+
+    def choose(self, event):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        text = self.listbox.get(selection[0])
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, text)
+        self.hide()
+        self.entry.focus_set()
+        self.entry.icursor(tk.END)
+        if self.on_select is not None:
+            self.on_select(text)
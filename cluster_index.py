@@ -0,0 +1,143 @@
+import math
+
+CLUSTER_RADIUS_PX = 60            # Points closer than this on screen are merged
+TILE_SIZE = 256                   # Pixels per Web Mercator tile
+MIN_ZOOM = 0
+MAX_ZOOM = 16                     # Above this every point is shown on its own
+
+
+def project(lat, lon):
+    """
+    Web Mercator position of a point in [0, 1] x [0, 1].
+    """
+    sin = math.sin(math.radians(max(-85.0511, min(85.0511, lat))))
+    y = 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+    return lon / 360 + 0.5, min(1.0, max(0.0, y))
+
+
+def unproject(x, y):
+    lat = math.degrees(2 * math.atan(math.exp(math.pi * (1 - 2 * y))) - math.pi / 2)
+    return lat, (x - 0.5) * 360
+
+
+class ClusterIndex:
+    """
+    Hierarchical grid clustering of points, precomputed for every zoom level.
+
+    Works like supercluster: starting from the individual points above
+    max_zoom, each zoom level greedily merges the entries of the level above
+    that lie within CLUSTER_RADIUS_PX of each other on screen (found through a
+    grid with that cell size) into a weighted-centroid cluster. Built once
+    per catalog or result set; a map then only needs the entries of one
+    level inside its view, and no clustering happens in the browser.
+
+    Level entries are [x, y, count, index, expansion_zoom]: index is the
+    point's position in the input for single points and -1 for clusters,
+    expansion_zoom the zoom at which a cluster splits up.
+    """
+
+    def __init__(self, points, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius_px=CLUSTER_RADIUS_PX):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.radius_px = radius_px
+        self.size = 0
+        entries = []
+        for index, (lat, lon) in enumerate(points):
+            x, y = project(lat, lon)
+            entries.append([x, y, 1, index, None])
+            self.size += 1
+
+        self.levels = {max_zoom + 1: entries}
+        # The lowest zoom at which nothing is clustered any more
+        self.leaf_zoom = None
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            entries, merged = self.cluster(entries, zoom)
+            self.levels[zoom] = entries
+            if merged and self.leaf_zoom is None:
+                self.leaf_zoom = zoom + 1
+        if self.leaf_zoom is None:
+            self.leaf_zoom = min_zoom
+
+    def cluster(self, entries, zoom):
+        """
+        Merge the entries of the level above into the entries of this zoom;
+        also returns whether anything was merged.
+        """
+        radius = self.radius_px / (TILE_SIZE * 2 ** zoom)
+        grid = {}
+        for position, entry in enumerate(entries):
+            grid.setdefault((int(entry[0] / radius), int(entry[1] / radius)), []).append(position)
+
+        visited = [False] * len(entries)
+        clustered = []
+        merged = False
+        for position, entry in enumerate(entries):
+            if visited[position]:
+                continue
+            visited[position] = True
+            x, y = entry[0], entry[1]
+            row, col = int(x / radius), int(y / radius)
+            count = entry[2]
+            sum_x, sum_y = x * count, y * count
+            for r in (row - 1, row, row + 1):
+                for c in (col - 1, col, col + 1):
+                    for other in grid.get((r, c), ()):
+                        neighbour = entries[other]
+                        if visited[other] or (neighbour[0] - x) ** 2 + (neighbour[1] - y) ** 2 > radius * radius:
+                            continue
+                        visited[other] = True
+                        count += neighbour[2]
+                        sum_x += neighbour[0] * neighbour[2]
+                        sum_y += neighbour[1] * neighbour[2]
+            if count == entry[2]:
+                # Nothing nearby: carried over unchanged
+                clustered.append(entry)
+            else:
+                merged = True
+                clustered.append([sum_x / count, sum_y / count, count, -1, zoom + 1])
+        return clustered, merged
+
+    def level(self, zoom):
+        return self.levels[max(self.min_zoom, min(int(zoom), self.leaf_zoom))]
+
+    def get_clusters(self, south, west, north, east, zoom):
+        """
+        Entries of the given zoom inside the bounding box, as
+        (lat, lon, count, index, expansion_zoom) tuples.
+        """
+        left, bottom = project(south, west)
+        right, top = project(north, east)
+        results = []
+        for x, y, count, index, expansion in self.level(zoom):
+            if left <= x <= right and top <= y <= bottom:
+                lat, lon = unproject(x, y)
+                results.append((lat, lon, count, index, expansion))
+        return results
+
+    def compact_levels(self, digits=6):
+        """
+        The levels from min_zoom to leaf_zoom for embedding in a page: single
+        points as their index, clusters as [lat, lon, count, expansion_zoom].
+        A level identical to the one above it is left out (use the next
+        higher zoom present); at leaf_zoom and above every point is shown.
+        """
+        compact = {}
+        previous = None
+        for zoom in range(self.leaf_zoom - 1, self.min_zoom - 1, -1):
+            entries = self.levels[zoom]
+            if previous is not None and len(entries) == len(previous):
+                # Levels only ever merge, so equal length means unchanged
+                continue
+            previous = entries
+            level = []
+            for x, y, count, index, expansion in entries:
+                if index >= 0:
+                    level.append(index)
+                else:
+                    lat, lon = unproject(x, y)
+                    level.append([round(lat, digits), round(lon, digits), count, expansion])
+            compact[zoom] = level
+        return compact
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,237 @@
+import math
+import time
+import threading
+import numpy as np
+from spatial_index import KM_PER_DEGREE, haversine_km, HospitalGridIndex
+from geo_distance import haversine_km as haversine_km_array
+from road_routing import eta_cutoff
+
+EMERGENCY_CELL = 0.05             # Degrees per grid cell (about 5.5 km)
+EMERGENCY_PER_CELL = 3            # Emergency departments returned per lookup
+SERVICE_RADIUS_KM = 60            # Cells farther than this from every ER are not stored
+CANDIDATES_PER_CELL = 8           # Straight-line candidates re-ranked by road time
+
+# Without a road graph, travel time is estimated from the straight-line distance
+DETOUR_FACTOR = 1.4
+EMERGENCY_SPEED_KMH = 30
+
+
+def is_emergency(hospital):
+    """
+    True for hospitals with an emergency department (catalog flag or OSM tag).
+    """
+    return hospital.get("emergency") is True or hospital.get("tags", {}).get("emergency") == "yes"
+
+
+def estimated_seconds(distance_km):
+    return distance_km * DETOUR_FACTOR / EMERGENCY_SPEED_KMH * 3600
+
+
+class EmergencyIndex:
+    """
+    Precomputed nearest-emergency-department grid.
+
+    Every grid cell within SERVICE_RADIUS_KM of an emergency-capable hospital
+    stores every emergency department that can be among the per_cell nearest
+    to some point of the cell (all within the per_cell-th distance from the
+    centre plus twice the cell's half-diagonal), so "nearest ER" is a
+    dictionary lookup and a re-rank of a short list, with no network and no
+    search, and the straight-line ranking is exact anywhere in the cell.
+    Times are estimated from straight-line distance until `refine` replaces
+    them with road-network times from the cell centre. Hospitals can be
+    added and removed later; only the affected cells are recomputed.
+    """
+
+    def __init__(self, hospitals, coordinates=HospitalGridIndex.default_coordinates,
+                 key=lambda hospital: hospital["id"], cell_size=EMERGENCY_CELL,
+                 per_cell=EMERGENCY_PER_CELL, service_km=SERVICE_RADIUS_KM):
+        self.coordinates = coordinates
+        self.key = key
+        self.cell_size = cell_size
+        self.per_cell = per_cell
+        self.service_km = service_km
+        self.lock = threading.Lock()
+        self.hospitals = {}
+        self.cells = {}                   # (row, col) -> [(seconds, hospital key, road time?), ...]
+        # The Tk thread adds and removes hospitals while `refine` runs in the
+        # background; self.hospitals and self.cells are only replaced or
+        # changed under self.lock
+
+        start = time.perf_counter()
+        for hospital in hospitals:
+            if is_emergency(hospital):
+                self.hospitals[key(hospital)] = hospital
+        self.rebuild_cells(self.cells_near(self.hospitals.values()))
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def cell_of(self, lat, lon):
+        return int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size))
+
+    def cell_center(self, cell):
+        return (cell[0] + 0.5) * self.cell_size, (cell[1] + 0.5) * self.cell_size
+
+    def half_diagonal_km(self, lat):
+        """
+        Largest centre-to-corner distance of the cells at this latitude (the
+        corner nearer the equator is the farther one).
+        """
+        half = self.cell_size / 2
+        return haversine_km_array(lat, 0.0, lat - np.sign(lat) * half, half)
+
+    def cells_near(self, hospitals):
+        """
+        Grid cells within the service radius of any of the hospitals.
+        """
+        cells = set()
+        for hospital in hospitals:
+            lat, lon = self.coordinates(hospital)
+            dlat = self.service_km / KM_PER_DEGREE
+            dlon = dlat / max(math.cos(math.radians(min(89.0, abs(lat) + dlat))), 1e-6)
+            south, west = self.cell_of(lat - dlat, lon - dlon)
+            north, east = self.cell_of(lat + dlat, lon + dlon)
+            rows, cols = np.mgrid[south:north + 1, west:east + 1]
+            distances = haversine_km_array(lat, lon, (rows + 0.5) * self.cell_size, (cols + 0.5) * self.cell_size)
+            inside = distances <= self.service_km
+            cells.update(zip(rows[inside].tolist(), cols[inside].tolist()))
+        return cells
+
+    def rebuild_cells(self, cells, block=16):
+        """
+        Recompute the stored emergency departments of the given cells.
+
+        Cells are processed in blocks of block x block cells; each block is
+        only compared with the ERs that can be stored for one of its cells.
+        """
+        with self.lock:
+            hospitals = dict(self.hospitals)
+        keys = list(hospitals)
+        if not keys:
+            with self.lock:
+                for cell in cells:
+                    self.cells.pop(cell, None)
+            return
+        points = np.array([self.coordinates(hospitals[key]) for key in keys])
+
+        blocks = {}
+        for cell in cells:
+            blocks.setdefault((cell[0] // block, cell[1] // block), []).append(cell)
+
+        updates = {}
+        for (block_row, block_col), members in blocks.items():
+            center_lat = (block_row + 0.5) * block * self.cell_size
+            center_lon = (block_col + 0.5) * block * self.cell_size
+            half_diagonal = haversine_km(center_lat, center_lon, center_lat + block * self.cell_size / 2,
+                                         center_lon + block * self.cell_size / 2)
+            # Cells keep ERs up to two cell half-diagonals beyond the service radius
+            reach = self.service_km + 2 * float(self.half_diagonal_km(0.0))
+            near = np.nonzero(haversine_km_array(center_lat, center_lon, points[:, 0], points[:, 1])
+                              <= reach + half_diagonal)[0]
+            if not len(near):
+                for cell in members:
+                    updates[cell] = []
+                continue
+
+            # Distances from every cell centre in the block to each nearby ER at
+            # once; a point of the cell is at most one half-diagonal from the
+            # centre, so its per_cell nearest ERs are all within the per_cell-th
+            # distance from the centre plus two half-diagonals
+            keep = min(self.per_cell, len(near))
+            centers = (np.array(members) + 0.5) * self.cell_size
+            distances = haversine_km_array(centers[:, :1], centers[:, 1:], points[None, near, 0], points[None, near, 1])
+            slack = 2 * self.half_diagonal_km(centers[:, 0])
+            kth = np.partition(distances, keep - 1, axis=1)[:, keep - 1]
+            bound = np.minimum(kth, self.service_km) + slack
+            for cell, row, limit in zip(members, distances, bound):
+                candidates = np.nonzero(row <= limit)[0]
+                candidates = candidates[np.argsort(row[candidates])]
+                updates[cell] = [(estimated_seconds(row[j]), keys[near[j]], False) for j in candidates.tolist()]
+
+        with self.lock:
+            for cell, entries in updates.items():
+                if entries:
+                    self.cells[cell] = entries
+                else:
+                    self.cells.pop(cell, None)
+
+    def add(self, hospital):
+        """
+        Add or update an emergency department; only cells around it are recomputed.
+        """
+        key = self.key(hospital)
+        previous = self.hospitals.get(key)
+        if not is_emergency(hospital):
+            if previous is not None:
+                self.remove(previous)
+            return
+        with self.lock:
+            self.hospitals[key] = hospital
+        affected = self.cells_near([hospital])
+        if previous is not None:
+            affected |= self.cells_near([previous])
+        self.rebuild_cells(affected)
+
+    def remove(self, hospital):
+        key = self.key(hospital)
+        with self.lock:
+            if self.hospitals.pop(key, None) is None:
+                return
+            affected = {cell for cell in self.cells_near([hospital])
+                        if any(entry[1] == key for entry in self.cells.get(cell, ()))}
+        self.rebuild_cells(affected)
+
+    def refine(self, router):
+        """
+        Replace estimated times with road-network times wherever a road graph
+        covers the cell; meant to run in a background thread after start-up
+        (and again after catalog changes, which fall back to estimates).
+
+        Works on a snapshot and swaps the new tables in under the lock at the
+        end; cells the Tk thread recomputed in the meantime keep their new
+        entries.
+        """
+        with self.lock:
+            snapshot = dict(self.cells)
+            hospitals = list(self.hospitals.values())
+        shortlist_index = HospitalGridIndex(hospitals, coordinates=self.coordinates)
+        refined = {}
+        for cell in snapshot:
+            lat, lon = self.cell_center(cell)
+            graph = router.graph_for(lat, lon)
+            if graph is None:
+                continue
+            # Re-rank a wider straight-line shortlist by road time
+            shortlist = [h for _, h in shortlist_index.nearest(lat, lon, CANDIDATES_PER_CELL)]
+            points = [self.coordinates(h) for h in shortlist]
+            # Stop the search at the slowest plausible drive to the farthest candidate
+            times = graph.travel_times([(lat, lon)], points, eta_cutoff(lat, lon, points))[0]
+            entries = sorted((seconds, self.key(h), True) for seconds, h in zip(times, shortlist) if seconds is not None)
+            if entries:
+                refined[cell] = entries[:self.per_cell]
+
+        with self.lock:
+            cells = dict(self.cells)
+            for cell, entries in refined.items():
+                if cells.get(cell) is snapshot[cell]:
+                    cells[cell] = entries
+            self.cells = cells
+
+    def lookup(self, lat, lon):
+        """
+        Nearest emergency departments for a point as (seconds, distance_km,
+        hospital, by_road) tuples, fastest first; by_road is False when the time
+        is a straight-line estimate. Empty outside the service region.
+        """
+        with self.lock:
+            entries = self.cells.get(self.cell_of(lat, lon), [])
+            hospitals = [(seconds, self.hospitals.get(key), road) for seconds, key, road in entries]
+        results = []
+        for seconds, hospital, road in hospitals:
+            if hospital is not None:
+                distance = haversine_km(lat, lon, *self.coordinates(hospital))
+                # Estimates are redone from the exact point rather than the cell centre
+                results.append((seconds if road else estimated_seconds(distance), distance, hospital, road))
+        results.sort(key=lambda result: result[0])
+        return results[:self.per_cell]
+
+    def __len__(self):
+        return len(self.cells)
@@ -0,0 +1,235 @@
+import os
+import time
+from geocode_cache import CachedLocation, normalize_query
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer_india.tsv")
+
+# Query parts that only name the country and carry no location information
+COUNTRY_NAMES = {"india", "bharat", "in", "ind"}
+
+# Minimum trigram similarity for a fuzzy match to be trusted without the network
+FUZZY_THRESHOLD = 0.6
+
+
+class Place:
+    """
+    One gazetteer entry (a city, a locality inside a city, or a PIN code area).
+    """
+
+    def __init__(self, name, kind, city, state, latitude, longitude, pincode, aliases):
+        self.name = name
+        self.kind = kind
+        self.city = city
+        self.state = state
+        self.latitude = latitude
+        self.longitude = longitude
+        self.pincode = pincode
+        self.aliases = aliases
+
+    @property
+    def address(self):
+        parts = [self.name]
+        if self.city:
+            parts.append(self.city)
+        parts.extend([self.state, self.pincode, "India"])
+        return ", ".join(part for part in parts if part)
+
+    def context_keys(self):
+        """
+        Normalized names a query may use to qualify this place ("Bandra, Mumbai").
+        """
+        return {normalize_query(value) for value in (self.city, self.state, self.pincode) if value}
+
+    def __repr__(self):
+        return f"Place({self.address!r})"
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """
+    Offline index of Indian cities, localities and PIN codes.
+
+    Names and aliases are kept in a trie for prefix lookups and in a trigram
+    index for typo-tolerant matching; PIN codes are an exact dictionary.
+    """
+
+    def __init__(self, path=GAZETTEER_PATH):
+        self.places = []
+        self.by_name = {}
+        self.by_pincode = {}
+        self.trie = {}
+        self.trigram_index = {}
+        self.load(path)
+
+    def load(self, path):
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                name, kind, city, state, lat, lon, pincode, aliases = line.rstrip("\n").split("\t")
+                place = Place(name, kind, city, state, float(lat), float(lon), pincode,
+                              [alias for alias in aliases.split("|") if alias])
+                self.add(place)
+
+    def add(self, place):
+        self.places.append(place)
+        if place.pincode:
+            self.by_pincode.setdefault(place.pincode, []).append(place)
+        for name in [place.name] + place.aliases:
+            key = normalize_query(name)
+            self.by_name.setdefault(key, []).append(place)
+            for gram in trigrams(key):
+                self.trigram_index.setdefault(gram, set()).add(key)
+
+            # Each trie node keeps the places whose names pass through it
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+                node.setdefault("", []).append(place)
+
+    def complete(self, prefix, limit=10):
+        """
+        Places whose name or alias starts with the prefix, cities first.
+        """
+        node = self.trie
+        for char in normalize_query(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        matches = []
+        for place in sorted(node.get("", []), key=lambda p: (p.kind != "city", p.name)):
+            if place not in matches:
+                matches.append(place)
+            if len(matches) == limit:
+                break
+        return matches
+
+    def fuzzy(self, text, threshold=FUZZY_THRESHOLD):
+        """
+        Return (score, name_key) pairs whose trigram similarity is at least threshold.
+        """
+        grams = trigrams(text)
+        counts = {}
+        for gram in grams:
+            for key in self.trigram_index.get(gram, ()):
+                counts[key] = counts.get(key, 0) + 1
+        scored = []
+        for key, shared in counts.items():
+            score = 2 * shared / (len(grams) + len(trigrams(key)))
+            if score >= threshold:
+                scored.append((score, key))
+        scored.sort(reverse=True)
+        return scored
+
+    def candidates(self, text):
+        """
+        Places matching one normalized query part: exact, unique prefix, then fuzzy.
+        """
+        if text in self.by_name:
+            return self.by_name[text]
+        if text.isdigit():
+            return self.by_pincode.get(text, [])
+
+        prefixed = self.complete(text, limit=2)
+        if len(prefixed) == 1 and len(text) >= 4:
+            return prefixed
+
+        scored = self.fuzzy(text)
+        # Only accept a fuzzy match that clearly beats the runner-up
+        if scored and (len(scored) == 1 or scored[0][0] - scored[1][0] >= 0.1):
+            return self.by_name[scored[0][1]]
+        return []
+
+    def matches_context(self, place, part):
+        keys = place.context_keys()
+        if part in keys:
+            return True
+        # Context such as "Bangalore" refers to the parent city by any of its names
+        return any(normalize_query(c.name) in keys for c in self.candidates(part))
+
+    def resolve(self, query):
+        """
+        Resolve a free-text query to a single Place, or None if it is not a confident match.
+        """
+        parts = [normalize_query(part) for part in query.split(",")]
+        parts = [part for part in parts if part and part not in COUNTRY_NAMES]
+        if len(parts) == 1:
+            # Allow "delhi india" and "bandra mumbai" without commas
+            tokens = [token for token in parts[0].split() if token not in COUNTRY_NAMES]
+            parts = [" ".join(tokens)] if tokens else []
+            if parts and parts[0] not in self.by_name:
+                for split in range(len(tokens) - 1, 0, -1):
+                    head = " ".join(tokens[:split])
+                    if head in self.by_name:
+                        parts = [head, " ".join(tokens[split:])]
+                        break
+        if not parts:
+            return None
+
+        primary, context = parts[0], parts[1:]
+        places = self.candidates(primary)
+        places = [place for place in places
+                  if all(self.matches_context(place, part) for part in context)]
+        if len(places) > 1:
+            # "Delhi" is both a city and a parent of localities; prefer the city
+            cities = [place for place in places if place.kind == "city"]
+            places = cities or places
+        if len({(p.latitude, p.longitude) for p in places}) == 1:
+            return places[0]
+        return None
+
+
+class GazetteerGeocoder:
+    """
+    Geocoder that answers from the offline gazetteer and only calls the
+    wrapped geocoder (normally the cached Nominatim) for misses.
+    """
+
+    def __init__(self, fallback, gazetteer=None):
+        self.fallback = fallback
+        self.gazetteer = gazetteer or shared_gazetteer()
+        self.local_hits = 0
+
+    def geocode(self, query, **kwargs):
+        if not kwargs:
+            place = self.gazetteer.resolve(query)
+            if place is not None:
+                self.local_hits += 1
+                return CachedLocation(place.latitude, place.longitude, place.address)
+        return self.fallback.geocode(query, **kwargs)
+
+    def stats(self):
+        stats = dict(self.fallback.stats()) if hasattr(self.fallback, "stats") else {}
+        stats["gazetteer_hits"] = self.local_hits
+        return stats
+
+
+_shared_gazetteer = None
+
+
+def shared_gazetteer():
+    """
+    Load the bundled gazetteer once per process.
+    """
+    global _shared_gazetteer
+    if _shared_gazetteer is None:
+        _shared_gazetteer = Gazetteer()
+    return _shared_gazetteer
+
+
+if __name__ == "__main__":
+    gazetteer = shared_gazetteer()
+    queries = ["Delhi, India", "Bangalore", "Koramangala, Bangalore", "banglore",
+               "400050", "Bandra Mumbai", "Mumbia", "Apollo Hospital, Chennai"]
+    start = time.perf_counter()
+    for _ in range(1000):
+        for query in queries:
+            gazetteer.resolve(query)
+    per_query = (time.perf_counter() - start) / (1000 * len(queries)) * 1e6
+    for query in queries:
+        print(f"{query!r:32} -> {gazetteer.resolve(query)}")
+    print(f"{len(gazetteer.places)} places, {per_query:.1f} us per query")
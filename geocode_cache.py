@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Shared by all three apps so a city geocoded in one is cached for the others
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".medilocator")
+GEOCODE_CACHE_PATH = os.path.join(CACHE_DIR, "geocode_cache.sqlite3")
+
+GEOCODE_TTL = 30 * 24 * 3600       # Successful lookups are kept for 30 days
+NOT_FOUND_TTL = 24 * 3600          # "Not found" answers are retried after a day
+MAX_CACHE_ENTRIES = 5000
+MEMORY_CACHE_ENTRIES = 256
+
+
+def normalize_query(query):
+    """
+    Build the cache key for a free-text location query.
+
+    "  New Delhi,India " and "new delhi india" map to the same key.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+
+class CachedLocation:
+    """
+    Minimal stand-in for geopy's Location, as stored in the cache.
+    """
+
+    def __init__(self, latitude, longitude, address):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.address = address
+
+    @property
+    def point(self):
+        return self.latitude, self.longitude
+
+    def __repr__(self):
+        return f"CachedLocation({self.address!r}, ({self.latitude}, {self.longitude}))"
+
+
+class CachedGeocoder:
+    """
+    On-disk LRU cache wrapped around a geopy geolocator.
+
+    Lookups are served from an in-memory LRU first, then from a SQLite file
+    shared between the apps, and only go to the wrapped geolocator on a miss.
+    """
+
+    def __init__(self, geolocator, path=GEOCODE_CACHE_PATH, ttl=GEOCODE_TTL,
+                 not_found_ttl=NOT_FOUND_TTL, max_entries=MAX_CACHE_ENTRIES):
+        self.geolocator = geolocator
+        self.path = path
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.touched = set()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS geocode (
+                key TEXT PRIMARY KEY,
+                latitude REAL,
+                longitude REAL,
+                address TEXT,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used)")
+        self.db.commit()
+
+    def geocode(self, query, **kwargs):
+        """
+        Geocode a query, returning a location with latitude/longitude/address or None.
+        """
+        if kwargs:
+            # Non-default options change the answer, so they bypass the cache
+            return self.geolocator.geocode(query, **kwargs)
+
+        key = normalize_query(query)
+        found, location = self.lookup(key)
+        if found:
+            return location
+
+        with self.lock:
+            self.misses += 1
+        result = self.geolocator.geocode(query)
+        location = None
+        if result is not None:
+            location = CachedLocation(result.latitude, result.longitude, result.address)
+        self.store(key, location)
+        return location
+
+    def lookup(self, key):
+        """
+        Return (found, location) for a normalized key without touching the network.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is None:
+                row = self.db.execute(
+                    "SELECT latitude, longitude, address, fetched_at FROM geocode WHERE key = ?",
+                    (key,)).fetchone()
+                if row is not None:
+                    location = CachedLocation(row[0], row[1], row[2]) if row[2] is not None else None
+                    entry = (location, row[3])
+                    self.remember(key, entry)
+            else:
+                self.memory.move_to_end(key)
+
+            if entry is None or self.expired(entry, now):
+                return False, None
+
+            self.hits += 1
+            self.touched.add(key)
+            return True, entry[0]
+
+    def expired(self, entry, now):
+        location, fetched_at = entry
+        ttl = self.ttl if location is not None else self.not_found_ttl
+        return now - fetched_at > ttl
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > MEMORY_CACHE_ENTRIES:
+            self.memory.popitem(last=False)
+
+    def store(self, key, location):
+        now = time.time()
+        with self.lock:
+            self.remember(key, (location, now))
+            if location is None:
+                values = (key, None, None, None, now, now)
+            else:
+                values = (key, location.latitude, location.longitude, location.address, now, now)
+            self.db.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)", values)
+            self.flush_touched(now)
+            self.evict()
+            self.db.commit()
+
+    def flush_touched(self, now):
+        # Recency of memory hits is written back in batches rather than per lookup
+        if self.touched:
+            self.db.executemany("UPDATE geocode SET last_used = ? WHERE key = ?",
+                                [(now, key) for key in self.touched])
+            self.touched.clear()
+
+    def evict(self):
+        count = self.db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM geocode WHERE key IN "
+                "(SELECT key FROM geocode ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,))
+
+    def stats(self):
+        """
+        Hit/miss counters and the current on-disk size.
+        """
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+            }
+
+    def close(self):
+        with self.lock:
+            self.flush_touched(time.time())
+            self.db.commit()
+            self.db.close()
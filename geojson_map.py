@@ -0,0 +1,267 @@
+import os
+import math
+import sys
+import json
+import time
+import random
+import tempfile
+from road_routing import format_eta
+from spatial_index import KM_PER_DEGREE
+from cluster_index import ClusterIndex
+
+LEAFLET_JS = "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"
+LEAFLET_CSS = "https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css"
+COORDINATE_DIGITS = 6             # About 0.1 m; more digits only grow the file
+
+# One page for every result set: the hospitals are a single GeoJSON
+# FeatureCollection plus their precomputed clusters, and markers/popups are
+# built from them in the browser. Only the clusters and markers in view are
+# drawn, markers are canvas circles and popups are only built when opened,
+# so the page stays fast with thousands of hospitals.
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>__TITLE__</title>
+<link rel="stylesheet" href="__LEAFLET_CSS__">
+<script src="__LEAFLET_JS__"></script>
+<style>
+html, body, #map { width: 100%; height: 100%; margin: 0; }
+.cluster { background: rgba(220, 53, 69, 0.35); border-radius: 50%; }
+.cluster div { margin: 4px; height: calc(100% - 8px); border-radius: 50%; background: rgba(220, 53, 69, 0.8);
+               color: white; font: bold 12px sans-serif; display: flex; align-items: center; justify-content: center; }
+</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+var started = performance.now();
+var view = __VIEW__;
+var hospitals = __HOSPITALS__;
+var clusters = __CLUSTERS__;
+var colors = {hospital: "red", other: "green", emergency: "darkred"};
+
+var map = L.map("map", {preferCanvas: true}).setView(view.center, 13);
+L.tileLayer("https://tile.openstreetmap.org/{z}/{x}/{y}.png", {
+    maxZoom: 19,
+    attribution: "&copy; OpenStreetMap contributors"
+}).addTo(map);
+
+function escapeHtml(value) {
+    return String(value).replace(/[&<>"']/g, function (c) {
+        return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+    });
+}
+
+function popup(p) {
+    return '<div style="width:250px">' +
+        "<h4>" + escapeHtml(p.name) + "</h4>" +
+        "<b>Distance:</b> " + p.distance.toFixed(2) + " km<br>" +
+        "<b>Drive time:</b> " + escapeHtml(p.eta) + "<br>" +
+        "<b>Address:</b> " + escapeHtml(p.address) + "<br>" +
+        "<b>Phone:</b> " + escapeHtml(p.phone) + "<br>" +
+        "<b>Emergency:</b> " + escapeHtml(p.emergency) + "<br>" +
+        "<b>Specialties:</b> " + escapeHtml(p.specialties || "General") + "<br>" +
+        (p.website ? '<a href="' + escapeHtml(p.website) + '" target="_blank">Visit Website</a>' : "") +
+        "</div>";
+}
+
+function color(p) {
+    if (p.emergency === "Yes") return colors.emergency;
+    return p.type === "Hospital" ? colors.hospital : colors.other;
+}
+
+L.marker(view.center).bindPopup("Your Location").bindTooltip("Your Location").addTo(map);
+L.circle(view.center, {radius: view.radius, color: "blue", fill: true, fillOpacity: 0.1}).addTo(map);
+map.fitBounds(view.bounds);
+
+// Clusters were computed per zoom level when the page was written; only the
+// entries of the current level inside the view are drawn
+var markers = {};
+var shown = L.layerGroup().addTo(map);
+
+function hospitalMarker(index) {
+    if (!(index in markers)) {
+        var feature = hospitals.features[index], p = feature.properties, c = color(p);
+        var latlng = [feature.geometry.coordinates[1], feature.geometry.coordinates[0]];
+        markers[index] = L.circleMarker(latlng, {radius: 7, color: c, fillColor: c, fillOpacity: 0.8, weight: 2})
+            .bindPopup(function () { return popup(p); }, {maxWidth: 300})
+            .bindTooltip(escapeHtml(p.name));
+    }
+    return markers[index];
+}
+
+function clusterMarker(entry) {
+    var size = entry[2] < 10 ? 30 : entry[2] < 100 ? 36 : 44;
+    return L.marker([entry[0], entry[1]], {icon: L.divIcon({
+        html: "<div>" + entry[2] + "</div>", className: "cluster", iconSize: [size, size]
+    })}).on("click", function () { map.setView([entry[0], entry[1]], entry[3]); });
+}
+
+function level(zoom) {
+    if (zoom >= clusters.leafZoom) return null;
+    for (var z = Math.max(zoom, clusters.minZoom); z < clusters.leafZoom; z++) {
+        if (clusters.levels[z]) return clusters.levels[z];
+    }
+    return null;
+}
+
+function draw() {
+    var bounds = map.getBounds().pad(0.2), entries = level(map.getZoom());
+    shown.clearLayers();
+    if (entries === null) {
+        entries = [];
+        for (var i = 0; i < hospitals.features.length; i++) entries.push(i);
+    }
+    entries.forEach(function (entry) {
+        if (typeof entry === "number") {
+            var position = hospitals.features[entry].geometry.coordinates;
+            if (bounds.contains([position[1], position[0]])) shown.addLayer(hospitalMarker(entry));
+        } else if (bounds.contains([entry[0], entry[1]])) {
+            shown.addLayer(clusterMarker(entry));
+        }
+    });
+}
+
+map.on("moveend", draw);
+draw();
+console.log(hospitals.features.length + " hospitals drawn in " + (performance.now() - started).toFixed(0) + " ms");
+</script>
+</body>
+</html>
+"""
+
+
+def hospital_features(hospitals):
+    """
+    The hospital records (as built by describe_hospital) as one GeoJSON
+    FeatureCollection carrying exactly the fields shown in the popups.
+    """
+    features = []
+    for hospital in hospitals:
+        features.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [round(hospital["lon"], COORDINATE_DIGITS), round(hospital["lat"], COORDINATE_DIGITS)],
+            },
+            "properties": {
+                "name": hospital["name"],
+                "distance": round(hospital["distance"], 2),
+                "eta": format_eta(hospital.get("eta")),
+                "address": hospital["address"],
+                "phone": hospital["phone"],
+                "emergency": hospital["emergency"],
+                "specialties": ", ".join(hospital["specialties"]),
+                "website": hospital["website"],
+                "type": hospital["type"],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def script_json(value):
+    # Compact JSON that cannot close the surrounding <script> element
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).replace("</", "<\\/")
+
+
+class GeoJSONMap:
+    """
+    Lightweight alternative to a folium map of hospital records.
+
+    Has the same save(path) interface as folium.Map, so it can be passed to
+    MapRenderCache, but the page is a fixed template plus one GeoJSON
+    FeatureCollection instead of a marker and popup per hospital. Clustering
+    is precomputed with ClusterIndex (pass `clusters` to reuse an index built
+    for the same hospitals, e.g. a whole catalog) instead of running in the
+    browser.
+    """
+
+    def __init__(self, hospitals, latitude, longitude, radius, title="Nearby hospitals", clusters=None):
+        self.hospitals = hospitals
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self.title = title
+        self.clusters = clusters
+
+    def bounds(self):
+        # The search circle, so national-scale searches open zoomed out
+        dlat = self.radius / 1000 / KM_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(min(89.0, abs(self.latitude) + dlat))), 1e-6)
+        return [[self.latitude - dlat, self.longitude - dlon], [self.latitude + dlat, self.longitude + dlon]]
+
+    def render(self):
+        clusters = self.clusters or ClusterIndex((hospital["lat"], hospital["lon"]) for hospital in self.hospitals)
+        view = {"center": [self.latitude, self.longitude], "radius": self.radius, "bounds": self.bounds()}
+        levels = {"minZoom": clusters.min_zoom, "leafZoom": clusters.leaf_zoom, "levels": clusters.compact_levels()}
+        return (PAGE_TEMPLATE
+                .replace("__TITLE__", self.title.replace("&", "&amp;").replace("<", "&lt;"))
+                .replace("__LEAFLET_CSS__", LEAFLET_CSS)
+                .replace("__LEAFLET_JS__", LEAFLET_JS)
+                .replace("__VIEW__", script_json(view))
+                .replace("__HOSPITALS__", script_json(hospital_features(self.hospitals)))
+                .replace("__CLUSTERS__", script_json(levels)))
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+
+
+def sample_hospitals(count, latitude=28.6139, longitude=77.2090, seed=0):
+    """
+    Synthetic hospital records shaped like describe_hospital's, for benchmarks.
+    """
+    rng = random.Random(seed)
+    hospitals = []
+    for i in range(count):
+        lat = latitude + rng.uniform(-0.2, 0.2)
+        lon = longitude + rng.uniform(-0.2, 0.2)
+        hospitals.append({
+            "id": f"node/{i}",
+            "name": f"Hospital {i}",
+            "lat": lat,
+            "lon": lon,
+            "distance": rng.uniform(0, 25),
+            "eta": rng.choice([None, rng.uniform(60, 3600)]),
+            "address": f"{rng.randint(1, 200)}, Ring Road, New Delhi, 1100{rng.randint(10, 99)}",
+            "phone": f"+91 11 {rng.randint(20000000, 29999999)}",
+            "website": rng.choice(["", f"https://hospital{i}.example.org"]),
+            "emergency": rng.choice(["Yes", "No", "Unknown"]),
+            "specialties": rng.sample(["Cardiology", "Orthopaedics", "Paediatrics", "Oncology"], 2) + ["Hospital"],
+            "type": rng.choice(["Hospital", "Clinic"]),
+        })
+    return hospitals
+
+
+def benchmark(folium_build, sizes=(100, 1000, 5000)):
+    """
+    Build and save time and file size of the folium renderer (folium_build
+    takes hospitals, latitude, longitude, radius and returns a map) against
+    GeoJSONMap for result sets of each size.
+    """
+    latitude, longitude, radius = 28.6139, 77.2090, 25000
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            hospitals = sample_hospitals(size, latitude, longitude)
+            row = [f"{size:>6} hospitals"]
+            for name, build in (("folium", folium_build), ("geojson", GeoJSONMap)):
+                path = os.path.join(directory, f"{name}-{size}.html")
+                start = time.perf_counter()
+                build(hospitals, latitude, longitude, radius).save(path)
+                elapsed = (time.perf_counter() - start) * 1000
+                row.append(f"{name} {elapsed:7.0f} ms {os.path.getsize(path) / 1024:8.0f} KiB")
+            print(" | ".join(row))
+
+
+def main(argv=None):
+    # Imported here so the module itself does not depend on the app
+    from Hospital_Expert_System import build_folium_map
+
+    sizes = [int(size) for size in (argv if argv is not None else sys.argv[1:])] or (100, 1000, 5000)
+    benchmark(build_folium_map, sizes)
+
+
+if __name__ == "__main__":
+    main()
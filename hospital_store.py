@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import math
+import time
+import sqlite3
+import argparse
+import threading
+from overpass import HOSPITAL_SELECTORS, build_query, bbox_area, fetch_elements, element_position
+from spatial_index import KM_PER_DEGREE, haversine_km
+
+STORE_PATH = os.path.join(os.path.expanduser("~"), ".medilocator", "hospitals.sqlite3")
+
+# Size of the boxes a region is split into, so each Overpass request stays small
+PREFETCH_CHUNK = 0.5
+REFRESH_MAX_AGE = 7 * 24 * 3600
+
+# Bounding boxes (south, west, north, east) that can be prefetched by name
+REGIONS = {
+    "delhi": (28.40, 76.84, 28.89, 77.35),
+    "mumbai": (18.89, 72.77, 19.27, 73.05),
+    "bengaluru": (12.83, 77.46, 13.14, 77.78),
+    "chennai": (12.83, 80.12, 13.23, 80.33),
+    "kolkata": (22.45, 88.25, 22.65, 88.45),
+    "hyderabad": (17.25, 78.30, 17.56, 78.63),
+    "maharashtra": (15.60, 72.60, 22.10, 80.90),
+    "karnataka": (11.50, 74.00, 18.50, 78.60),
+    "tamil-nadu": (8.00, 76.20, 13.60, 80.40),
+}
+
+
+class HospitalStore:
+    """
+    Local SQLite copy of OpenStreetMap hospitals with an R*Tree index.
+
+    Regions are downloaded in bulk with `prefetch`; nearby-hospital queries
+    inside a prefetched region are then answered locally instead of by Overpass.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS elements (
+                id INTEGER PRIMARY KEY,
+                osm_type TEXT NOT NULL,
+                osm_id INTEGER NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                data TEXT NOT NULL,
+                seen_at REAL NOT NULL,
+                UNIQUE (osm_type, osm_id)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS elements_rtree USING rtree (
+                id, min_lat, max_lat, min_lon, max_lon
+            );
+            CREATE TABLE IF NOT EXISTS regions (
+                name TEXT PRIMARY KEY,
+                south REAL NOT NULL,
+                west REAL NOT NULL,
+                north REAL NOT NULL,
+                east REAL NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+        """)
+        self.db.commit()
+        self.regions = self.load_regions()
+
+    def load_regions(self):
+        with self.lock:
+            return self.db.execute(
+                "SELECT name, south, west, north, east, fetched_at FROM regions").fetchall()
+
+    def covers(self, lat, lon, radius_m):
+        """
+        True if the whole search circle lies inside a prefetched region.
+        """
+        dlat = radius_m / 1000 / KM_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(min(89.0, abs(lat) + dlat))), 1e-6)
+        for _, south, west, north, east, _ in self.regions:
+            if south <= lat - dlat and lat + dlat <= north and west <= lon - dlon and lon + dlon <= east:
+                return True
+        return False
+
+    def query(self, lat, lon, radius_m, selectors=HOSPITAL_SELECTORS, inner_radius_m=0):
+        """
+        Elements within radius_m metres of (lat, lon) that match one of the selectors,
+        leaving out those within inner_radius_m (for widening a search).
+        """
+        radius_km = radius_m / 1000
+        inner_km = inner_radius_m / 1000
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(min(89.0, abs(lat) + dlat))), 1e-6)
+        with self.lock:
+            rows = self.db.execute("""
+                SELECT e.lat, e.lon, e.data FROM elements_rtree r
+                JOIN elements e ON e.id = r.id
+                WHERE r.min_lat <= ? AND r.max_lat >= ? AND r.min_lon <= ? AND r.max_lon >= ?
+            """, (lat + dlat, lat - dlat, lon + dlon, lon - dlon)).fetchall()
+
+        results = []
+        for element_lat, element_lon, data in rows:
+            distance = haversine_km(lat, lon, element_lat, element_lon)
+            if distance > radius_km or (inner_km and distance <= inner_km):
+                continue
+            element = json.loads(data)
+            tags = element.get("tags", {})
+            if any(tags.get(key) == value for key, value in selectors):
+                results.append(element)
+        return results
+
+    def upsert(self, elements, seen_at):
+        for element in elements:
+            lat, lon = element_position(element)
+            if not (lat and lon):
+                continue
+            row = self.db.execute("SELECT id FROM elements WHERE osm_type = ? AND osm_id = ?",
+                                  (element["type"], element["id"])).fetchone()
+            data = json.dumps(element, separators=(",", ":"))
+            if row is None:
+                cursor = self.db.execute(
+                    "INSERT INTO elements (osm_type, osm_id, lat, lon, data, seen_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (element["type"], element["id"], lat, lon, data, seen_at))
+                row_id = cursor.lastrowid
+            else:
+                row_id = row[0]
+                self.db.execute("UPDATE elements SET lat = ?, lon = ?, data = ?, seen_at = ? WHERE id = ?",
+                                (lat, lon, data, seen_at, row_id))
+            self.db.execute("INSERT OR REPLACE INTO elements_rtree VALUES (?, ?, ?, ?, ?)",
+                            (row_id, lat, lat, lon, lon))
+
+    def prefetch(self, name, bbox, fetch=fetch_elements, chunk=PREFETCH_CHUNK, progress=None):
+        """
+        Download every hospital and clinic in bbox into the store as region `name`.
+
+        Running it again refreshes the region: updated elements are replaced
+        and elements that disappeared from OpenStreetMap are removed. Removal
+        only happens once every chunk has been fetched completely; if any fetch
+        raises (e.g. OverpassIncomplete for a 200 with a remark), the elements
+        already stored are kept and the region stays due for a refresh.
+        """
+        south, west, north, east = bbox
+        started = time.time()
+        boxes = []
+        lat = south
+        while lat < north:
+            lon = west
+            while lon < east:
+                boxes.append((lat, lon, min(lat + chunk, north), min(lon + chunk, east)))
+                lon += chunk
+            lat += chunk
+
+        count = 0
+        for number, box in enumerate(boxes, 1):
+            elements = fetch(build_query(HOSPITAL_SELECTORS, [bbox_area(*box)]))
+            with self.lock:
+                self.upsert(elements, started)
+                self.db.commit()
+            count += len(elements)
+            if progress:
+                progress(number, len(boxes), count)
+
+        # Only reached when no chunk raised, so every chunk was complete
+        with self.lock:
+            # Anything inside the region that was not seen in this pass is gone upstream
+            self.db.execute("""
+                DELETE FROM elements_rtree WHERE id IN (
+                    SELECT id FROM elements
+                    WHERE seen_at < ? AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?)
+            """, (started, south, north, west, east))
+            self.db.execute("""
+                DELETE FROM elements
+                WHERE seen_at < ? AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?
+            """, (started, south, north, west, east))
+            self.db.execute("INSERT OR REPLACE INTO regions VALUES (?, ?, ?, ?, ?, ?)",
+                            (name, south, west, north, east, time.time()))
+            self.db.commit()
+        self.regions = self.load_regions()
+        return count
+
+    def refresh(self, max_age=REFRESH_MAX_AGE, fetch=fetch_elements, progress=None):
+        """
+        Re-download every region older than max_age seconds; returns the names refreshed.
+        """
+        refreshed = []
+        now = time.time()
+        for name, south, west, north, east, fetched_at in self.load_regions():
+            if now - fetched_at >= max_age:
+                self.prefetch(name, (south, west, north, east), fetch=fetch, progress=progress)
+                refreshed.append(name)
+        return refreshed
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local hospital store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    prefetch_parser = commands.add_parser("prefetch", help="download a region into the store")
+    prefetch_parser.add_argument("region", help="region name, e.g. " + ", ".join(sorted(REGIONS)))
+    prefetch_parser.add_argument("--bbox", help="south,west,north,east for a region not listed above")
+
+    refresh_parser = commands.add_parser("refresh", help="re-download stale regions (run from cron for scheduled refresh)")
+    refresh_parser.add_argument("--max-age-hours", type=float, default=REFRESH_MAX_AGE / 3600,
+                                help="refresh regions older than this (0 refreshes everything)")
+
+    commands.add_parser("regions", help="list prefetched regions")
+    args = parser.parse_args(argv)
+
+    def report(number, total, count):
+        print(f"  chunk {number}/{total}: {count} elements so far")
+
+    store = HospitalStore()
+    if args.command == "prefetch":
+        if args.bbox:
+            bbox = tuple(float(value) for value in args.bbox.split(","))
+        elif args.region.lower() in REGIONS:
+            bbox = REGIONS[args.region.lower()]
+        else:
+            parser.error(f"unknown region {args.region!r}; pass --bbox")
+        count = store.prefetch(args.region.lower(), bbox, progress=report)
+        print(f"Stored {count} elements for {args.region}")
+    elif args.command == "refresh":
+        refreshed = store.refresh(max_age=args.max_age_hours * 3600, progress=report)
+        print("Refreshed: " + (", ".join(refreshed) if refreshed else "nothing was stale"))
+    else:
+        for name, south, west, north, east, fetched_at in store.regions:
+            age = (time.time() - fetched_at) / 3600
+            print(f"{name:15} ({south}, {west}, {north}, {east})  fetched {age:.1f} h ago")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import EmptyPoolError
+from geopy.adapters import BaseSyncAdapter, AdapterHTTPError
+from geopy.exc import GeocoderTimedOut, GeocoderUnavailable, GeocoderServiceError, GeocoderParseError
+
+CONNECT_TIMEOUT = 5               # Seconds to establish a connection
+READ_TIMEOUT = 60                 # Seconds of silence before a read is abandoned
+MAX_RETRIES = 3                   # Extra attempts after the first one
+BACKOFF_BASE = 0.5                # First retry waits up to this many seconds
+BACKOFF_MAX = 10
+POOL_HOSTS = 8                    # Hosts kept in the connection pool
+POOL_PER_HOST = 4                 # Concurrent (and keep-alive) connections per host
+POOL_TIMEOUT = 30                 # Seconds a request waits for a free pooled connection
+LATENCY_SAMPLES = 200
+GEOCODE_TIMEOUT = 10              # Read timeout for geopy geocoders
+IPINFO_TIMEOUT = 10
+
+IPINFO_URL = "https://ipinfo.io/json"
+
+# Responses worth retrying: rate limiting and overloaded or restarting servers
+RETRY_STATUSES = {429, 502, 503, 504}
+
+USER_AGENT = "medilocator/1.0"
+
+
+class EndpointStats:
+    """
+    Latency and error counters for one endpoint (scheme, host and path).
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """
+    "Full jitter" exponential backoff: a random wait in [0, base * 2**attempt].
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after(response):
+    value = response.headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else 0.0
+
+
+class BoundedPool:
+    """
+    Connection pool mixin that waits at most pool_timeout for a free connection.
+    """
+
+    pool_timeout = POOL_TIMEOUT
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(self.pool_timeout if timeout is None else timeout)
+
+
+class BoundedPoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with blocking pools that give up after pool_timeout seconds.
+
+    requests never passes urllib3 a pool timeout, so with pool_block alone a
+    request waits forever behind connections held by stalled responses; here
+    it fails with requests.ConnectionError instead.
+    """
+
+    def __init__(self, pool_timeout=POOL_TIMEOUT, **kwargs):
+        # Set first: HTTPAdapter.__init__ calls init_poolmanager
+        self.pool_timeout = pool_timeout
+        super().__init__(pool_block=True, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        classes = self.poolmanager.pool_classes_by_scheme
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_class.__name__, (BoundedPool, pool_class), {"pool_timeout": self.pool_timeout})
+            for scheme, pool_class in classes.items()
+        }
+
+    def send(self, request, **kwargs):
+        try:
+            return super().send(request, **kwargs)
+        except EmptyPoolError as error:
+            raise requests.ConnectionError(error, request=request)
+
+
+class HttpClient:
+    """
+    One pooled requests.Session shared by every outbound call of the apps.
+
+    Connections are kept alive per host, every request gets connect and
+    read timeouts, and connection errors, timeouts and retryable status
+    codes are retried with jittered exponential backoff. Latency and
+    errors are counted per endpoint.
+    """
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_retries=MAX_RETRIES,
+                 pool_hosts=POOL_HOSTS, pool_per_host=POOL_PER_HOST, pool_timeout=POOL_TIMEOUT,
+                 sleep=time.sleep):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        # Retries are done here rather than in urllib3 so they can be counted.
+        # Blocking pools make pool_per_host a real limit: a request waits (up to
+        # pool_timeout) for a free connection instead of opening an extra one
+        # that is thrown away
+        adapter = BoundedPoolAdapter(pool_timeout=pool_timeout, pool_connections=pool_hosts,
+                                     pool_maxsize=pool_per_host, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def endpoint(self, url):
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        return self.endpoint_named(key)
+
+    def endpoint_named(self, key):
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            return stats
+
+    def get(self, url, params=None, headers=None, stream=False, timeout=None, retries=None, endpoint=None):
+        """
+        GET a URL and return the response.
+
+        The last response is returned as-is once retries are exhausted, so
+        callers still decide what a 4xx/5xx means; requests.RequestException
+        is raised if no response was received at all. Statistics are kept per
+        URL path, or under `endpoint` (e.g. a map tile URL template).
+        """
+        stats = self.endpoint_named(endpoint) if endpoint else self.endpoint(url)
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, stream=stream,
+                                            timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                with self.lock:
+                    stats.requests += 1
+                    stats.errors += 1
+                    if attempt < retries:
+                        stats.retries += 1
+                if attempt == retries:
+                    raise
+                self.sleep(backoff_delay(attempt))
+                continue
+
+            # For streamed responses this is the time to the headers
+            elapsed = time.perf_counter() - start
+            failed = response.status_code >= 400
+            with self.lock:
+                stats.requests += 1
+                stats.latencies.append(elapsed)
+                if failed:
+                    stats.errors += 1
+                if response.status_code in RETRY_STATUSES and attempt < retries:
+                    stats.retries += 1
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            response.close()
+            self.sleep(max(backoff_delay(attempt), min(retry_after(response), BACKOFF_MAX)))
+
+    def get_json(self, url, params=None, **kwargs):
+        """
+        GET a URL and decode its JSON body; raises requests.RequestException on failure.
+        """
+        response = self.get(url, params=params, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self):
+        with self.lock:
+            return {key: stats.summary() for key, stats in self.endpoints.items()}
+
+    def close(self):
+        self.session.close()
+
+
+class GeopyAdapter(BaseSyncAdapter):
+    """
+    geopy adapter that sends geocoder requests through the shared client.
+
+    Pass it as `adapter_factory` to any geopy geocoder; geopy's proxy and
+    SSL options are ignored in favour of the shared session.
+    """
+
+    def __init__(self, *, proxies=None, ssl_context=None, client=None):
+        super().__init__(proxies=proxies, ssl_context=ssl_context)
+        self.client = client or shared_client()
+
+    def get_text(self, url, *, timeout, headers):
+        return self.request(url, timeout, headers).text
+
+    def get_json(self, url, *, timeout, headers):
+        response = self.request(url, timeout, headers)
+        try:
+            return response.json()
+        except ValueError:
+            raise GeocoderParseError("Could not deserialize using deserializer:\n%s" % response.text)
+
+    def request(self, url, timeout, headers):
+        try:
+            response = self.client.get(url, headers=headers,
+                                       timeout=(CONNECT_TIMEOUT, timeout) if timeout else None)
+        except requests.Timeout:
+            raise GeocoderTimedOut("Service timed out")
+        except requests.ConnectionError as error:
+            raise GeocoderUnavailable(str(error))
+        except requests.RequestException as error:
+            raise GeocoderServiceError(str(error))
+        if response.status_code >= 400:
+            # geopy turns this into the matching GeocoderRateLimited/GeocoderQuotaExceeded/...
+            raise AdapterHTTPError("Non-successful status code %s" % response.status_code,
+                                   status_code=response.status_code,
+                                   headers=response.headers, text=response.text)
+        return response
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def shared_client():
+    """
+    The process-wide client, created on first use.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
@@ -0,0 +1,50 @@
+PREBUILD_DELAY_MS = 500           # Wait after startup before building tabs in idle time
+
+
+class LazyTabs:
+    """
+    Builds each tab of a ttk.Notebook the first time it is shown.
+
+    Tabs are added with an empty frame and a build() callback that fills
+    it; the callback runs on <<NotebookTabChanged>> when the tab is first
+    selected, so startup only pays for the tab that is visible. `prebuild` builds
+    chosen tabs ahead of time, one per idle slot after the window is up,
+    so switching to them later is instant without delaying the first window.
+    """
+
+    def __init__(self, notebook):
+        self.notebook = notebook
+        self.builders = {}                # Tab frame path -> build callback, until built
+        notebook.bind("<<NotebookTabChanged>>", lambda event: self.ensure(notebook.select()), add="+")
+
+    def add(self, frame, build, **options):
+        self.notebook.add(frame, **options)
+        self.builders[str(frame)] = build
+        # The first tab added is selected without a change event
+        if str(self.notebook.select()) == str(frame):
+            self.ensure(frame)
+
+    def ensure(self, frame):
+        """
+        Build the tab now if it has not been built yet.
+        """
+        build = self.builders.pop(str(frame), None)
+        if build is not None:
+            build()
+
+    def prebuild(self, frames, delay_ms=PREBUILD_DELAY_MS):
+        """
+        Build these tabs (in order) in idle time once the window is showing.
+        """
+        remaining = list(frames)
+
+        def build_next():
+            while remaining:
+                frame = remaining.pop(0)
+                if str(frame) in self.builders:
+                    self.ensure(frame)
+                    # Let pending events run before the next tab is built
+                    self.notebook.after_idle(build_next)
+                    return
+
+        self.notebook.after(delay_ms, lambda: self.notebook.after_idle(build_next))
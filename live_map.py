@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import queue
+import threading
+import webbrowser
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from geojson_map import LEAFLET_JS, LEAFLET_CSS, script_json
+
+LIVE_MAP_HOST = "127.0.0.1"
+LIVE_MAP_PORT = int(os.environ.get("MEDILOCATOR_LIVE_MAP_PORT", "0"))   # 0 picks a free port
+KEEPALIVE = 15                    # Seconds between SSE comments, to notice closed pages
+CONNECT_GRACE = 10                # Seconds a newly opened page has to connect before another is opened
+
+# The one page every search updates: it connects to /events and applies
+# "reset" (whole state) and "delta" (added/changed and removed hospitals)
+# messages to the markers in place, so tiles and Leaflet are loaded once.
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>__TITLE__</title>
+<link rel="stylesheet" href="__LEAFLET_CSS__">
+<script src="__LEAFLET_JS__"></script>
+<style>
+html, body, #map { width: 100%; height: 100%; margin: 0; }
+#note { position: absolute; top: 10px; left: 60px; z-index: 1000; background: white; padding: 4px 8px;
+        font: 13px sans-serif; border-radius: 4px; box-shadow: 0 1px 4px rgba(0, 0, 0, 0.3); }
+#note:empty { display: none; }
+</style>
+</head>
+<body>
+<div id="map"></div>
+<div id="note"></div>
+<script>
+var map = L.map("map", {preferCanvas: true}).setView([20.59, 78.96], 5);
+L.tileLayer("https://tile.openstreetmap.org/{z}/{x}/{y}.png", {
+    maxZoom: 19,
+    attribution: "&copy; OpenStreetMap contributors"
+}).addTo(map);
+
+var markers = {};
+var home = null, circle = null;
+
+function escapeHtml(value) {
+    return String(value).replace(/[&<>"']/g, function (c) {
+        return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+    });
+}
+
+function popup(p) {
+    var html = '<div style="width:250px"><h4 style="margin-bottom:5px">' + escapeHtml(p.name) + "</h4>";
+    if (p.subtitle) html += '<div style="font-size:12px;color:#888">' + escapeHtml(p.subtitle) + "</div>";
+    html += '<div style="margin-top:8px">';
+    p.rows.forEach(function (row) { html += "<b>" + escapeHtml(row[0]) + ":</b> " + escapeHtml(row[1]) + "<br>"; });
+    if (p.link) html += '<a href="' + escapeHtml(p.link) + '" target="_blank">Visit Website</a>';
+    return html + "</div></div>";
+}
+
+function addFeature(feature) {
+    removeFeature(feature.id);
+    var p = feature.properties, c = p.color;
+    var latlng = [feature.geometry.coordinates[1], feature.geometry.coordinates[0]];
+    markers[feature.id] = L.circleMarker(latlng, {radius: 7, color: c, fillColor: c, fillOpacity: 0.8, weight: 2})
+        .bindPopup(function () { return popup(p); }, {maxWidth: 300})
+        .bindTooltip(escapeHtml(p.tooltip || p.name))
+        .addTo(map);
+}
+
+function removeFeature(id) {
+    if (markers[id]) {
+        map.removeLayer(markers[id]);
+        delete markers[id];
+    }
+}
+
+function setView(view) {
+    if (!view) return;
+    if (home) map.removeLayer(home);
+    if (circle) map.removeLayer(circle);
+    home = L.marker(view.center).bindTooltip("Your Location").addTo(map);
+    circle = L.circle(view.center, {radius: view.radius, color: "blue", fill: true, fillOpacity: 0.05}).addTo(map);
+    map.fitBounds(circle.getBounds());
+    document.getElementById("note").textContent = view.note || "";
+}
+
+var events = new EventSource("/events");
+events.addEventListener("reset", function (event) {
+    var state = JSON.parse(event.data);
+    Object.keys(markers).forEach(removeFeature);
+    state.features.forEach(addFeature);
+    setView(state.view);
+});
+events.addEventListener("delta", function (event) {
+    var delta = JSON.parse(event.data);
+    delta.remove.forEach(removeFeature);
+    delta.add.forEach(addFeature);
+    setView(delta.view);
+});
+</script>
+</body>
+</html>
+"""
+
+
+def live_feature(key, lat, lon, name, rows, color="red", subtitle="", tooltip=None, link=None):
+    """
+    One hospital for the live page: rows are the (label, value) lines of its
+    popup, shown under the name and subtitle.
+    """
+    return {
+        "type": "Feature",
+        "id": str(key),
+        "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+        "properties": {
+            "name": name,
+            "subtitle": subtitle,
+            "rows": [[label, str(value)] for label, value in rows],
+            "color": color,
+            "tooltip": tooltip,
+            "link": link,
+        },
+    }
+
+
+class LiveMapServer:
+    """
+    A small local HTTP server with one persistent map page.
+
+    `publish` sends each new result set to every open page over Server-Sent
+    Events as a delta against the previous one (hospitals added or changed,
+    ids removed, and the new search area), so markers update in place and
+    the page never reloads. `show` also opens the page in the browser, but
+    only when none is connected.
+    """
+
+    def __init__(self, host=LIVE_MAP_HOST, port=LIVE_MAP_PORT, title="Nearby hospitals"):
+        self.title = title
+        self.lock = threading.Lock()
+        self.features = {}                # id -> feature currently on the page
+        self.view = None
+        self.clients = []                 # One message queue per connected page
+        self.opened_at = None
+
+        self.httpd = ThreadingHTTPServer((host, port), LiveMapHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.live_map = self
+        thread = threading.Thread(target=self.httpd.serve_forever, name="live-map")
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def page(self):
+        return (PAGE_TEMPLATE
+                .replace("__TITLE__", self.title.replace("&", "&amp;").replace("<", "&lt;"))
+                .replace("__LEAFLET_CSS__", LEAFLET_CSS)
+                .replace("__LEAFLET_JS__", LEAFLET_JS))
+
+    def snapshot(self):
+        with self.lock:
+            return {"features": list(self.features.values()), "view": self.view}
+
+    def connect(self):
+        messages = queue.Queue()
+        with self.lock:
+            self.clients.append(messages)
+            # A page that connects starts from the whole current state
+            messages.put(("reset", {"features": list(self.features.values()), "view": self.view}))
+        return messages
+
+    def disconnect(self, messages):
+        with self.lock:
+            if messages in self.clients:
+                self.clients.remove(messages)
+
+    def connected(self):
+        with self.lock:
+            return len(self.clients)
+
+    def publish(self, latitude, longitude, radius_m, features, note=None):
+        """
+        Make `features` (see live_feature) the page's hospitals and send the
+        difference to every connected page; returns the number of pages.
+        """
+        features = {feature["id"]: feature for feature in features}
+        with self.lock:
+            added = [feature for key, feature in features.items() if self.features.get(key) != feature]
+            removed = [key for key in self.features if key not in features]
+            self.features = features
+            self.view = {"center": [latitude, longitude], "radius": radius_m, "note": note}
+            delta = {"add": added, "remove": removed, "view": self.view}
+            for messages in self.clients:
+                messages.put(("delta", delta))
+            return len(self.clients)
+
+    def show(self, latitude, longitude, radius_m, features, note=None):
+        """
+        Publish the results and open the page if no page is showing them.
+        """
+        pages = self.publish(latitude, longitude, radius_m, features, note)
+        now = time.monotonic()
+        with self.lock:
+            # A page opened moments ago may simply not have connected yet
+            opening = self.opened_at is not None and now - self.opened_at < CONNECT_GRACE
+            if pages or opening:
+                return
+            self.opened_at = now
+        webbrowser.open(self.url)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LiveMapHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        state = self.server.live_map
+        if self.path == "/":
+            self.send_body(200, "text/html; charset=utf-8", state.page().encode())
+        elif self.path == "/state":
+            self.send_body(200, "application/json", json.dumps(state.snapshot()).encode())
+        elif self.path == "/events":
+            self.stream_events(state)
+        else:
+            self.send_body(404, "text/plain", b"Not found")
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, state):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        messages = state.connect()
+        try:
+            while True:
+                try:
+                    event, data = messages.get(timeout=KEEPALIVE)
+                    chunk = f"event: {event}\ndata: {script_json(data)}\n\n"
+                except queue.Empty:
+                    chunk = ": keepalive\n\n"
+                self.wfile.write(chunk.encode())
+                self.wfile.flush()
+        except OSError:
+            # The page was closed
+            pass
+        finally:
+            state.disconnect(messages)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_shared_live_map = None
+_shared_live_map_lock = threading.Lock()
+
+
+def shared_live_map():
+    """
+    The process-wide live map server, started on first use.
+    """
+    global _shared_live_map
+    with _shared_live_map_lock:
+        if _shared_live_map is None:
+            _shared_live_map = LiveMapServer()
+        return _shared_live_map
@@ -0,0 +1,97 @@
+import os
+import json
+import hashlib
+import threading
+
+MAP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".medilocator", "maps")
+MAX_MAP_FILES = 32
+
+
+def map_key(kind, center, radius_m, records):
+    """
+    Cache key for a rendered map: which app/renderer drew it, the centre,
+    the search radius and the (order-independent) hospital records shown.
+
+    The whole records are part of the key, not just their IDs, so a map is
+    rebuilt once anything it displays (a drive time, a tag) has changed.
+    """
+    latitude, longitude = center
+    payload = json.dumps([kind, round(latitude, 6), round(longitude, 6), radius_m,
+                          sorted(json.dumps(record, sort_keys=True, default=str) for record in records)])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class MapRenderCache:
+    """
+    Rendered map HTML files, reused when a search returns the same results.
+
+    Files are named by map_key; on a hit the existing file is returned and
+    the map is not built at all. Only the most recently used MAX_MAP_FILES
+    files are kept (file mtimes double as the LRU order, so the cache is
+    shared safely between the apps).
+    """
+
+    def __init__(self, cache_dir=MAP_CACHE_DIR, max_files=MAX_MAP_FILES):
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + ".html")
+
+    def get(self, kind, center, radius_m, records, build):
+        """
+        Return the path of the map for these hospital records, calling build()
+        (which must return an object with a save(path) method, e.g. a
+        folium.Map) only on a miss.
+        """
+        path = self.path_for(map_key(kind, center, radius_m, records))
+        try:
+            # Touching the file marks it as recently used
+            os.utime(path)
+            with self.lock:
+                self.hits += 1
+            return path
+        except OSError:
+            pass
+
+        with self.lock:
+            self.misses += 1
+        # Write through a temporary file so a browser never sees a half-written map
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            build().save(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            # A failed build or save must not leave its partial file behind
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+        return path
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".html"):
+                    path = os.path.join(self.cache_dir, name)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+            entries.sort()
+            for _, path in entries[:max(0, len(entries) - self.max_files)]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
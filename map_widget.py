@@ -0,0 +1,348 @@
+import io
+import os
+import math
+import time
+import hashlib
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk
+from http_client import shared_client, CONNECT_TIMEOUT
+from cluster_index import project, unproject, TILE_SIZE
+
+# Slippy-map tile server; override with MEDILOCATOR_TILE_URL (e.g. a self-hosted one)
+TILE_URL = os.environ.get("MEDILOCATOR_TILE_URL", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+ATTRIBUTION = "© OpenStreetMap contributors"
+TILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".medilocator", "map_tiles")
+MAX_DISK_TILES = 4000             # Least recently used tiles beyond this are deleted
+MEMORY_TILES = 256                # Decoded tiles kept in memory
+TILE_MAX_AGE = 7 * 24 * 3600      # Seconds before a cached tile is downloaded again
+TILE_WORKERS = 2                  # The OSM tile policy allows at most two connections
+TILE_TIMEOUT = 15
+EVICT_EVERY = 64                  # Downloads between disk evictions
+RETRY_FAILED_AFTER = 60           # Seconds before a failed tile is requested again
+MIN_ZOOM = 2
+MAX_ZOOM = 18
+
+
+class RasterTileCache:
+    """
+    Map tiles kept on disk and, decoded, in memory.
+
+    `get` only answers from memory or disk; `request` downloads a missing
+    tile in the background and calls back once it is decoded. Both levels
+    are LRU: the memory cache by access order, the disk cache by file mtime
+    (touched on every read), so tiles survive restarts and are shared
+    between the apps.
+    """
+
+    def __init__(self, url=TILE_URL, cache_dir=TILE_CACHE_DIR, max_disk_tiles=MAX_DISK_TILES,
+                 memory_tiles=MEMORY_TILES, max_age=TILE_MAX_AGE, client=None):
+        self.url = url
+        self.max_disk_tiles = max_disk_tiles
+        self.memory_tiles = memory_tiles
+        self.max_age = max_age
+        self.client = client
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()       # (zoom, x, y) -> PIL image
+        self.inflight = set()
+        self.failed = {}                  # (zoom, x, y) -> time of the last failure
+        self.downloads = 0
+        self.executor = ThreadPoolExecutor(max_workers=TILE_WORKERS, thread_name_prefix="tiles")
+
+        # Tiles of different servers must not be mixed
+        self.cache_dir = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest()[:12])
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, tile):
+        zoom, x, y = tile
+        return os.path.join(self.cache_dir, str(zoom), str(x), f"{y}.png")
+
+    def remember(self, tile, image):
+        with self.lock:
+            self.memory[tile] = image
+            self.memory.move_to_end(tile)
+            while len(self.memory) > self.memory_tiles:
+                self.memory.popitem(last=False)
+
+    def get(self, tile):
+        """
+        The decoded tile if it is in memory or fresh on disk, else None.
+        """
+        with self.lock:
+            image = self.memory.get(tile)
+            if image is not None:
+                self.memory.move_to_end(tile)
+                return image
+
+        path = self.path_for(tile)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            image = Image.open(path)
+            image.load()
+            # Touching the file marks it as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        self.remember(tile, image)
+        return image
+
+    def request(self, tile, callback):
+        """
+        Download a tile in the background; callback(tile) runs on the worker
+        thread once get(tile) can answer. Requests already in flight, or that
+        failed within RETRY_FAILED_AFTER seconds, are ignored.
+        """
+        with self.lock:
+            if tile in self.inflight or time.monotonic() - self.failed.get(tile, -RETRY_FAILED_AFTER) < RETRY_FAILED_AFTER:
+                return
+            self.inflight.add(tile)
+        self.executor.submit(self.download, tile, callback)
+
+    def download(self, tile, callback):
+        try:
+            zoom, x, y = tile
+            client = self.client or shared_client()
+            response = client.get(self.url.format(z=zoom, x=x, y=y), timeout=(CONNECT_TIMEOUT, TILE_TIMEOUT),
+                                  endpoint=self.url)
+            response.raise_for_status()
+            image = Image.open(io.BytesIO(response.content))
+            image.load()
+
+            # Write through a temporary file so a reader never sees half a tile
+            path = self.path_for(tile)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(response.content)
+            os.replace(temp_path, path)
+            self.remember(tile, image)
+            with self.lock:
+                self.failed.pop(tile, None)
+        except Exception as e:
+            print(f"Map tile {tile} failed: {e}")
+            with self.lock:
+                self.failed[tile] = time.monotonic()
+            return
+        finally:
+            with self.lock:
+                self.inflight.discard(tile)
+
+        with self.lock:
+            self.downloads += 1
+            evict = self.downloads % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+        callback(tile)
+
+    def evict(self):
+        entries = []
+        for directory, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_disk_tiles)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_shared_tiles = None
+_shared_tiles_lock = threading.Lock()
+
+
+def shared_tiles():
+    global _shared_tiles
+    with _shared_tiles_lock:
+        if _shared_tiles is None:
+            _shared_tiles = RasterTileCache()
+        return _shared_tiles
+
+
+class MapView(tk.Canvas):
+    """
+    Slippy map drawn directly on a Tk canvas.
+
+    Shows tiles from a RasterTileCache, an optional search circle and
+    markers given as (lat, lon, color, label, value) tuples; hovering a
+    marker shows its label and clicking it calls on_select(value). Drag to
+    pan, scroll or double-click to zoom. Converted tile images are kept too,
+    so panning and zooming back only redraw.
+    """
+
+    def __init__(self, master, tiles=None, on_select=None, **kwargs):
+        kwargs.setdefault("bg", "#e0e0e0")
+        kwargs.setdefault("highlightthickness", 0)
+        super().__init__(master, **kwargs)
+        self.tiles = tiles or shared_tiles()
+        self.on_select = on_select
+        self.zoom = 12
+        self.center = (28.6139, 77.2090)
+        self.home = None
+        self.radius_m = None
+        self.markers = []
+        self.note = None
+        self.photos = OrderedDict()       # (zoom, x, y) -> PhotoImage
+        self.redraw_pending = False
+        self.drag_from = None
+
+        self.bind("<Configure>", lambda event: self.redraw())
+        self.bind("<ButtonPress-1>", self.start_drag)
+        self.bind("<B1-Motion>", self.drag)
+        self.bind("<ButtonRelease-1>", lambda event: setattr(self, "drag_from", None))
+        self.bind("<Double-Button-1>", lambda event: self.zoom_at(event.x, event.y, 1))
+        self.bind("<MouseWheel>", lambda event: self.zoom_at(event.x, event.y, 1 if event.delta > 0 else -1))
+        self.bind("<Button-4>", lambda event: self.zoom_at(event.x, event.y, 1))
+        self.bind("<Button-5>", lambda event: self.zoom_at(event.x, event.y, -1))
+
+    def show(self, lat, lon, markers, radius_m=None, note=None):
+        """
+        Replace the markers and fit the view to them (and the search circle).
+        """
+        self.home = (lat, lon)
+        self.center = (lat, lon)
+        self.markers = list(markers)
+        self.radius_m = radius_m
+        self.note = note
+        self.zoom = self.fitting_zoom()
+        self.redraw()
+
+    def center_on(self, lat, lon, zoom=None):
+        self.center = (lat, lon)
+        if zoom is not None:
+            self.zoom = max(self.zoom, zoom)
+        self.redraw()
+
+    def fitting_zoom(self):
+        width, height = max(self.winfo_width(), 200), max(self.winfo_height(), 150)
+        points = [(lat, lon) for lat, lon, *_ in self.markers] + [self.center]
+        span_x = max(abs(project(*point)[0] - project(*self.center)[0]) for point in points)
+        span_y = max(abs(project(*point)[1] - project(*self.center)[1]) for point in points)
+        if self.radius_m:
+            circle = self.radius_m / (40075016.686 * math.cos(math.radians(self.center[0])))
+            span_x, span_y = max(span_x, circle), max(span_y, circle)
+        for zoom in range(MAX_ZOOM - 3, MIN_ZOOM - 1, -1):
+            world = TILE_SIZE * 2 ** zoom
+            # Leave a margin so edge markers are not cut off
+            if span_x * world * 2 <= width * 0.9 and span_y * world * 2 <= height * 0.9:
+                return zoom
+        return MIN_ZOOM
+
+    def world_pixel(self, lat, lon):
+        x, y = project(lat, lon)
+        world = TILE_SIZE * 2 ** self.zoom
+        return x * world, y * world
+
+    def origin(self):
+        # World pixel at the canvas's top-left corner
+        x, y = self.world_pixel(*self.center)
+        return x - self.winfo_width() / 2, y - self.winfo_height() / 2
+
+    def photo(self, tile):
+        photo = self.photos.get(tile)
+        if photo is not None:
+            self.photos.move_to_end(tile)
+            return photo
+        image = self.tiles.get(tile)
+        if image is None:
+            return None
+        photo = self.photos[tile] = ImageTk.PhotoImage(image)
+        while len(self.photos) > MEMORY_TILES:
+            self.photos.popitem(last=False)
+        return photo
+
+    def tile_ready(self, tile):
+        # Called on a download thread: coalesce into one redraw on the Tk thread
+        if tile[0] == self.zoom and not self.redraw_pending:
+            self.redraw_pending = True
+            self.after(0, self.redraw)
+
+    def redraw(self):
+        self.redraw_pending = False
+        self.delete("all")
+        width, height = self.winfo_width(), self.winfo_height()
+        if width < 2 or height < 2:
+            return
+        left, top = self.origin()
+        count = 2 ** self.zoom
+
+        for row in range(int(top // TILE_SIZE), int((top + height) // TILE_SIZE) + 1):
+            if not 0 <= row < count:
+                continue
+            for col in range(int(left // TILE_SIZE), int((left + width) // TILE_SIZE) + 1):
+                tile = (self.zoom, col % count, row)
+                x, y = col * TILE_SIZE - left, row * TILE_SIZE - top
+                photo = self.photo(tile)
+                if photo is None:
+                    self.create_rectangle(x, y, x + TILE_SIZE, y + TILE_SIZE, fill="#e8e8e8", outline="#dddddd")
+                    self.tiles.request(tile, self.tile_ready)
+                else:
+                    self.create_image(x, y, image=photo, anchor=tk.NW)
+
+        if self.home is not None:
+            x, y = self.world_pixel(*self.home)
+            x, y = x - left, y - top
+            if self.radius_m:
+                meters_per_pixel = 40075016.686 * math.cos(math.radians(self.home[0])) / (TILE_SIZE * count)
+                r = self.radius_m / meters_per_pixel
+                self.create_oval(x - r, y - r, x + r, y + r, outline="blue", width=2)
+            self.create_oval(x - 7, y - 7, x + 7, y + 7, fill="blue", outline="white", width=2)
+
+        for index, (lat, lon, color, label, value) in enumerate(self.markers):
+            x, y = self.world_pixel(lat, lon)
+            x, y = x - left, y - top
+            if -10 <= x <= width + 10 and -10 <= y <= height + 10:
+                item = self.create_oval(x - 6, y - 6, x + 6, y + 6, fill=color, outline="white", width=2,
+                                        tags=("marker",))
+                self.tag_bind(item, "<Enter>", lambda event, x=x, y=y, label=label: self.show_label(x, y, label))
+                self.tag_bind(item, "<Leave>", lambda event: self.delete("label"))
+                self.tag_bind(item, "<Button-1>", lambda event, value=value: self.select(value))
+
+        if self.note:
+            self.create_text(width / 2, height / 2, text=self.note, font=("Arial", 11), fill="#333333")
+        self.create_text(width - 4, height - 2, text=ATTRIBUTION, anchor=tk.SE, font=("Arial", 8), fill="#555555")
+
+    def show_label(self, x, y, label):
+        text = self.create_text(x + 10, y - 10, text=label, anchor=tk.SW, font=("Arial", 9), tags=("label",))
+        self.tag_lower(self.create_rectangle(self.bbox(text), fill="white", outline="#999999", tags=("label",)), text)
+
+    def select(self, value):
+        if self.on_select is not None:
+            self.on_select(value)
+
+    def start_drag(self, event):
+        # A click on a marker selects it rather than starting a pan
+        self.drag_from = None if "marker" in self.gettags("current") else (event.x, event.y)
+
+    def drag(self, event):
+        if self.drag_from is None:
+            return
+        x, y = self.world_pixel(*self.center)
+        x -= event.x - self.drag_from[0]
+        y -= event.y - self.drag_from[1]
+        world = TILE_SIZE * 2 ** self.zoom
+        self.center = unproject(x / world, min(1.0, max(0.0, y / world)))
+        self.drag_from = (event.x, event.y)
+        self.redraw()
+
+    def zoom_at(self, x, y, step):
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, self.zoom + step))
+        if zoom == self.zoom:
+            return
+        # Keep the point under the cursor in place
+        left, top = self.origin()
+        world = TILE_SIZE * 2 ** self.zoom
+        point = ((left + x) / world, (top + y) / world)
+        center = ((left + self.winfo_width() / 2) / world, (top + self.winfo_height() / 2) / world)
+        scale = 2 ** (self.zoom - zoom)
+        self.zoom = zoom
+        self.center = unproject(point[0] + (center[0] - point[0]) * scale,
+                                min(1.0, max(0.0, point[1] + (center[1] - point[1]) * scale)))
+        self.redraw()
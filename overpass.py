@@ -0,0 +1,167 @@
+import re
+import json
+import codecs
+import requests
+from http_client import shared_client
+from overpass_mirrors import shared_mirrors
+
+# Tag filters used by the apps; Hospital_Expert_System does not include healthcare=hospital
+HOSPITAL_SELECTORS = (("amenity", "hospital"), ("amenity", "clinic"), ("healthcare", "hospital"))
+AMENITY_SELECTORS = (("amenity", "hospital"), ("amenity", "clinic"))
+
+
+def build_query(selectors, areas):
+    """
+    Build an Overpass QL query for hospitals matching `selectors` inside `areas`.
+
+    Each area is the text of an Overpass filter, e.g. "around:5000,28.6,77.2"
+    or a "south,west,north,east" bounding box.
+    """
+    statements = []
+    for area in areas:
+        for key, value in selectors:
+            for element_type in ("node", "way", "relation"):
+                statements.append(f'  {element_type}["{key}"="{value}"]({area});')
+    return "[out:json];\n(\n" + "\n".join(statements) + "\n);\nout center;\n"
+
+
+class OverpassIncomplete(requests.RequestException):
+    """
+    Overpass answered 200 but the result is not complete: it reported a
+    runtime error or timeout in its "remark" field, or the response ended
+    before the JSON object was closed.
+    """
+
+
+def bbox_area(south, west, north, east):
+    return f"{south:.6f},{west:.6f},{north:.6f},{east:.6f}"
+
+
+def overpass_get(query, url=None, stream=False):
+    """
+    Send an Overpass query to url, or to the configured mirrors with failover
+    and hedging when url is None.
+    """
+    if url is None:
+        return shared_mirrors().get(query, stream=stream)
+    response = shared_client().get(url, params={"data": query}, stream=stream)
+    response.raise_for_status()
+    return response
+
+
+def fetch_elements(query, url=None):
+    """
+    Run an Overpass query and return its elements; raises requests.RequestException
+    on failure, including OverpassIncomplete for a partial result.
+    """
+    response = overpass_get(query, url)
+    data = response.json()
+    if data.get("remark"):
+        raise OverpassIncomplete(data["remark"])
+    return data.get("elements", [])
+
+
+def stream_elements(query, url=None, chunk_size=16384, status=None):
+    """
+    Run an Overpass query and yield its elements as the response downloads.
+
+    Raises requests.RequestException on failure, possibly after some elements
+    have already been yielded. See iter_elements for `status`.
+    """
+    with overpass_get(query, url, stream=True) as response:
+        yield from iter_elements(response.iter_content(chunk_size=chunk_size), status)
+
+
+ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+
+
+def iter_elements(chunks, status=None):
+    """
+    Incrementally parse the "elements" array of an Overpass JSON response.
+
+    `chunks` is an iterable of bytes; each element is yielded as soon as its
+    closing brace has arrived, without buffering the whole payload. If a
+    `status` dict is given, once the input is exhausted it holds "complete"
+    (the array and the enclosing object were both closed) and "remark" (the
+    top-level remark Overpass adds on runtime errors and timeouts, or None);
+    results that fail either check should not be cached.
+    """
+    if status is None:
+        status = {}
+    status["complete"] = False
+    status["remark"] = None
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = None
+    chunks = iter(chunks)
+
+    while True:
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += utf8.decode(b"", final=True)
+        else:
+            buffer += utf8.decode(chunk)
+
+        if position is None:
+            match = ELEMENTS_START.search(buffer)
+            if match is None:
+                if chunk is None:
+                    return
+                # Keep only a tail long enough to hold a split '"elements": ['
+                buffer = buffer[-64:]
+                continue
+            position = match.end()
+
+        while True:
+            # Skip separators between elements
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                finish(buffer[position + 1:], chunks, utf8, status)
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # The element is incomplete; wait for more bytes
+                break
+            yield element
+            position = end
+
+        # Drop the consumed part of the buffer
+        buffer = buffer[position:]
+        position = 0
+        if chunk is None:
+            return
+
+
+def finish(tail, chunks, utf8, status):
+    """
+    Read what follows the elements array (normally only an optional remark
+    and the closing brace) and record it in status.
+    """
+    try:
+        tail += "".join(utf8.decode(chunk) for chunk in chunks) + utf8.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return
+    tail = tail.strip()
+    if not tail.endswith("}"):
+        return
+    try:
+        rest = json.loads("{" + tail.lstrip(",").lstrip())
+    except ValueError:
+        return
+    status["remark"] = rest.get("remark")
+    status["complete"] = True
+
+
+def element_key(element):
+    return element.get("type"), element.get("id")
+
+
+def element_position(element):
+    lat = element.get("lat") or element.get("center", {}).get("lat")
+    lon = element.get("lon") or element.get("center", {}).get("lon")
+    return lat, lon
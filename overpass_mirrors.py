@@ -0,0 +1,207 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from http_client import shared_client
+
+# Public Overpass instances, best first; override with a comma-separated
+# MEDILOCATOR_OVERPASS_URLS (e.g. to put a self-hosted instance first)
+DEFAULT_OVERPASS_URLS = (
+    "https://overpass-api.de/api/interpreter",
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://overpass.private.coffee/api/interpreter",
+)
+OVERPASS_URLS = tuple(url.strip() for url in os.environ.get(
+    "MEDILOCATOR_OVERPASS_URLS", ",".join(DEFAULT_OVERPASS_URLS)).split(",") if url.strip())
+
+HEDGE_PERCENTILE = 0.9            # Hedge once the primary is slower than its usual p90
+HEDGE_DEFAULT = 4.0               # Hedge delay (seconds) before a mirror has any samples
+HEDGE_MIN = 0.5
+HEDGE_MAX = 15.0
+COOLDOWN = 30.0                   # Seconds a failing mirror is ranked last, doubled per failure
+LATENCY_SAMPLES = 50
+
+
+class MirrorHealth:
+    """
+    Recent latency and failure history of one Overpass endpoint.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.failures = 0                 # Consecutive failures
+        self.failed_at = 0.0
+        self.wins = 0
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def cooling_down(self, now):
+        return self.failures > 0 and now - self.failed_at < COOLDOWN * 2 ** (self.failures - 1)
+
+    def score(self, now):
+        """
+        Lower is better: typical latency, penalised by recent failures.
+        """
+        latency = self.percentile(0.5) or HEDGE_DEFAULT
+        return (self.cooling_down(now), latency * 2 ** min(self.failures, 5))
+
+    def hedge_delay(self):
+        delay = self.percentile(HEDGE_PERCENTILE)
+        if delay is None or len(self.latencies) < 5:
+            return HEDGE_DEFAULT
+        return min(HEDGE_MAX, max(HEDGE_MIN, delay))
+
+
+class OverpassMirrors:
+    """
+    Failover and hedged requests across several Overpass endpoints.
+
+    A query goes to the healthiest mirror first. If it has not answered
+    within that mirror's usual p90 latency, the same query is also sent to
+    the next-best mirror and whichever responds first wins; the loser is
+    closed. Errors and rate limiting fail over to the next mirror at once;
+    any other 4xx means the query itself is bad and is raised straight away.
+    """
+
+    def __init__(self, urls=OVERPASS_URLS, client=None):
+        self.urls = tuple(urls)
+        self.client = client
+        self.lock = threading.Lock()
+        self.health = {url: MirrorHealth(url) for url in self.urls}
+        self.executor = ThreadPoolExecutor(max_workers=2 * len(self.urls), thread_name_prefix="overpass")
+
+    def ranked(self):
+        now = time.monotonic()
+        with self.lock:
+            return sorted(self.urls, key=lambda url: self.health[url].score(now))
+
+    def record(self, url, latency=None):
+        with self.lock:
+            health = self.health[url]
+            if latency is None:
+                health.failures += 1
+                health.failed_at = time.monotonic()
+            else:
+                health.failures = 0
+                health.wins += 1
+                health.latencies.append(latency)
+
+    def request(self, url, query, stream):
+        client = self.client or shared_client()
+        start = time.monotonic()
+        # Each mirror gets one attempt; failing over replaces retrying
+        response = client.get(url, params={"data": query}, stream=stream, retries=0)
+        return response, time.monotonic() - start
+
+    def get(self, query, stream=True):
+        """
+        Send the query and return the first successful response.
+
+        Raises requests.RequestException if every mirror fails, or the
+        requests.HTTPError of a 4xx (other than 429) as soon as one arrives.
+        """
+        ranked = self.ranked()
+        pending = {}
+        errors = []
+        winner = None
+        rejected = None
+
+        deadline = self.launch(ranked[0], pending, query, stream)
+        launched = 1
+        while pending and winner is None and rejected is None:
+            timeout = max(0.0, deadline - time.monotonic()) if launched < len(ranked) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The mirrors in flight are slower than usual: hedge
+                deadline = self.launch(ranked[launched], pending, query, stream)
+                launched += 1
+                continue
+
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    response, latency = future.result()
+                except requests.RequestException as e:
+                    self.record(url)
+                    errors.append(e)
+                    continue
+                if winner is not None or rejected is not None:
+                    response.close()
+                elif 400 <= response.status_code < 500 and response.status_code != 429:
+                    # A bad query fails on every mirror; the mirror is not to blame
+                    rejected = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+                    response.close()
+                elif response.status_code != 200:
+                    # Overloaded (429/504) or broken; try another mirror
+                    self.record(url)
+                    errors.append(requests.HTTPError(f"{response.status_code} from {url}", response=response))
+                    response.close()
+                else:
+                    self.record(url, latency)
+                    winner = response
+
+            if winner is None and rejected is None and not pending and launched < len(ranked):
+                # Fail over immediately instead of waiting for the hedge deadline
+                deadline = self.launch(ranked[launched], pending, query, stream)
+                launched += 1
+
+        # Close the responses of hedged requests that lost the race
+        for future in pending:
+            future.add_done_callback(close_response)
+
+        if rejected is not None:
+            raise rejected
+        if winner is None:
+            raise errors[-1] if errors else requests.ConnectionError("No Overpass endpoint configured")
+        return winner
+
+    def launch(self, url, pending, query, stream):
+        """
+        Start a request to url; returns the time by which it should be hedged.
+        """
+        pending[self.executor.submit(self.request, url, query, stream)] = url
+        with self.lock:
+            return time.monotonic() + self.health[url].hedge_delay()
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return {
+                url: {
+                    "wins": health.wins,
+                    "failures": health.failures,
+                    "cooling_down": health.cooling_down(now),
+                    "p50": health.percentile(0.5),
+                    "hedge_after": health.hedge_delay(),
+                }
+                for url, health in self.health.items()
+            }
+
+
+def close_response(future):
+    try:
+        future.result()[0].close()
+    except Exception:
+        pass
+
+
+_shared_mirrors = None
+_shared_mirrors_lock = threading.Lock()
+
+
+def shared_mirrors():
+    """
+    The process-wide mirror set, so health is learned across all searches.
+    """
+    global _shared_mirrors
+    with _shared_mirrors_lock:
+        if _shared_mirrors is None:
+            _shared_mirrors = OverpassMirrors()
+        return _shared_mirrors
@@ -0,0 +1,282 @@
+import os
+import json
+import math
+import time
+import hashlib
+import threading
+from overpass import build_query, bbox_area, stream_elements, element_key, element_position
+from spatial_index import KM_PER_DEGREE, haversine_km
+
+TILE_SIZE = 0.05                  # Degrees per tile side (about 5.5 km)
+TILE_TTL = 24 * 3600              # Refetch tiles older than a day
+TILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".medilocator", "overpass_tiles")
+INFLIGHT_WAIT = 90                # Seconds to wait for another thread's fetch of a tile
+MAX_TILE_FILES = 2000             # Tiles kept on disk; the oldest go first
+
+
+class OverpassTileCache:
+    """
+    Overpass results cached on fixed lat/lon tiles.
+
+    A radius search is answered by unioning the tiles that overlap the circle
+    and filtering their elements locally. Only tiles that are missing or
+    older than the TTL are fetched, so moving a few hundred metres or
+    shrinking the radius usually needs no network request at all. After
+    each fetch, tiles past the TTL and all but the newest max_files are
+    deleted from disk.
+    """
+
+    def __init__(self, selectors, tile_size=TILE_SIZE, ttl=TILE_TTL,
+                 cache_dir=TILE_CACHE_DIR, fetch=stream_elements, max_files=MAX_TILE_FILES):
+        self.selectors = tuple(selectors)
+        self.tile_size = tile_size
+        self.ttl = ttl
+        self.max_files = max_files
+        self.fetch = fetch
+        self.tiles = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+        # Tiles fetched with different tag filters or sizes must not be mixed
+        signature = json.dumps([self.selectors, tile_size]).encode()
+        self.cache_dir = os.path.join(cache_dir, hashlib.sha1(signature).hexdigest()[:12])
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def tile_of(self, lat, lon):
+        return int(math.floor(lat / self.tile_size)), int(math.floor(lon / self.tile_size))
+
+    def tile_bounds(self, tile):
+        row, col = tile
+        return (row * self.tile_size, col * self.tile_size,
+                (row + 1) * self.tile_size, (col + 1) * self.tile_size)
+
+    def tiles_for_radius(self, lat, lon, radius_m, inner_radius_m=0):
+        """
+        Tiles that intersect the circle of radius_m metres around (lat, lon),
+        leaving out tiles that lie entirely inside the inner circle.
+        """
+        radius_km = radius_m / 1000
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(89.0, abs(lat) + dlat))), 1e-6))
+        south, west = self.tile_of(lat - dlat, lon - dlon)
+        north, east = self.tile_of(lat + dlat, lon + dlon)
+
+        tiles = []
+        for row in range(south, north + 1):
+            for col in range(west, east + 1):
+                s, w, n, e = self.tile_bounds((row, col))
+                # Skip corner tiles whose nearest point is outside the circle
+                near_lat = min(max(lat, s), n)
+                near_lon = min(max(lon, w), e)
+                if haversine_km(lat, lon, near_lat, near_lon) > radius_km:
+                    continue
+                # Skip tiles already covered by a smaller search
+                far_lat = s if lat - s > n - lat else n
+                far_lon = w if lon - w > e - lon else e
+                if inner_radius_m and haversine_km(lat, lon, far_lat, far_lon) <= inner_radius_m / 1000:
+                    continue
+                tiles.append((row, col))
+        return tiles
+
+    def tile_path(self, tile):
+        return os.path.join(self.cache_dir, f"{tile[0]}_{tile[1]}.json")
+
+    def cached_tile(self, tile, now):
+        """
+        Return the cached elements of a tile, or None if it is missing or stale.
+        """
+        with self.lock:
+            entry = self.tiles.get(tile)
+        if entry is None:
+            try:
+                with open(self.tile_path(tile), encoding="utf-8") as handle:
+                    entry = json.load(handle)
+            except (OSError, ValueError):
+                return None
+            with self.lock:
+                self.tiles[tile] = entry
+        if now - entry["fetched_at"] > self.ttl:
+            return None
+        return entry["elements"]
+
+    def store_tile(self, tile, elements, fetched_at):
+        entry = {"fetched_at": fetched_at, "elements": elements}
+        with self.lock:
+            self.tiles[tile] = entry
+        # Write through a temporary file so a crash never leaves a half-written tile
+        path = self.tile_path(tile)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle)
+        os.replace(temp_path, path)
+
+    def missing_areas(self, tiles):
+        """
+        Merge missing tiles into one bounding box per contiguous run along each row.
+        """
+        areas = []
+        by_row = {}
+        for row, col in tiles:
+            by_row.setdefault(row, []).append(col)
+        for row, cols in sorted(by_row.items()):
+            cols.sort()
+            start = previous = cols[0]
+            for col in cols[1:] + [None]:
+                if col is not None and col == previous + 1:
+                    previous = col
+                    continue
+                s, w, _, _ = self.tile_bounds((row, start))
+                _, _, n, e = self.tile_bounds((row, previous))
+                areas.append(bbox_area(s, w, n, e))
+                if col is not None:
+                    start = previous = col
+        return areas
+
+    def fetch_tiles(self, tiles):
+        """
+        Download the given tiles in a single Overpass request, yielding each
+        element as it arrives; the tiles are stored once the download completes.
+
+        A response Overpass marked with a remark (runtime error, timeout) or
+        one that ended early is still yielded but not stored, so one bad
+        answer is not served from the cache for the whole TTL.
+        """
+        fetched_at = time.time()
+        by_tile = {tile: [] for tile in tiles}
+        status = {}
+        for element in self.fetch(build_query(self.selectors, self.missing_areas(tiles)), status=status):
+            lat, lon = element_position(element)
+            if lat and lon:
+                bucket = by_tile.get(self.tile_of(lat, lon))
+                if bucket is not None:
+                    bucket.append(element)
+                    yield element
+
+        if not status.get("complete") or status.get("remark"):
+            print(f"Overpass result incomplete, not caching it: {status.get('remark') or 'response ended early'}")
+            with self.lock:
+                for tile in by_tile:
+                    self.tiles.pop(tile, None)
+            return
+
+        for tile, tile_elements in by_tile.items():
+            self.store_tile(tile, tile_elements, fetched_at)
+        self.evict()
+
+    def evict(self):
+        """
+        Delete expired tiles, then the oldest ones beyond max_files.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                # Tiles are written once per fetch, so the mtime is the fetch time
+                entries.append((os.path.getmtime(path), path, name))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        expired = [entry for index, entry in enumerate(entries)
+                   if index >= self.max_files or now - entry[0] > self.ttl]
+        for _, path, name in expired:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            row, col = name[:-len(".json")].split("_")
+            with self.lock:
+                self.tiles.pop((int(row), int(col)), None)
+
+    def iter_query(self, lat, lon, radius_m, inner_radius_m=0):
+        """
+        Yield the elements within radius_m metres of (lat, lon).
+
+        With inner_radius_m only the ring beyond it is returned, and tiles
+        inside the inner circle are not even looked at, so widening a search
+        costs only the new area. Cached tiles are yielded first; elements of
+        missing tiles follow as they stream in. Raises
+        requests.RequestException if a missing tile cannot be fetched.
+        """
+        now = time.time()
+        radius_km = radius_m / 1000
+        inner_km = inner_radius_m / 1000
+        seen = set()
+
+        def within(elements):
+            for element in elements:
+                key = element_key(element)
+                if key in seen:
+                    continue
+                element_lat, element_lon = element_position(element)
+                distance = haversine_km(lat, lon, element_lat, element_lon)
+                if distance <= radius_km and (not inner_km or distance > inner_km):
+                    seen.add(key)
+                    yield element
+
+        missing = []
+        for tile in self.tiles_for_radius(lat, lon, radius_m, inner_radius_m):
+            elements = self.cached_tile(tile, now)
+            if elements is None:
+                missing.append(tile)
+            else:
+                yield from within(elements)
+        if not missing:
+            return
+
+        # Tiles another search is already downloading (e.g. a speculative
+        # fetch) are waited for instead of being requested twice
+        claimed, waiting = self.claim(missing)
+        try:
+            if claimed:
+                yield from within(self.fetch_tiles(claimed))
+        finally:
+            self.release(claimed)
+
+        unfinished = []
+        for tile, done in waiting:
+            done.wait(INFLIGHT_WAIT)
+            elements = self.cached_tile(tile, now)
+            if elements is None:
+                unfinished.append(tile)
+            else:
+                yield from within(elements)
+        if unfinished:
+            # The other fetch failed or timed out; fetch these here
+            yield from within(self.fetch_tiles(unfinished))
+
+    def claim(self, tiles):
+        """
+        Split tiles into those this thread should fetch and (tile, event)
+        pairs for tiles already being fetched elsewhere.
+        """
+        claimed, waiting = [], []
+        with self.lock:
+            for tile in tiles:
+                done = self.inflight.get(tile)
+                if done is None:
+                    self.inflight[tile] = threading.Event()
+                    claimed.append(tile)
+                else:
+                    waiting.append((tile, done))
+        return claimed, waiting
+
+    def release(self, tiles):
+        with self.lock:
+            for tile in tiles:
+                self.inflight.pop(tile).set()
+
+    def warm(self, lat, lon, radius_m):
+        """
+        Make sure the tiles around (lat, lon) are cached, fetching any that are missing.
+        """
+        for _ in self.iter_query(lat, lon, radius_m):
+            pass
+
+    def query(self, lat, lon, radius_m):
+        """
+        Return the elements within radius_m metres of (lat, lon) as a list.
+        """
+        return list(self.iter_query(lat, lon, radius_m))
@@ -0,0 +1,82 @@
+import threading
+from map_cache import MapRenderCache
+
+
+class RenderCancelled(Exception):
+    pass
+
+
+class MapRenderWorker:
+    """
+    Renders map files on one background thread, off the Tk event loop.
+
+    Only the most recent request matters: submitting a new one drops any
+    request still waiting and cancels the one being built (it is abandoned
+    before it is saved), so a burst of searches renders at most one stale
+    map. Files go through MapRenderCache, which writes them to a temporary
+    file and renames it; on_ready(path) is then called on the Tk thread via
+    root.after.
+    """
+
+    def __init__(self, root, cache=None):
+        self.root = root
+        self.cache = cache or MapRenderCache()
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.pending = None
+        thread = threading.Thread(target=self.run, name="map-render")
+        thread.daemon = True
+        thread.start()
+
+    def submit(self, kind, center, radius_m, records, build, on_ready):
+        """
+        Render the map for these records (see MapRenderCache.get) in the
+        background, replacing any earlier request; returns its generation.
+        """
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, kind, center, radius_m, list(records), build, on_ready)
+            self.condition.notify()
+            return self.generation
+
+    def cancel(self):
+        """
+        Abandon the current request without starting another (e.g. no results).
+        """
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+
+    def stale(self, generation):
+        with self.condition:
+            return generation != self.generation
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                generation, kind, center, radius_m, records, build, on_ready = self.pending
+                self.pending = None
+
+            def checked_build():
+                built = build()
+                # Building is the slow part; do not save a map nobody will see
+                if self.stale(generation):
+                    raise RenderCancelled()
+                return built
+
+            try:
+                path = self.cache.get(kind, center, radius_m, records, checked_build)
+            except RenderCancelled:
+                continue
+            except Exception as e:
+                print(f"Map rendering failed: {e}")
+                continue
+            if not self.stale(generation):
+                self.root.after(0, self.deliver, generation, on_ready, path)
+
+    def deliver(self, generation, on_ready, path):
+        # A newer search may have started while this was queued on the Tk thread
+        if not self.stale(generation):
+            on_ready(path)
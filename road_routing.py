@@ -0,0 +1,459 @@
+import os
+import sys
+import glob
+import math
+import time
+import heapq
+import random
+import argparse
+import threading
+import numpy as np
+from overpass import stream_elements, bbox_area
+from spatial_index import KM_PER_DEGREE, haversine_km
+from geo_distance import haversine_km as haversine_km_array
+
+ROADS_DIR = os.path.join(os.path.expanduser("~"), ".medilocator", "roads")
+
+# Road classes that can be driven, with typical urban speeds in km/h
+ROAD_SPEEDS = {
+    "motorway": 80, "trunk": 60, "primary": 45, "secondary": 40, "tertiary": 35,
+    "motorway_link": 40, "trunk_link": 35, "primary_link": 35, "secondary_link": 30,
+    "tertiary_link": 30, "unclassified": 30, "residential": 25, "living_street": 10,
+    "service": 15, "road": 25,
+}
+ROAD_QUERY = ('[out:json][timeout:180];\nway["highway"~"^({classes})$"]({area});\nout geom;\n')
+
+# Getting from the query point to the road network (and from the network to
+# the hospital entrance) is counted at walking-to-car speed over straight lines
+ACCESS_SPEED_KMH = 10
+MAX_SNAP_KM = 2.0
+SNAP_CELL = 0.01                  # Degrees per cell of the node snapping grid
+BUILD_CHUNK = 0.25                # Degrees per Overpass request when downloading roads
+
+# Routes slower than this detour at this average speed count as unreachable,
+# so one target on a disconnected piece of road cannot make Dijkstra
+# explore the whole graph
+MAX_DETOUR = 3.0
+MIN_ROUTE_SPEED_KMH = 15
+
+
+def way_speed(tags):
+    speed = ROAD_SPEEDS.get(tags.get("highway"))
+    maxspeed = tags.get("maxspeed", "").split(" ")[0]
+    if maxspeed.isdigit():
+        # Posted limits are rarely reached in city traffic
+        speed = min(int(maxspeed), speed or int(maxspeed))
+    return speed
+
+
+def way_directions(tags):
+    """
+    (forward, backward) travel permitted along the way's node order.
+    """
+    oneway = tags.get("oneway", "")
+    if oneway == "-1":
+        return False, True
+    if oneway in ("yes", "true", "1"):
+        return True, False
+    if oneway != "no" and (tags.get("highway") == "motorway" or tags.get("junction") == "roundabout"):
+        return True, False
+    return True, True
+
+
+def compressed(sources, targets, weights, count):
+    """
+    CSR arrays (indptr, indices, weights) for the given edge list.
+    """
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32), weights[order].astype(np.float32)
+
+
+class RoadGraph:
+    """
+    Drivable road network as compressed sparse row (CSR) arrays.
+
+    Only junctions (way endpoints and nodes shared between ways) are kept as
+    vertices; the shape points between them are folded into the edge travel
+    times in seconds. A reversed copy of the graph serves the backward half
+    of the bidirectional search.
+    """
+
+    def __init__(self, lat, lon, indptr, indices, weights, rindptr, rindices, rweights):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.indptr, self.indices, self.weights = indptr, indices, weights
+        self.rindptr, self.rindices, self.rweights = rindptr, rindices, rweights
+        self.bbox = (float(self.lat.min()), float(self.lon.min()),
+                     float(self.lat.max()), float(self.lon.max())) if len(self.lat) else (0, 0, 0, 0)
+
+        # Plain lists are several times faster than numpy scalars in the search loops
+        self.forward = (indptr.tolist(), indices.tolist(), weights.tolist())
+        self.backward = (rindptr.tolist(), rindices.tolist(), rweights.tolist())
+
+        # Grid for snapping points to the nearest junction
+        cells = self.cell_keys(self.lat, self.lon)
+        self.snap_order = np.argsort(cells, kind="stable")
+        self.snap_cells = cells[self.snap_order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    @staticmethod
+    def cell_keys(lat, lon):
+        rows = np.floor(np.asarray(lat) / SNAP_CELL).astype(np.int64)
+        cols = np.floor(np.asarray(lon) / SNAP_CELL).astype(np.int64)
+        return rows * 100_000 + cols
+
+    @classmethod
+    def from_ways(cls, ways):
+        """
+        Build the graph from Overpass `out geom` way elements (duplicates are ignored).
+        """
+        unique = {}
+        for way in ways:
+            if way.get("type") == "way" and way_speed(way.get("tags", {})) and len(way.get("nodes", ())) > 1:
+                unique[way["id"]] = way
+        ways = list(unique.values())
+
+        # A node is a junction if it ends a way or appears more than once
+        uses = {}
+        for way in ways:
+            nodes = way["nodes"]
+            for node in nodes:
+                uses[node] = uses.get(node, 0) + 1
+            uses[nodes[0]] += 1
+            uses[nodes[-1]] += 1
+
+        index = {}
+        lat, lon = [], []
+        sources, targets, weights = [], [], []
+        for way in ways:
+            tags = way.get("tags", {})
+            meters_per_second = way_speed(tags) / 3.6
+            forward, backward = way_directions(tags)
+            previous = None
+            seconds = 0.0
+            last = None
+            for node, point in zip(way["nodes"], way["geometry"]):
+                if last is not None:
+                    seconds += haversine_km(last[0], last[1], point["lat"], point["lon"]) * 1000 / meters_per_second
+                last = (point["lat"], point["lon"])
+                if uses[node] < 2:
+                    continue
+                vertex = index.get(node)
+                if vertex is None:
+                    vertex = index[node] = len(lat)
+                    lat.append(point["lat"])
+                    lon.append(point["lon"])
+                if previous is not None and previous != vertex:
+                    if forward:
+                        sources.append(previous)
+                        targets.append(vertex)
+                        weights.append(seconds)
+                    if backward:
+                        sources.append(vertex)
+                        targets.append(previous)
+                        weights.append(seconds)
+                previous = vertex
+                seconds = 0.0
+
+        count = len(lat)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        forward = compressed(sources, targets, weights, count)
+        backward = compressed(targets, sources, weights, count)
+        return cls(lat, lon, *forward, *backward)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as handle:
+            np.savez_compressed(handle, lat=self.lat.astype(np.float32), lon=self.lon.astype(np.float32),
+                                indptr=self.indptr, indices=self.indices, weights=self.weights,
+                                rindptr=self.rindptr, rindices=self.rindices, rweights=self.rweights)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["lat"], data["lon"], data["indptr"], data["indices"], data["weights"],
+                       data["rindptr"], data["rindices"], data["rweights"])
+
+    def covers(self, lat, lon):
+        south, west, north, east = self.bbox
+        return south <= lat <= north and west <= lon <= east
+
+    def snap(self, lat, lon):
+        """
+        Nearest junction to (lat, lon) and the seconds needed to reach it, or (None, None).
+        """
+        row = math.floor(lat / SNAP_CELL)
+        col = math.floor(lon / SNAP_CELL)
+        rings = int(MAX_SNAP_KM / (SNAP_CELL * KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.1))) + 1
+        candidates = []
+        first_hit = None
+        for ring in range(rings + 1):
+            for dr in range(-ring, ring + 1):
+                # Each ring adds the cells on its border; whole rows of cells are contiguous keys
+                for cols in ([(-ring, ring)] if abs(dr) == ring else [(-ring, -ring), (ring, ring)]):
+                    low = (row + dr) * 100_000 + col + cols[0]
+                    high = (row + dr) * 100_000 + col + cols[1]
+                    start, end = np.searchsorted(self.snap_cells, [low, high + 1])
+                    candidates.extend(self.snap_order[start:end].tolist())
+            # A hit in ring r may still lose to a node one ring further out
+            if candidates and first_hit is None:
+                first_hit = ring
+            if first_hit is not None and ring > first_hit:
+                break
+        if not candidates:
+            return None, None
+        candidates = np.asarray(candidates)
+        distances = haversine_km_array(lat, lon, self.lat[candidates], self.lon[candidates])
+        best = int(np.argmin(distances))
+        if distances[best] > MAX_SNAP_KM:
+            return None, None
+        return int(candidates[best]), float(distances[best]) / ACCESS_SPEED_KMH * 3600
+
+    def shortest_time(self, source, target):
+        """
+        Travel time in seconds between two junctions with bidirectional Dijkstra,
+        or None if the target is unreachable.
+        """
+        if source == target:
+            return 0.0
+        distances = ({source: 0.0}, {target: 0.0})
+        settled = (set(), set())
+        heaps = ([(0.0, source)], [(0.0, target)])
+        graphs = (self.forward, self.backward)
+        best = math.inf
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            # Expand the side with the smaller frontier
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            distance, vertex = heapq.heappop(heaps[side])
+            if vertex in settled[side]:
+                continue
+            settled[side].add(vertex)
+            indptr, indices, weights = graphs[side]
+            mine, other = distances[side], distances[1 - side]
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                neighbour = indices[edge]
+                candidate = distance + weights[edge]
+                if candidate < mine.get(neighbour, math.inf):
+                    mine[neighbour] = candidate
+                    heapq.heappush(heaps[side], (candidate, neighbour))
+                if neighbour in other and candidate + other[neighbour] < best:
+                    best = candidate + other[neighbour]
+        return best if best < math.inf else None
+
+    def times_from(self, source, targets, max_seconds=math.inf):
+        """
+        Travel times from one junction to many, with a single Dijkstra that
+        stops once every target is settled. Unreached targets are missing.
+        """
+        remaining = set(targets)
+        found = {}
+        distances = {source: 0.0}
+        heap = [(0.0, source)]
+        indptr, indices, weights = self.forward
+        while heap and remaining:
+            distance, vertex = heapq.heappop(heap)
+            if distance > max_seconds:
+                break
+            if distance > distances[vertex]:
+                continue
+            if vertex in remaining:
+                remaining.discard(vertex)
+                found[vertex] = distance
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                neighbour = indices[edge]
+                candidate = distance + weights[edge]
+                if candidate < distances.get(neighbour, math.inf):
+                    distances[neighbour] = candidate
+                    heapq.heappush(heap, (candidate, neighbour))
+        return found
+
+    def travel_times(self, sources, targets, max_seconds=math.inf):
+        """
+        Many-to-many travel times in seconds between (lat, lon) points.
+
+        Returns one row per source with an entry per target; None where a
+        point cannot be snapped to the network or no route exists.
+        """
+        snapped_targets = [self.snap(lat, lon) for lat, lon in targets]
+        target_nodes = {node for node, _ in snapped_targets if node is not None}
+        matrix = []
+        for lat, lon in sources:
+            node, access = self.snap(lat, lon)
+            row = [None] * len(targets)
+            if node is not None:
+                times = self.times_from(node, target_nodes, max_seconds)
+                for position, (target, egress) in enumerate(snapped_targets):
+                    if target in times:
+                        row[position] = access + times[target] + egress
+            matrix.append(row)
+        return matrix
+
+
+class Router:
+    """
+    All road graphs built with `python road_routing.py build`, loaded on first use.
+    """
+
+    def __init__(self, roads_dir=ROADS_DIR):
+        self.roads_dir = roads_dir
+        self.graphs = None
+        self.lock = threading.Lock()
+
+    def graph_for(self, lat, lon):
+        with self.lock:
+            if self.graphs is None:
+                self.graphs = [RoadGraph.load(path)
+                               for path in sorted(glob.glob(os.path.join(self.roads_dir, "*.npz")))]
+        for graph in self.graphs:
+            if graph.covers(lat, lon):
+                return graph
+        return None
+
+    def etas(self, lat, lon, points, max_seconds=None):
+        """
+        Driving time in seconds from (lat, lon) to each point, or None if no
+        road graph covers the origin. Unreachable points, and points slower
+        than max_seconds (by default eta_cutoff of the farthest point), get None.
+        """
+        graph = self.graph_for(lat, lon)
+        if graph is None:
+            return None
+        if max_seconds is None:
+            max_seconds = eta_cutoff(lat, lon, points)
+        return graph.travel_times([(lat, lon)], points, max_seconds)[0]
+
+
+def eta_cutoff(lat, lon, points):
+    """
+    The slowest plausible drive from (lat, lon) to the farthest of the points.
+    """
+    farthest = max((haversine_km(lat, lon, point_lat, point_lon) for point_lat, point_lon in points), default=0.0)
+    return max(farthest, 1.0) * MAX_DETOUR / MIN_ROUTE_SPEED_KMH * 3600
+
+
+def rank_by_eta(router, lat, lon, candidates, position, k):
+    """
+    Re-rank (distance, item) candidates by driving time.
+
+    Returns up to k (distance, item, eta_seconds) triples, fastest first;
+    unreachable items follow by distance. Without a covering road graph the
+    straight-line order is kept and every eta is None.
+    """
+    etas = router.etas(lat, lon, [position(item) for _, item in candidates]) if router else None
+    if etas is None:
+        return [(distance, item, None) for distance, item in candidates[:k]]
+    ranked = sorted(zip(candidates, etas),
+                    key=lambda pair: (pair[1] is None, pair[1] if pair[1] is not None else pair[0][0]))
+    return [(distance, item, eta) for (distance, item), eta in ranked[:k]]
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "n/a"
+    minutes = max(1, round(seconds / 60))
+    return f"{minutes} min" if minutes < 60 else f"{minutes // 60} h {minutes % 60:02d} min"
+
+
+_shared_router = None
+
+
+def shared_router():
+    global _shared_router
+    if _shared_router is None:
+        _shared_router = Router()
+    return _shared_router
+
+
+def download_ways(bbox, fetch=stream_elements, chunk=BUILD_CHUNK, progress=None):
+    south, west, north, east = bbox
+    classes = "|".join(ROAD_SPEEDS)
+    boxes = []
+    lat = south
+    while lat < north:
+        lon = west
+        while lon < east:
+            boxes.append((lat, lon, min(lat + chunk, north), min(lon + chunk, east)))
+            lon += chunk
+        lat += chunk
+    ways = {}
+    for number, box in enumerate(boxes, 1):
+        for way in fetch(ROAD_QUERY.format(classes=classes, area=bbox_area(*box))):
+            ways[way["id"]] = way
+        if progress:
+            progress(number, len(boxes), len(ways))
+    return list(ways.values())
+
+
+def benchmark(graph, queries=200, seed=0):
+    """
+    Average latency of point-to-point and one-to-15 queries on random junctions.
+    """
+    rng = random.Random(seed)
+    nodes = [rng.randrange(len(graph)) for _ in range(queries * 16)]
+
+    start = time.perf_counter()
+    for i in range(queries):
+        graph.shortest_time(nodes[2 * i], nodes[2 * i + 1])
+    pair_ms = (time.perf_counter() - start) / queries * 1000
+
+    start = time.perf_counter()
+    for i in range(queries):
+        origin = nodes[i * 16]
+        lat, lon = graph.lat[origin], graph.lon[origin]
+        # The 15 junctions nearest the origin stand in for nearby hospitals
+        nearest = np.argsort(haversine_km_array(lat, lon, graph.lat, graph.lon))[1:16]
+        graph.times_from(origin, set(nearest.tolist()))
+    many_ms = (time.perf_counter() - start) / queries * 1000
+
+    print(f"{len(graph)} junctions, {len(graph.indices)} edges: "
+          f"point-to-point {pair_ms:.1f} ms | one-to-15 nearby {many_ms:.1f} ms")
+
+
+def main(argv=None):
+    from hospital_store import REGIONS
+
+    parser = argparse.ArgumentParser(description="Build and benchmark offline road graphs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="download a region's roads and build its graph")
+    build_parser.add_argument("region", help="region name, e.g. " + ", ".join(sorted(REGIONS)))
+    build_parser.add_argument("--bbox", help="south,west,north,east for a region not listed above")
+    bench_parser = commands.add_parser("bench", help="time routing queries on a built graph")
+    bench_parser.add_argument("region")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(ROADS_DIR, args.region.lower() + ".npz")
+    if args.command == "build":
+        if args.bbox:
+            bbox = tuple(float(value) for value in args.bbox.split(","))
+        elif args.region.lower() in REGIONS:
+            bbox = REGIONS[args.region.lower()]
+        else:
+            parser.error(f"unknown region {args.region!r}; pass --bbox")
+
+        def report(number, total, count):
+            print(f"  chunk {number}/{total}: {count} ways so far")
+
+        ways = download_ways(bbox, progress=report)
+        start = time.perf_counter()
+        graph = RoadGraph.from_ways(ways)
+        graph.save(path)
+        print(f"Built {len(graph)} junctions and {len(graph.indices)} edges in "
+              f"{time.perf_counter() - start:.1f} s -> {path}")
+    else:
+        benchmark(RoadGraph.load(path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
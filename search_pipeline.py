@@ -0,0 +1,193 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from gazetteer import shared_gazetteer
+from geo_distance import select_nearest, REFINE_MARGIN
+from top_k import NearestSelector
+from overpass import element_position
+from road_routing import rank_by_eta
+
+PIPELINE_WORKERS = 4
+EXPAND_FACTOR = 2                 # Each auto-expand step doubles the radius
+ETA_CANDIDATES = 3                # Straight-line candidates per result re-ranked by driving time
+ETA_ROUTED_ROWS = 20              # Only the first rows are routed; later rows keep straight-line order
+
+
+class StageTimings:
+    """
+    Wall-clock start and end of each stage of one search, relative to its start.
+
+    Stages may run on different threads and overlap; `critical_path` is the
+    end of the last stage, i.e. what the user actually waited for.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter() - self.started
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self.started
+            with self.lock:
+                self.stages.append((name, start, end))
+
+    def critical_path(self):
+        with self.lock:
+            return max((end for _, _, end in self.stages), default=0.0)
+
+    def summary(self):
+        with self.lock:
+            stages = sorted(self.stages, key=lambda stage: stage[1])
+        parts = [f"{name} {start * 1000:.0f}-{end * 1000:.0f} ms" for name, start, end in stages]
+        parts.append(f"total {self.critical_path() * 1000:.0f} ms")
+        return " | ".join(parts)
+
+
+class SearchResult:
+    def __init__(self, location, nearest, received, timings, radius_m, etas=None):
+        self.location = location
+        self.nearest = nearest
+        # Driving time in seconds per result, None where no road route is known
+        self.etas = etas or [None] * len(nearest)
+        self.received = received
+        self.timings = timings
+        self.radius_m = radius_m
+
+
+class SearchPipeline:
+    """
+    Hospital search with its independent stages overlapped on a thread pool.
+
+    While the query is geocoded, the Overpass tiles around an approximate
+    location (a gazetteer match for part of the query, or else the previous
+    search location) are fetched speculatively, so the real fetch finds them
+    cached. Elements are then streamed straight into the nearest-k stage,
+    whose first ETA_ROUTED_ROWS rows are re-ranked by driving time when a
+    road graph covers the area, and rendering can be handed back to the
+    pool with `submit` while the caller builds its listing.
+    """
+
+    def __init__(self, geolocator, tiles, store, selectors, gazetteer=None, router=None,
+                 workers=PIPELINE_WORKERS):
+        self.geolocator = geolocator
+        self.router = router
+        self.tiles = tiles
+        self.store = store
+        self.selectors = selectors
+        self.gazetteer = gazetteer or shared_gazetteer()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+        self.previous = None
+
+    def approximate_location(self, query):
+        """
+        A rough (lat, lon) for the query that needs no network, or None.
+
+        Only used when the gazetteer cannot resolve the whole query (then
+        geocoding is instant anyway); tries the broader parts of the query
+        such as the city in "Linking Road, Bandra, Mumbai".
+        """
+        if self.gazetteer.resolve(query) is not None:
+            return None
+        for part in reversed(query.split(",")[1:]):
+            place = self.gazetteer.resolve(part)
+            if place is not None:
+                return place.latitude, place.longitude
+        return self.previous
+
+    def speculate(self, query, radius_m, timings):
+        guess = self.approximate_location(query)
+        if guess is None or self.store.covers(guess[0], guess[1], radius_m):
+            return None
+
+        def warm():
+            with timings.stage("speculative fetch"):
+                try:
+                    self.tiles.warm(guess[0], guess[1], radius_m)
+                except Exception as e:
+                    # Only a head start; the real fetch reports any failure
+                    print(f"Speculative fetch failed: {e}")
+
+        return self.executor.submit(warm)
+
+    def elements(self, lat, lon, radius_m, inner_radius_m=0):
+        if self.store.covers(lat, lon, radius_m):
+            # Prefetched regions are answered from the local store
+            return self.store.query(lat, lon, radius_m, self.selectors, inner_radius_m)
+        # Served from cached tiles; only missing tiles go to Overpass
+        return self.tiles.iter_query(lat, lon, radius_m, inner_radius_m)
+
+    def run(self, query, radius_m, k, predicate=None, progress=None, min_results=0, max_radius_m=None):
+        """
+        Geocode `query` and return a SearchResult with its k nearest elements.
+
+        With min_results, the radius is multiplied by EXPAND_FACTOR until that
+        many matches are found or max_radius_m is reached; each step only
+        fetches the ring between the previous and the new radius and merges it
+        into the results so far. `location` is None if the query could not be
+        geocoded. Fetch errors (requests.RequestException) propagate to the caller.
+        """
+        timings = StageTimings()
+        self.speculate(query, radius_m, timings)
+
+        with timings.stage("geocode"):
+            location = self.geolocator.geocode(query)
+        if location is None:
+            return SearchResult(None, [], 0, timings, radius_m)
+        self.previous = (location.latitude, location.longitude)
+        lat, lon = location.latitude, location.longitude
+
+        received = [0]
+
+        def counted(elements):
+            for element in elements:
+                received[0] += 1
+                yield element
+
+        # With a road graph, more straight-line candidates are kept so that a
+        # slightly farther hospital on a faster road can still make the top
+        # rows; routing is the slow part, so only the top rows are re-ranked
+        routed = self.router is not None and self.router.graph_for(lat, lon) is not None
+        wanted = k
+        head = min(wanted, ETA_ROUTED_ROWS)
+        if routed:
+            k = max(wanted, head * ETA_CANDIDATES)
+        selector = NearestSelector(k, max_distance=radius_m / 1000, slack=REFINE_MARGIN)
+        with timings.stage("fetch + rank"):
+            nearest = select_nearest(counted(self.elements(lat, lon, radius_m)), lat, lon, k,
+                                     predicate=predicate, progress=progress, selector=selector)
+
+        max_radius_m = max_radius_m or radius_m
+        while len(nearest) < min(min_results, wanted) and radius_m < max_radius_m:
+            inner_radius_m, radius_m = radius_m, min(radius_m * EXPAND_FACTOR, max_radius_m)
+            selector.widen(radius_m / 1000)
+            with timings.stage(f"expand to {radius_m / 1000:g} km"):
+                ring = self.elements(lat, lon, radius_m, inner_radius_m)
+                nearest = select_nearest(counted(ring), lat, lon, k,
+                                         predicate=predicate, progress=progress, selector=selector)
+
+        etas = None
+        if routed:
+            with timings.stage("route"):
+                ranked = rank_by_eta(self.router, lat, lon, nearest[:head * ETA_CANDIDATES], element_position, head)
+            # The remaining rows follow by distance, without a driving time
+            chosen = {id(element) for _, element, _ in ranked}
+            rest = [(distance, element) for distance, element in nearest if id(element) not in chosen]
+            rest = rest[:wanted - len(ranked)]
+            nearest = [(distance, element) for distance, element, _ in ranked] + rest
+            etas = [eta for _, _, eta in ranked] + [None] * len(rest)
+        return SearchResult(location, nearest, received[0], timings, radius_m, etas)
+
+    def submit(self, timings, name, function, *args):
+        """
+        Run a later stage (e.g. map rendering) on the pool, timed as `name`.
+        """
+        def timed():
+            with timings.stage(name):
+                return function(*args)
+        return self.executor.submit(timed)
@@ -0,0 +1,132 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SEARCH_WORKERS = 2                # A superseded search may still be finishing its network call
+POLL_MS = 50                      # How often the Tk thread drains the result queue
+
+
+class SearchCancelled(Exception):
+    """
+    Raised inside a search job once a newer search has superseded it.
+    """
+
+
+class SearchJob:
+    """
+    Handle passed to a running search: lets it report progress and notice
+    that it has been superseded.
+    """
+
+    def __init__(self, scheduler, generation):
+        self.scheduler = scheduler
+        self.generation = generation
+
+    @property
+    def cancelled(self):
+        return self.scheduler.current() != self.generation
+
+    def check(self):
+        if self.cancelled:
+            raise SearchCancelled()
+
+    def report(self, callback, *args):
+        """
+        Run callback(*args) on the Tk thread (unless the job is stale by then);
+        raises SearchCancelled if it already is, so a progress hook can also
+        stop a download midway.
+        """
+        self.check()
+        self.scheduler.post(self.generation, callback, args)
+
+
+class SearchScheduler:
+    """
+    Runs searches as background jobs so the Tk event loop never blocks.
+
+    Each submitted search gets a generation ID and supersedes every earlier
+    one. Jobs run on a small thread pool and send progress and results back
+    through a queue that the Tk thread drains with root.after; messages from
+    superseded generations are dropped there, so a slow old search can never
+    overwrite the results of a newer one. Cancellation is cooperative: jobs
+    call `check` (or `report`) between stages.
+    """
+
+    def __init__(self, root, workers=SEARCH_WORKERS):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-job")
+        self.messages = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.running = 0
+        self.polling = False
+
+    def current(self):
+        with self.lock:
+            return self.generation
+
+    def submit(self, work, on_result, on_error=None):
+        """
+        Run work(job) in the background; on_result(value) or on_error(exception)
+        is then called on the Tk thread if no newer search was submitted.
+        Must be called from the Tk thread.
+        """
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            self.running += 1
+        job = SearchJob(self, generation)
+        self.executor.submit(self.run, job, work, on_result, on_error)
+        self.start_polling()
+        return generation
+
+    def cancel(self):
+        """
+        Supersede the running search without starting another.
+        """
+        with self.lock:
+            self.generation += 1
+
+    def run(self, job, work, on_result, on_error):
+        try:
+            value = work(job)
+        except SearchCancelled:
+            pass
+        except Exception as e:
+            if on_error is not None:
+                self.post(job.generation, on_error, (e,))
+            else:
+                print(f"Search failed: {e}")
+        else:
+            self.post(job.generation, on_result, (value,))
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def post(self, generation, callback, args):
+        self.messages.put((generation, callback, args))
+
+    def start_polling(self):
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self.drain)
+
+    def drain(self):
+        """
+        Deliver queued messages of the current generation (Tk thread only);
+        keeps polling while jobs are running or messages are waiting.
+        """
+        while True:
+            try:
+                generation, callback, args = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.current():
+                callback(*args)
+
+        with self.lock:
+            busy = self.running > 0
+        if busy or not self.messages.empty():
+            self.root.after(POLL_MS, self.drain)
+        else:
+            self.polling = False
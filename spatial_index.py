@@ -0,0 +1,201 @@
+import math
+import random
+import time
+import heapq
+
+# Mean Earth radius used for all great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance between two points in kilometres.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class HospitalGridIndex:
+    """
+    Uniform lat/lon grid over a hospital catalog.
+
+    The index is built once when the catalog loads. Radius and k-nearest
+    queries only visit the grid cells around the query point instead of
+    scanning every hospital.
+    """
+
+    def __init__(self, hospitals, cell_size=None, coordinates=None, per_cell=4):
+        self.coordinates = coordinates or self.default_coordinates
+        self.cells = {}
+        self.size = 0
+        self.max_abs_lat = 0.0
+
+        hospitals = list(hospitals)
+        # cell_size is in degrees; by default pick it so that an average
+        # occupied cell holds about `per_cell` hospitals
+        self.cell_size = cell_size or self.auto_cell_size(hospitals, per_cell)
+
+        for hospital in hospitals:
+            self.add(hospital)
+
+    def auto_cell_size(self, hospitals, per_cell):
+        if len(hospitals) < 2:
+            return 1.0
+        lats, lons = zip(*(self.coordinates(h) for h in hospitals))
+        area = max(max(lats) - min(lats), 0.01) * max(max(lons) - min(lons), 0.01)
+        return min(5.0, max(0.005, math.sqrt(area * per_cell / len(hospitals))))
+
+    @staticmethod
+    def default_coordinates(hospital):
+        return hospital["coordinates"]["lat"], hospital["coordinates"]["lng"]
+
+    def cell_of(self, lat, lon):
+        return int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size))
+
+    def add(self, hospital):
+        lat, lon = self.coordinates(hospital)
+        self.cells.setdefault(self.cell_of(lat, lon), []).append((lat, lon, hospital))
+        self.max_abs_lat = max(self.max_abs_lat, abs(lat))
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def ring_cells(self, row, col, ring):
+        """
+        Yield the cells on the square ring at Chebyshev distance `ring`.
+        """
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    def ring_min_distance(self, lat, ring):
+        """
+        Lower bound (km) on the distance to any point outside the first `ring` rings.
+        """
+        # Longitude cells get narrower towards the poles, so use the widest
+        # latitude the catalog contains to keep the bound conservative
+        lat_km = ring * self.cell_size * KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.9, max(abs(lat) + ring * self.cell_size, self.max_abs_lat))))
+        return min(lat_km, lat_km * cos_lat)
+
+    def within_radius(self, lat, lon, radius_km, predicate=None):
+        """
+        Return (distance_km, hospital) pairs within radius_km, nearest first.
+        """
+        row, col = self.cell_of(lat, lon)
+        lat_span = int(math.ceil(radius_km / (self.cell_size * KM_PER_DEGREE)))
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + lat_span * self.cell_size)))
+        lon_span = int(math.ceil(radius_km / (self.cell_size * KM_PER_DEGREE * max(cos_lat, 1e-6))))
+
+        results = []
+        for r in range(row - lat_span, row + lat_span + 1):
+            for c in range(col - lon_span, col + lon_span + 1):
+                for h_lat, h_lon, hospital in self.cells.get((r, c), ()):
+                    if predicate and not predicate(hospital):
+                        continue
+                    distance = haversine_km(lat, lon, h_lat, h_lon)
+                    if distance <= radius_km:
+                        results.append((distance, hospital))
+
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def nearest(self, lat, lon, k=10, predicate=None, max_distance_km=None):
+        """
+        Return up to k (distance_km, hospital) pairs, nearest first.
+        """
+        if k <= 0 or not self.size:
+            return []
+
+        row, col = self.cell_of(lat, lon)
+        # Max-heap of the best k so far, stored as (-distance, tie, hospital)
+        best = []
+        visited = 0
+        ring = 0
+        while visited < len(self.cells):
+            for cell in self.ring_cells(row, col, ring):
+                entries = self.cells.get(cell)
+                if not entries:
+                    continue
+                visited += 1
+                for h_lat, h_lon, hospital in entries:
+                    if predicate and not predicate(hospital):
+                        continue
+                    distance = haversine_km(lat, lon, h_lat, h_lon)
+                    if max_distance_km is not None and distance > max_distance_km:
+                        continue
+                    item = (-distance, id(hospital), hospital)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, item)
+
+            # Stop once nothing outside the visited rings can beat the current k-th result
+            bound = self.ring_min_distance(lat, ring)
+            if len(best) == k and bound >= -best[0][0]:
+                break
+            if max_distance_km is not None and bound > max_distance_km:
+                break
+            ring += 1
+
+        return sorted(((-d, hospital) for d, _, hospital in best), key=lambda item: item[0])
+
+
+def random_catalog(size, seed=0):
+    """
+    Generate a synthetic catalog spread over India for benchmarking.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "name": f"Hospital {i}",
+            "coordinates": {"lat": rng.uniform(8.0, 35.0), "lng": rng.uniform(68.0, 97.0)},
+        }
+        for i in range(size)
+    ]
+
+
+def benchmark(sizes=(10, 10_000, 1_000_000), queries=200, k=10, radius_km=20):
+    """
+    Report build time and average query latency for catalogs of the given sizes.
+    """
+    rng = random.Random(42)
+    points = [(rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)) for _ in range(queries)]
+
+    for size in sizes:
+        catalog = random_catalog(size)
+
+        start = time.perf_counter()
+        index = HospitalGridIndex(catalog)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for lat, lon in points:
+            index.nearest(lat, lon, k)
+        knn_us = (time.perf_counter() - start) / queries * 1e6
+
+        start = time.perf_counter()
+        for lat, lon in points:
+            index.within_radius(lat, lon, radius_km)
+        radius_us = (time.perf_counter() - start) / queries * 1e6
+
+        print(f"{size:>9} hospitals: build {build_ms:9.1f} ms | "
+              f"{k}-nearest {knn_us:9.1f} us/query | "
+              f"{radius_km} km radius {radius_us:9.1f} us/query")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,38 @@
+import random
+from spatial_index import haversine_km
+from emergency_index import EmergencyIndex, EMERGENCY_PER_CELL
+
+
+def delhi_hospitals(count, rng):
+    return [{"id": i, "emergency": True,
+             "coordinates": {"lat": rng.uniform(28.40, 28.90), "lng": rng.uniform(76.85, 77.35)}}
+            for i in range(count)]
+
+
+def brute_force(hospitals, lat, lon, k):
+    ranked = sorted(hospitals, key=lambda h: haversine_km(lat, lon, h["coordinates"]["lat"], h["coordinates"]["lng"]))
+    return [h["id"] for h in ranked[:k]]
+
+
+def test_lookup_matches_brute_force():
+    rng = random.Random(7)
+    hospitals = delhi_hospitals(200, rng)
+    index = EmergencyIndex(hospitals)
+    for _ in range(2000):
+        lat, lon = rng.uniform(28.40, 28.90), rng.uniform(76.85, 77.35)
+        found = [hospital["id"] for _, _, hospital, _ in index.lookup(lat, lon)]
+        assert found == brute_force(hospitals, lat, lon, EMERGENCY_PER_CELL)
+
+
+def test_lookup_after_add_and_remove():
+    rng = random.Random(11)
+    hospitals = delhi_hospitals(50, rng)
+    index = EmergencyIndex(hospitals)
+    added = {"id": 50, "emergency": True, "coordinates": {"lat": 28.61, "lng": 77.21}}
+    index.add(added)
+    index.remove(hospitals[0])
+    current = hospitals[1:] + [added]
+    for _ in range(500):
+        lat, lon = rng.uniform(28.40, 28.90), rng.uniform(76.85, 77.35)
+        found = [hospital["id"] for _, _, hospital, _ in index.lookup(lat, lon)]
+        assert found == brute_force(current, lat, lon, EMERGENCY_PER_CELL)
@@ -0,0 +1,120 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import requests
+from http_client import HttpClient
+from overpass_mirrors import OverpassMirrors
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+        time.sleep(server.delay)
+        body = b'{"elements": []}'
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    """
+    Start local Overpass stand-ins on ephemeral ports: stand_in(status, delay).
+    """
+    servers = []
+
+    def start(status=200, delay=0.0):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        server.status = status
+        server.delay = delay
+        server.hits = 0
+        server.lock = threading.Lock()
+        server.url = f"http://127.0.0.1:{server.server_address[1]}/api/interpreter"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def mirrors_for(*servers):
+    return OverpassMirrors([server.url for server in servers], client=HttpClient(timeout=(2, 10)))
+
+
+def test_fails_over_on_server_error(stand_in):
+    broken, healthy = stand_in(503), stand_in(200)
+    mirrors = mirrors_for(broken, healthy)
+    response = mirrors.get("[out:json];", stream=False)
+    assert response.status_code == 200
+    assert response.url.startswith(healthy.url)
+    assert broken.hits == 1 and healthy.hits == 1
+
+
+def test_bad_query_is_not_retried_on_other_mirrors(stand_in):
+    rejecting, healthy = stand_in(400), stand_in(200)
+    mirrors = mirrors_for(rejecting, healthy)
+    with pytest.raises(requests.HTTPError):
+        mirrors.get("not a query", stream=False)
+    assert healthy.hits == 0
+    assert mirrors.stats()[rejecting.url]["failures"] == 0
+
+
+def test_all_mirrors_failing_raises(stand_in):
+    mirrors = mirrors_for(stand_in(503), stand_in(504))
+    with pytest.raises(requests.HTTPError):
+        mirrors.get("[out:json];", stream=False)
+
+
+def test_slow_primary_is_hedged(stand_in):
+    slow, fast = stand_in(200, delay=2.0), stand_in(200)
+    mirrors = mirrors_for(slow, fast)
+    # A fast history ranks the slow mirror first and gives it a short hedge delay
+    for _ in range(5):
+        mirrors.record(slow.url, 0.05)
+    start = time.monotonic()
+    response = mirrors.get("[out:json];", stream=False)
+    assert response.url.startswith(fast.url)
+    assert time.monotonic() - start < 1.5
+    assert slow.hits == 1
+
+
+def test_failures_rank_a_mirror_last_until_it_recovers(stand_in):
+    first, second = stand_in(200), stand_in(200)
+    mirrors = mirrors_for(first, second)
+    mirrors.record(second.url, 0.2)
+    mirrors.record(first.url, 0.1)
+    assert mirrors.ranked() == [first.url, second.url]
+
+    first.status = 503
+    mirrors.get("[out:json];", stream=False)
+    assert mirrors.stats()[first.url]["cooling_down"]
+    assert mirrors.ranked() == [second.url, first.url]
+
+    mirrors.record(first.url, 0.1)
+    assert mirrors.stats()[first.url]["failures"] == 0
+    assert mirrors.ranked() == [first.url, second.url]
+
+
+def test_full_pool_fails_after_pool_timeout(stand_in):
+    slow = stand_in(200, delay=2.0)
+    client = HttpClient(max_retries=0, pool_per_host=1, pool_timeout=0.3)
+    holder = threading.Thread(target=client.get, args=(slow.url,), daemon=True)
+    holder.start()
+    while slow.hits == 0:
+        time.sleep(0.01)
+    start = time.monotonic()
+    with pytest.raises(requests.ConnectionError):
+        client.get(slow.url)
+    assert time.monotonic() - start < 1.5
+    holder.join()
@@ -0,0 +1,113 @@
+import heapq
+import itertools
+
+
+class NearestSelector:
+    """
+    Streaming selector for the k nearest items.
+
+    Items are pushed one at a time (or in batches) as they are parsed, and only
+    a bounded heap of the best k is kept, so n pushes cost O(n log k). Callers
+    push cheap handles (an index, an element) and build full records only for
+    the survivors returned by results().
+
+    When the pushed distances are approximate, `slack` keeps every item that
+    could still be among the k nearest once exact distances are known, and
+    results(refine=...) re-ranks those candidates by the exact distance.
+    """
+
+    def __init__(self, k, max_distance=None, slack=1.0):
+        self.k = k
+        self.max_distance = max_distance
+        self.slack = slack
+        # Max-heap of the best k, stored as (-distance, -seq, item) so that among
+        # equal distances the latest arrival is evicted first (stable order)
+        self.heap = []
+        # Items outside the best k but within `slack` of the current k-th distance
+        self.fringe = []
+        self.counter = itertools.count()
+        self.seen = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def threshold(self):
+        """
+        Distance an item must beat to enter the best k.
+        """
+        if len(self.heap) < self.k:
+            return self.max_distance if self.max_distance is not None else float("inf")
+        return -self.heap[0][0]
+
+    def push(self, distance, item):
+        """
+        Offer one item; returns True if it is currently among the best k.
+        """
+        self.seen += 1
+        if self.k <= 0:
+            return False
+        if self.max_distance is not None and distance > self.max_distance * self.slack:
+            return False
+
+        entry = (-distance, -next(self.counter), item)
+        if len(self.heap) < self.k and (self.max_distance is None or distance <= self.max_distance):
+            heapq.heappush(self.heap, entry)
+            return True
+        if distance < self.threshold():
+            entry = heapq.heapreplace(self.heap, entry)
+            self.keep_fringe(entry)
+            return True
+        self.keep_fringe(entry)
+        return False
+
+    def widen(self, max_distance):
+        """
+        Raise max_distance, e.g. when a search radius is expanded; items already
+        selected stay, and items beyond the old limit can now be pushed.
+        """
+        if self.max_distance is not None and (max_distance is None or max_distance > self.max_distance):
+            self.max_distance = max_distance
+
+    def extend(self, pairs):
+        """
+        Offer an iterable of (distance, item) pairs.
+        """
+        for distance, item in pairs:
+            self.push(distance, item)
+
+    def keep_fringe(self, entry):
+        if self.slack <= 1.0:
+            return
+        if -entry[0] <= self.threshold() * self.slack:
+            self.fringe.append(entry)
+            # Prune lazily; the k-th distance only ever shrinks
+            if len(self.fringe) > 4 * max(self.k, 16):
+                self.prune_fringe()
+
+    def prune_fringe(self):
+        limit = self.threshold() * self.slack
+        self.fringe = [entry for entry in self.fringe if -entry[0] <= limit]
+
+    def results(self, refine=None):
+        """
+        Return the selected (distance, item) pairs, nearest first.
+
+        `refine(item)` optionally returns the exact distance of an item; the
+        candidates are then re-ranked by it and cut back to k (and max_distance).
+        """
+        entries = self.heap
+        if refine is not None and self.fringe:
+            self.prune_fringe()
+            entries = self.heap + self.fringe
+
+        ordered = sorted(entries, key=lambda entry: (-entry[0], -entry[1]))
+        if refine is None:
+            return [(-entry[0], entry[2]) for entry in ordered]
+
+        refined = []
+        for entry in ordered:
+            distance = refine(entry[2])
+            if self.max_distance is None or distance <= self.max_distance:
+                refined.append((distance, -entry[1], entry[2]))
+        refined.sort(key=lambda entry: (entry[0], entry[1]))
+        return [(distance, item) for distance, _, item in refined[:self.k]]
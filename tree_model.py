@@ -0,0 +1,89 @@
+import tkinter as tk
+
+SORT_ASCENDING = " ▲"
+SORT_DESCENDING = " ▼"
+
+
+class TreeModel:
+    """
+    Keyed rows of a ttk.Treeview, updated by diffing result sets.
+
+    Each item's row uses key(item) as its Treeview iid. `update` deletes the
+    rows whose keys are gone, inserts the new ones, changes the values of
+    rows that differ and then reorders all rows with a single set_children
+    call, so rows present in both result sets are never rebuilt. Clicking a
+    column heading sorts by that column (again to reverse) using sort keys
+    computed once per update; new results keep the chosen sort.
+    """
+
+    def __init__(self, tree, columns, key, row_values, sort_keys):
+        self.tree = tree
+        self.columns = list(columns)
+        self.key = key
+        self.row_values = row_values      # item -> tuple of displayed values
+        self.sort_keys = sort_keys        # item -> tuple of sort keys, one per column
+        self.items = {}                   # iid -> item
+        self.values = {}                  # iid -> displayed values
+        self.keys = {}                    # iid -> sort keys
+        self.order = []                   # iids in result order
+        self.sort_column = None
+        self.descending = False
+        self.titles = {column: tree.heading(column, "text") for column in self.columns}
+        for column in self.columns:
+            tree.heading(column, command=lambda column=column: self.sort_by(column))
+
+    def update(self, items):
+        """
+        Show `items` (in this order unless a sort column is chosen).
+        """
+        new = {}
+        order = []
+        for item in items:
+            iid = str(self.key(item))
+            new[iid] = item
+            order.append(iid)
+
+        stale = [iid for iid in self.items if iid not in new]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self.values[iid]
+                del self.keys[iid]
+
+        for iid in order:
+            item = new[iid]
+            values = tuple(self.row_values(item))
+            if iid not in self.items:
+                self.tree.insert("", tk.END, iid=iid, values=values)
+            elif self.values[iid] != values:
+                self.tree.item(iid, values=values)
+            self.values[iid] = values
+            self.keys[iid] = tuple(self.sort_keys(item))
+
+        self.items = new
+        self.order = order
+        self.apply_order()
+
+    def apply_order(self):
+        if self.sort_column is None:
+            order = self.order
+        else:
+            index = self.columns.index(self.sort_column)
+            # sorted is stable, so ties keep their result order
+            order = sorted(self.order, key=lambda iid: self.keys[iid][index], reverse=self.descending)
+        if list(self.tree.get_children()) != order:
+            self.tree.set_children("", *order)
+
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            self.descending = False
+        for name in self.columns:
+            arrow = (SORT_DESCENDING if self.descending else SORT_ASCENDING) if name == column else ""
+            self.tree.heading(name, text=self.titles[name] + arrow)
+        self.apply_order()
+
+    def item(self, iid):
+        return self.items.get(iid)
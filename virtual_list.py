@@ -0,0 +1,92 @@
+import math
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualList(tk.Frame):
+    """
+    Scrollable list of fixed-height rows that only has widgets for the rows
+    in view.
+
+    make_row(parent) builds one row widget and fill_row(row, item) shows an
+    item in it. Only as many rows as fit in the viewport (plus one) are ever
+    built; scrolling re-fills and moves the same rows, so memory and redraw
+    cost do not depend on the number of items.
+    """
+
+    def __init__(self, master, row_height, make_row, fill_row, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_height = row_height
+        self.make_row = make_row
+        self.fill_row = fill_row
+        self.items = []
+        self.offset = 0                   # Pixels scrolled from the top
+        self.rows = []
+
+        self.viewport = tk.Frame(self, bg=kwargs.get("bg", "#f0f0f0"))
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.viewport.bind("<Configure>", lambda event: self.redraw())
+        self.bind_scrolling(self.viewport)
+
+    def bind_scrolling(self, widget):
+        # Rows cover the viewport, so every widget in them forwards the wheel
+        widget.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        widget.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        widget.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+        for child in widget.winfo_children():
+            self.bind_scrolling(child)
+
+    def set_items(self, items):
+        self.items = list(items)
+        self.offset = 0
+        for row in self.rows:
+            row.virtual_item = None
+        self.redraw()
+
+    def max_offset(self):
+        return max(0, len(self.items) * self.row_height - self.viewport.winfo_height())
+
+    def yview(self, command, *args):
+        if command == "moveto":
+            self.offset = float(args[0]) * len(self.items) * self.row_height
+        elif command == "scroll":
+            self.scroll(int(args[0]), args[1])
+            return
+        self.redraw()
+
+    def scroll(self, amount, unit):
+        step = self.viewport.winfo_height() if unit == "pages" else self.row_height // 3
+        self.offset += amount * step
+        self.redraw()
+
+    def redraw(self):
+        height = self.viewport.winfo_height()
+        self.offset = min(max(0, self.offset), self.max_offset())
+
+        # Grow the row pool to fill the viewport; rows are never destroyed
+        needed = min(len(self.items), math.ceil(height / self.row_height) + 1)
+        while len(self.rows) < needed:
+            row = self.make_row(self.viewport)
+            self.bind_scrolling(row)
+            self.rows.append(row)
+
+        first = int(self.offset // self.row_height)
+        for slot, row in enumerate(self.rows):
+            index = first + slot
+            if slot < needed and index < len(self.items):
+                # Scrolling within the same rows only moves them
+                if getattr(row, "virtual_item", None) is not self.items[index]:
+                    self.fill_row(row, self.items[index])
+                    row.virtual_item = self.items[index]
+                row.place(x=0, y=index * self.row_height - self.offset, relwidth=1, height=self.row_height)
+            else:
+                row.place_forget()
+
+        total = len(self.items) * self.row_height
+        if total <= height:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + height) / total)